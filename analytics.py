@@ -0,0 +1,202 @@
+# analytics.py
+"""
+Headless analytics: the numbers behind the Pareto, Gantt and OEE screens,
+without Qt or plotly, and a command line for batch reports.
+
+Every report is a generator of flat dicts, so the CLI streams rows straight
+from the database to CSV or JSON without holding a whole report in memory::
+
+    python -m analytics pareto --group-by category
+    python -m analytics oee --format json --output oee.json
+    python -m analytics efficiency --databases sites.txt --out-dir reports/
+
+``--databases`` names a file with one database path per line; each database
+is then reported by its own worker process.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from database import Database
+
+# Tasks read per query by efficiency_rows()
+PAGE_SIZE = 1000
+
+
+def pareto_rows(db, group_by='task', top_n=None):
+    """Groups by descending recorded time, with the running share of the total."""
+    for label, total, cum_pct in db.pareto(group_by, top_n):
+        yield {'label': label, 'total_time': total, 'cumulative_pct': cum_pct}
+
+
+def oee_rows(db):
+    """OEE and its three components per machine, all in percent."""
+    for eq_id, name, availability, performance, quality, oee in db.compute_oee_all():
+        yield {
+            'equipment_id': eq_id,
+            'equipment': name or f"EQ{eq_id}",
+            'availability_pct': availability * 100,
+            'performance_pct': performance * 100,
+            'quality_pct': quality * 100,
+            'oee_pct': oee,
+        }
+
+
+def oee_average(rows):
+    """Mean OEE % over ``oee_rows()`` output, or None without equipment."""
+    oees = [row['oee_pct'] for row in rows]
+    return sum(oees) / len(oees) if oees else None
+
+
+def efficiency_rows(db):
+    """Recorded against standard time for every task with time on it.
+
+    Reads the task table a page at a time, so memory does not grow with it.
+    """
+    after_id = 0
+    while True:
+        page = db.get_tasks_page(after_id, PAGE_SIZE)
+        if not page:
+            return
+        after_id = page[-1][0]
+        for task in page:
+            # task: id, name, desc, assigned_to, start, end, total, standard, efficiency, status, parent, category
+            if not task[6]:
+                continue
+            yield {
+                'task_id': task[0],
+                'task': task[1],
+                'category': task[11],
+                'assigned_to': task[3],
+                'status': task[9],
+                'standard_time': task[7],
+                'total_time': task[6],
+                'efficiency_pct': task[8] * 100 if task[8] is not None else None,
+            }
+
+
+def gantt_rows(db, t0=None, t1=None, resolution=0):
+    """Gantt bars for [t0, t1), one lane per assignee; see Database.get_gantt_bars."""
+    for lane, start, end, count, task_id, name in db.get_gantt_bars(t0, t1, resolution):
+        yield {
+            'label': f"[{task_id}] {name}" if count == 1 else f"{count} tasks",
+            'start': start,
+            'finish': end,
+            'resource': lane or "Unassigned",
+            'tasks': count,
+        }
+
+
+# CLI report name -> (CSV columns, rows(db, args))
+REPORTS = {
+    'pareto': (('label', 'total_time', 'cumulative_pct'),
+               lambda db, args: pareto_rows(db, args.group_by, args.top_n)),
+    'oee': (('equipment_id', 'equipment', 'availability_pct', 'performance_pct', 'quality_pct', 'oee_pct'),
+            lambda db, args: oee_rows(db)),
+    'efficiency': (('task_id', 'task', 'category', 'assigned_to', 'status',
+                    'standard_time', 'total_time', 'efficiency_pct'),
+                   lambda db, args: efficiency_rows(db)),
+}
+
+
+def write_csv(rows, columns, out):
+    writer = csv.DictWriter(out, columns)
+    writer.writeheader()
+    count = 0
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+    return count
+
+
+def write_json(rows, columns, out):
+    """A JSON array written one row at a time."""
+    out.write('[')
+    count = 0
+    for count, row in enumerate(rows, 1):
+        out.write(',\n' if count > 1 else '\n')
+        json.dump(row, out, default=str)
+    out.write('\n]\n' if count else ']\n')
+    return count
+
+
+WRITERS = {'csv': write_csv, 'json': write_json}
+
+
+def run_report(db_name, args, output=None):
+    """Write one report for one database; returns the number of rows.
+
+    ``output`` is a file path, or None for stdout. Also the unit of work of
+    the process pool, so it only takes picklable arguments.
+    """
+    columns, rows = REPORTS[args.report]
+    write = WRITERS[args.format]
+    db = Database(db_name)
+    try:
+        if output is None:
+            return write(rows(db, args), columns, sys.stdout)
+        with open(output, 'w', newline='', encoding='utf-8') as out:
+            return write(rows(db, args), columns, out)
+    finally:
+        db.close()
+
+
+def read_database_list(path):
+    """Database paths from a file, one per line; blank lines and # comments skipped."""
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m analytics', description="Batch analytics reports.")
+    parser.add_argument('report', choices=sorted(REPORTS))
+    parser.add_argument('--db', default='task_tracker.db', help="database file (default: %(default)s)")
+    parser.add_argument('--databases', metavar='FILE',
+                        help="file listing one database per line ('-' for stdin); one process each")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--output', help="output file for a single database (default: stdout)")
+    parser.add_argument('--out-dir', default='.', help="output directory with --databases (default: %(default)s)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes with --databases")
+    parser.add_argument('--group-by', choices=sorted(Database.PARETO_GROUPS), default='task',
+                        help="pareto grouping (default: %(default)s)")
+    parser.add_argument('--top-n', type=int, help="pareto: only the N largest groups")
+    args = parser.parse_args(argv)
+
+    if not args.databases:
+        if not os.path.exists(args.db):
+            parser.error(f"no such database: {args.db}")
+        try:
+            run_report(args.db, args, args.output)
+        except BrokenPipeError:
+            # The reader went away early (``| head``); silence the final flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        return 0
+
+    databases = read_database_list(args.databases)
+    missing = [name for name in databases if not os.path.exists(name)]
+    if missing:
+        parser.error(f"no such database: {', '.join(missing)}")
+    outputs = [os.path.join(args.out_dir, f"{os.path.splitext(os.path.basename(name))[0]}-{args.report}.{args.format}")
+               for name in databases]
+    if len(set(outputs)) != len(outputs):
+        parser.error("databases with the same file name would overwrite each other's report")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(databases)))) as pool:
+        futures = {pool.submit(run_report, name, args, output): (name, output)
+                   for name, output in zip(databases, outputs)}
+        for future in as_completed(futures):
+            name, output = futures[future]
+            try:
+                print(f"{name}: {future.result()} rows -> {output}", file=sys.stderr)
+            except Exception as e:
+                failed += 1
+                print(f"{name}: failed: {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
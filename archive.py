@@ -0,0 +1,64 @@
+# archive.py
+"""
+Move old finished work out of the live database into monthly archive files.
+
+    python -m archive                          # completed more than 180 days ago
+    python -m archive --older-than 90 --dir archive/
+    python -m archive --list
+
+Completed task subtrees that ended before the cutoff move, with their timing
+segments and roll-ups, to ``archive/tasks-YYYY-MM.db`` for the month they
+ended in (see ``Database.archive_tasks``), so the task list, Pareto and
+everything else reading the live tables only carries recent work. The Gantt
+chart and other time-range reports attach the archives a range reaches and
+read them together with the live tasks. Run it from cron or a scheduled
+task; an interrupted run is finished by the next one. On a station, sync the
+central database first: archived rows are not shipped by station_sync.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from database import Database
+
+ARCHIVE_AFTER_DAYS = 180
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m archive',
+                                     description="Move old completed tasks into monthly archive files.")
+    parser.add_argument('--db', default='task_tracker.db', help="database file (default: %(default)s)")
+    parser.add_argument('--dir', default='archive', help="directory of the archive files (default: %(default)s)")
+    parser.add_argument('--older-than', type=int, default=ARCHIVE_AFTER_DAYS, metavar='DAYS',
+                        help="archive work that ended more than DAYS days ago (default: %(default)s)")
+    parser.add_argument('--list', action='store_true', help="list the archive files and exit")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"no such database: {args.db}")
+
+    db = Database(args.db)
+    try:
+        if args.list:
+            for path, tasks, first, _, last_end in db.get_archives():
+                span = f"{first:%Y-%m-%d} .. {last_end:%Y-%m-%d}" if first and last_end else "untimed"
+                print(f"{path}: {tasks:,} tasks, {span}")
+            return 0
+
+        before = datetime.now() - timedelta(days=args.older_than)
+        started = time.perf_counter()
+
+        def progress(archived):
+            print(f"\r{archived:,} tasks archived", end='', file=sys.stderr)
+
+        archived = db.archive_tasks(before, args.dir, progress=progress)
+        print(f"\r{archived:,} tasks that ended before {before:%Y-%m-%d} archived to {args.dir} "
+              f"in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Performance benchmarks for the Time Tracker.
+
+Each module can be run on its own from the project root, e.g.::
+
+    python -m benchmarks.bench_connections
+
+``benchmarks.suite`` times everything at once on synthetic histories from
+``benchmarks.workload`` and writes JSON results that can be compared across
+commits.
+"""
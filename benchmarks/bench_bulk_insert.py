@@ -0,0 +1,72 @@
+"""
+Insert throughput of add_task() versus add_tasks_bulk().
+
+Rows are laid out like the industrial templates: one parent per group of
+subtasks, linked with ``key``/``parent_key`` inside the batch.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+GROUP_SIZE = 5
+
+
+def batch(n_rows):
+    for i in range(n_rows):
+        group = i // (GROUP_SIZE + 1)
+        if i % (GROUP_SIZE + 1) == 0:
+            yield {'key': group, 'task_name': f"Group {group}", 'category': 'MANUFACTURING'}
+        else:
+            yield {'task_name': f"Op {i}", 'description': 'bench', 'assigned_to': 'Operator',
+                   'standard_time': 60, 'parent_key': group, 'category': 'MANUFACTURING'}
+
+
+def bench_single(db, n_rows):
+    """One add_task() call, and one commit, per row."""
+    keys = {}
+    start = time.perf_counter()
+    for task in batch(n_rows):
+        parent = keys.get(task.pop('parent_key', None))
+        key = task.pop('key', None)
+        task_id = db.add_task(task['task_name'], task.get('description'), task.get('assigned_to'),
+                              task.get('standard_time', 0), parent, task.get('category'))
+        if key is not None:
+            keys[key] = task_id
+    return time.perf_counter() - start
+
+
+def bench_bulk(db, n_rows):
+    start = time.perf_counter()
+    db.add_tasks_bulk(batch(n_rows))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--single-limit', type=int, default=10_000,
+                        help="skip the add_task() loop above this many rows")
+    args = parser.parse_args(argv)
+
+    for n_rows in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, 'bulk.db'))
+            bulk = bench_bulk(db, n_rows)
+            print(f"{n_rows:>10,} rows  add_tasks_bulk: {n_rows / bulk:>12,.0f} inserts/sec")
+            db.close()
+        if n_rows <= args.single_limit:
+            with tempfile.TemporaryDirectory() as tmp:
+                db = Database(os.path.join(tmp, 'single.db'))
+                single = bench_single(db, n_rows)
+                print(f"{n_rows:>10,} rows  add_task:       {n_rows / single:>12,.0f} inserts/sec")
+                db.close()
+
+
+if __name__ == '__main__':
+    main()
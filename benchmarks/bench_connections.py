@@ -0,0 +1,102 @@
+"""
+Startup time and mixed read/write throughput of the shared Database.
+
+Simulates the four GUI screens (Tasks, Pareto, Gantt, OEE) as four
+``Database`` handles, each driven from its own thread, against a
+database seeded with 100k tasks.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+SCREENS = 4
+
+
+def seed(db_name, n_tasks):
+    """Fill a fresh database with ``n_tasks`` rows in one transaction."""
+    Database(db_name).close()
+    conn = sqlite3.connect(db_name)
+    rows = (
+        (f"Task {i}", "seeded", f"Operator {i % 50}", 60.0, None if i % 10 == 0 else i - i % 10 + 1, 'Pending', 'MANUFACTURING')
+        for i in range(1, n_tasks + 1)
+    )
+    conn.executemany('''
+    INSERT INTO tasks (task_name, description, assigned_to, standard_time, parent_task_id, status, category)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def bench_startup(db_name):
+    """Time to construct one Database per screen, as MainWindow does."""
+    start = time.perf_counter()
+    handles = [Database(db_name) for _ in range(SCREENS)]
+    elapsed = time.perf_counter() - start
+    for db in handles:
+        db.close()
+    return elapsed
+
+
+def bench_mixed(db_name, n_tasks, seconds, write_ratio):
+    """Run SCREENS threads issuing random reads and writes for ``seconds``."""
+    handles = [Database(db_name) for _ in range(SCREENS)]
+    counts = [[0, 0] for _ in range(SCREENS)]
+    deadline = time.perf_counter() + seconds
+
+    def worker(idx):
+        db = handles[idx]
+        rng = random.Random(idx)
+        while time.perf_counter() < deadline:
+            task_id = rng.randint(1, n_tasks)
+            if rng.random() < write_ratio:
+                db.start_task(task_id)
+                db.stop_task(task_id)
+                counts[idx][1] += 2
+            else:
+                db.get_task(task_id)
+                db.get_children(task_id)
+                counts[idx][0] += 2
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(SCREENS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for db in handles:
+        db.close()
+    reads = sum(c[0] for c in counts)
+    writes = sum(c[1] for c in counts)
+    return reads / seconds, writes / seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=100_000)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'bench.db')
+        seed(db_name, args.tasks)
+        startup = bench_startup(db_name)
+        reads, writes = bench_mixed(db_name, args.tasks, args.seconds, args.write_ratio)
+
+    print(f"tasks:            {args.tasks}")
+    print(f"startup ({SCREENS} screens): {startup * 1000:.2f} ms")
+    print(f"reads/sec:        {reads:,.0f}")
+    print(f"writes/sec:       {writes:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Equipment event ingest rate and OEE-over-time query latency.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+DAY = 86400
+
+
+def events(n_events, n_machines, t0, days, rng):
+    for _ in range(n_events):
+        ts = t0 + rng.random() * days * DAY
+        kind = rng.choices(('output', 'scrap', 'downtime'), weights=(80, 15, 5))[0]
+        value = rng.random() * 0.5 if kind == 'downtime' else rng.randint(1, 20)
+        yield rng.randint(1, n_machines), ts, kind, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--machines', type=int, default=200)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--batch', type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    t0 = 1_700_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'history.db'))
+        for i in range(args.machines):
+            db.add_equipment(f"Machine {i}", 8, 100)
+
+        stream = events(args.events, args.machines, t0, args.days, rng)
+        start = time.perf_counter()
+        stored = 0
+        while stored < args.events:
+            batch = [next(stream) for _ in range(min(args.batch, args.events - stored))]
+            db.record_equipment_events(batch)
+            stored += len(batch)
+        ingest = time.perf_counter() - start
+        print(f"ingest:        {args.events / ingest:>12,.0f} events/sec (batches of {args.batch:,})")
+
+        for label, lo, hi in (("one shift", t0 + 7 * 3600, t0 + 15 * 3600),
+                              ("one week", t0 + 3600, t0 + 7 * DAY + 3600),
+                              ("whole range", t0, t0 + args.days * DAY)):
+            start = time.perf_counter()
+            for eq_id in range(1, args.machines + 1):
+                db.compute_oee_window(eq_id, lo, hi)
+            elapsed = time.perf_counter() - start
+            print(f"OEE {label:<11} for {args.machines} machines: {elapsed * 1000:8.1f} ms")
+
+        start = time.perf_counter()
+        db.get_oee_history(1, 'shift')
+        print(f"shift history, one machine: {(time.perf_counter() - start) * 1000:8.1f} ms")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Export throughput of the tasks table: a full snapshot, then an incremental
+export after touching one task in a hundred.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from importlib.util import find_spec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exporter  # noqa: E402
+from database import Database  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=500_000)
+    args = parser.parse_args(argv)
+    formats = [fmt for fmt in exporter.WRITERS if fmt not in exporter.COLUMNAR or find_spec('pyarrow')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'export.db'))
+        ids = db.add_tasks_bulk({'task_name': f"Task {i}", 'assigned_to': f"Operator {i % 9}",
+                                 'category': 'QUALITY', 'standard_time': 60, 'total_time': 50 + i % 40}
+                                for i in range(args.tasks))
+        for fmt in formats:
+            out_dir = os.path.join(tmp, fmt)
+            os.makedirs(out_dir)
+            start = time.perf_counter()
+            entry = exporter.export_table(db, 'tasks', out_dir, fmt)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(os.path.join(out_dir, entry['file']))
+            print(f"{fmt:8} full:        {entry['rows'] / elapsed:10,.0f} rows/s   {size / 1e6:7.1f} MB")
+
+        with db.transaction():
+            for task_id in ids[::100]:
+                db.update_task(task_id, "Touched", None, "Operator 0", 60, None, 'QUALITY')
+        for fmt in formats:
+            start = time.perf_counter()
+            entry = exporter.export_table(db, 'tasks', os.path.join(tmp, fmt), fmt, incremental=True)
+            print(f"{fmt:8} incremental: {entry['rows']:10,} rows   {(time.perf_counter() - start) * 1000:7.1f} ms")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Gantt data for a 1500-pixel-wide chart: every task in the window versus
+get_gantt_bars() with one-pixel lane merging, zoomed out to the whole
+history and zoomed in to a single day.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+WIDTH_PX = 1500
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=100_000)
+    parser.add_argument('--operators', type=int, default=12)
+    parser.add_argument('--epoch', action='store_true', help="migrate to integer timestamps first")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    base = datetime(2024, 1, 1, 6)
+    operators = [f"Operator {i}" for i in range(args.operators)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'gantt.db'))
+        ids = db.add_tasks_bulk({'task_name': f"Task {i}", 'assigned_to': rng.choice(operators)}
+                                for i in range(args.tasks))
+        # Each operator works through back-to-back tasks of 2-40 minutes
+        clock = dict.fromkeys(operators, base)
+        timed = []
+        for task_id, (_, _, _, operator, *_) in zip(ids, db.get_all_tasks()):
+            start = clock[operator] + timedelta(minutes=rng.randint(0, 5))
+            end = start + timedelta(minutes=rng.randint(2, 40))
+            clock[operator] = end
+            timed.append((start.isoformat(), end.isoformat(), task_id))
+        with db.transaction():
+            db.conn.executemany('UPDATE tasks SET start_time = ?, end_time = ? WHERE id = ?', timed)
+        if args.epoch:
+            db.migrate_to_epoch_timestamps()
+
+        first, last = db.task_time_span()
+        day = first + (last - first) / 2
+        for label, (t0, t1) in (('whole history', (first, last)), ('one day', (day, day + timedelta(days=1)))):
+            resolution = (t1 - t0) / WIDTH_PX
+            tasks = len(db.get_tasks_between(t0, t1))
+            bars = len(db.get_gantt_bars(t0, t1, resolution))
+            every = best_of(lambda: [db.task_interval(t) for t in db.get_tasks_between(t0, t1)])
+            merged = best_of(lambda: db.get_gantt_bars(t0, t1, resolution))
+            print(f"{label:14} every task: {tasks:7,} bars {every * 1000:8.1f} ms"
+                  f"   merged: {bars:6,} bars {merged * 1000:8.1f} ms")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Streaming import throughput for a generated CSV of historical time-study
+records at a few batch sizes; with --memory, peak Python memory instead
+(tracemalloc slows the import down severalfold).
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importer  # noqa: E402
+from database import Database  # noqa: E402
+
+GROUP_SIZE = 20
+
+
+def write_history(path, n_rows):
+    """One work order per GROUP_SIZE operations, each operation timed."""
+    clock = datetime(2020, 1, 1, 6)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('key', 'parent_key', 'task_name', 'assigned_to', 'category',
+                         'standard_time', 'start_time', 'end_time'))
+        for i in range(n_rows):
+            order = i - i % GROUP_SIZE
+            if i == order:
+                writer.writerow((f"WO{order}", '', f"Work order {order}", '', 'MANUFACTURING', 0, '', ''))
+                continue
+            end = clock + timedelta(minutes=5 + i % 25)
+            writer.writerow((f"OP{i}", f"WO{order}", f"Operation {i}", f"Operator {i % 9}", 'MANUFACTURING',
+                             900, clock.isoformat(), end.isoformat()))
+            clock = end
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[500, 2000, 10_000])
+    parser.add_argument('--memory', action='store_true', help="trace peak memory")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'history.csv')
+        write_history(source, args.rows)
+        print(f"{args.rows:,} records, {os.path.getsize(source) / 1e6:.1f} MB of CSV")
+        for batch_size in args.batch_sizes:
+            db = Database(os.path.join(tmp, f'import-{batch_size}.db'))
+            if args.memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            read, inserted, rejected = importer.import_file(db, source, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            if args.memory:
+                result = f"peak {tracemalloc.get_traced_memory()[1] / 1e6:6.1f} MB"
+                tracemalloc.stop()
+            else:
+                result = f"{read / elapsed:8,.0f} records/s"
+            print(f"batch {batch_size:6,}: {result}   {inserted:,} imported, {rejected:,} rejected")
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
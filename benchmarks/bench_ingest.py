@@ -0,0 +1,107 @@
+"""
+Throughput and latency of the HTTP ingest service: concurrent scanner
+connections posting start/stop events against a file database, one event per
+request unless ``--per-request`` says otherwise.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest_server  # noqa: E402
+from database import Database  # noqa: E402
+
+
+async def scanner(port, task_ids, n_requests, per_request, latencies):
+    """One keep-alive connection posting start, stop, start, ... for its tasks.
+
+    A request carries one event for each of ``per_request`` consecutive tasks.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for i in range(n_requests):
+        action = 'start' if i % 2 == 0 else 'stop'
+        first = (i // 2) * per_request
+        body = json.dumps([{'task_id': task_ids[(first + j) % len(task_ids)], 'action': action}
+                           for j in range(per_request)]).encode()
+        start = time.perf_counter()
+        writer.write(b"POST /events HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+        reply = await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        if not head.startswith(b'HTTP/1.1 200') or b'error' in reply:
+            raise RuntimeError(f"{head.decode()} {reply.decode()}")
+    writer.close()
+
+
+def server_process(db_path, commit_interval, ports):
+    db = Database(db_path)
+    try:
+        asyncio.run(ingest_server.serve(db, port=0, ready=ports.put, commit_interval_ms=commit_interval))
+    finally:
+        db.close()
+
+
+async def run(port, task_ids, connections, requests_per_connection, tasks_per_connection, per_request):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(scanner(port, task_ids[c * tasks_per_connection:(c + 1) * tasks_per_connection],
+                                   requests_per_connection, per_request, latencies)
+                           for c in range(connections)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+    stats = json.loads((await reader.read()).split(b'\r\n\r\n', 1)[1])
+    return elapsed, sorted(latencies), stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=100, help="requests per connection")
+    parser.add_argument('--per-request', type=int, default=1, help="events per request")
+    parser.add_argument('--tasks', type=int, default=10, help="tasks per connection")
+    parser.add_argument('--commit-interval', type=float, default=ingest_server.COMMIT_INTERVAL_MS, metavar='MS')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'ingest.db')
+        db = Database(db_path)
+        ids = db.add_tasks_bulk({'task_name': f"Station task {i}", 'assigned_to': f"Operator {i % 40}",
+                                 'standard_time': 60} for i in range(args.connections * args.tasks))
+        db.close()
+        # The server gets a process of its own, as it would on the shop floor,
+        # so the clients do not compete with it for the GIL
+        ports = multiprocessing.Queue()
+        server = multiprocessing.Process(target=server_process, args=(db_path, args.commit_interval, ports))
+        server.start()
+        try:
+            elapsed, latencies, stats = asyncio.run(run(ports.get(timeout=30), ids, args.connections,
+                                                        args.requests, args.tasks, args.per_request))
+        finally:
+            server.terminate()
+            server.join()
+    n = len(latencies)
+    events = n * args.per_request
+
+    def pct(q):
+        return latencies[min(n - 1, int(q * n))] * 1000
+
+    print(f"{events:,} events in {n:,} requests from {args.connections} connections in {elapsed:.2f} s: "
+          f"{events / elapsed:,.0f} events/s")
+    print(f"round trip ms:  p50 {pct(0.5):6.1f}   p95 {pct(0.95):6.1f}   p99 {pct(0.99):6.1f}   max {latencies[-1] * 1000:6.1f}")
+    print(f"server:         {stats['batches']:,} commits, {stats['mean_batch']:.0f} events per commit on average, "
+          f"largest {stats['largest_batch']:,}")
+    print(f"ingest latency: {json.dumps(stats['latency_ms'])}")
+
+
+if __name__ == '__main__':
+    main()
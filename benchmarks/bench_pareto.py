@@ -0,0 +1,48 @@
+"""
+Latency of Database.pareto() for every grouping on a large history.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+def seed(db, n_tasks, rng):
+    db.add_tasks_bulk(
+        {'task_name': f"Op {rng.randrange(300)}", 'assigned_to': f"Operator {rng.randrange(40)}",
+         'category': rng.choice(('MANUFACTURING', 'MAINTENANCE', 'QUALITY', 'LOGISTICS', 'ENGINEERING')),
+         'parent_task_id': rng.randrange(1, 1000), 'standard_time': 600}
+        for _ in range(n_tasks)
+    )
+    with db._write() as cursor:
+        cursor.execute("UPDATE tasks SET total_time = abs(random() % 3600), status = 'Completed'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=1_000_000)
+    parser.add_argument('--top-n', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'pareto.db'))
+        seed(db, args.tasks, random.Random(0))
+        for group_by in db.PARETO_GROUPS:
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                db.pareto(group_by, args.top_n)
+                best = min(best, time.perf_counter() - start)
+            print(f"pareto({group_by!r:>10}, top_n={args.top_n}) on {args.tasks:,} tasks: {best * 1000:8.1f} ms")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
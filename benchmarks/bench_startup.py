@@ -0,0 +1,127 @@
+"""
+Startup regression check: import cost and time to first paint.
+
+Runs two fresh interpreters from the project root:
+
+* ``python -X importtime -c "import main"`` -- total import time, the
+  slowest top-level imports, and whether anything that should be deferred
+  (plotly, QtWebEngine) was imported at startup;
+* an offscreen Qt launch of ``MainWindow`` timed until the first paint event.
+
+Exits non-zero when a deferred module is imported at startup or a budget is
+exceeded, so it can run as a regression check on every commit.
+
+    python -m benchmarks.bench_startup --max-import-ms 800 --max-paint-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported until the first chart is generated
+DEFERRED = ('plotly', 'PySide6.QtWebEngineWidgets', 'PySide6.QtWebEngineCore')
+
+FIRST_PAINT = r"""
+import time
+t0 = time.perf_counter()
+import sys
+from PySide6.QtCore import QObject, QEvent, QTimer
+import main
+
+app = main.create_app(sys.argv[:1])
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print(f"{(time.perf_counter() - t0) * 1000:.1f}", flush=True)
+            app.removeEventFilter(self)
+            QTimer.singleShot(0, app.quit)
+        return False
+
+probe = FirstPaint()
+app.installEventFilter(probe)
+win = main.MainWindow()
+win.show()
+QTimer.singleShot(30000, app.quit)
+app.exec()
+"""
+
+
+def import_times():
+    """Return (cumulative µs of ``import main``, {direct import: cumulative µs},
+    set of every module imported)."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    seen = set()
+    children = {}
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # One separator space, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        seen.add(name)
+        if depth == 0:
+            # Children are printed before their parent
+            if name == 'main':
+                total = int(cumulative)
+                break
+            children = {}
+        elif depth == 1:
+            children[name] = int(cumulative)
+    return total, children, seen
+
+
+def first_paint_ms():
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    proc = subprocess.run(
+        [sys.executable, '-c', FIRST_PAINT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(proc.stdout.split()[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-import-ms', type=float, default=None)
+    parser.add_argument('--max-paint-ms', type=float, default=None)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    total_us, top, seen = import_times()
+    import_ms = total_us / 1000
+    paint_ms = first_paint_ms()
+    leaked = sorted(m for m in seen if m.startswith(DEFERRED))
+
+    print(f"import main:     {import_ms:8.1f} ms")
+    for name, us in sorted(top.items(), key=lambda kv: -kv[1])[:10]:
+        print(f"  {name:<30} {us / 1000:8.1f} ms")
+    print(f"first paint:     {paint_ms:8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'import_ms': import_ms, 'first_paint_ms': paint_ms,
+                       'top_imports_us': top, 'deferred_imported': leaked}, f, indent=2)
+
+    failures = []
+    if leaked:
+        failures.append(f"imported at startup but should be deferred: {', '.join(leaked)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import time {import_ms:.1f} ms exceeds {args.max_import_ms} ms")
+    if args.max_paint_ms is not None and paint_ms > args.max_paint_ms:
+        failures.append(f"first paint {paint_ms:.1f} ms exceeds {args.max_paint_ms} ms")
+    for f in failures:
+        print(f"FAIL: {f}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Gantt data extraction from ISO-text timestamps versus the integer epoch
+columns added by migrate_to_epoch_timestamps(), for the whole range and for
+one-week windows in the middle of the history and at its recent end.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def gantt_rows(db, t0=None, t1=None):
+    return [db.task_interval(t) for t in db.get_tasks_between(t0, t1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    base = datetime(2024, 1, 1, 6)
+    # One task every 10 minutes; spans a little under four years at the default
+    span = timedelta(minutes=10)
+    middle = base + span * (args.tasks // 2)
+    last = base + span * args.tasks
+    windows = (('middle week', (middle, middle + timedelta(days=7))),
+               ('latest week', (last - timedelta(days=7), last)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'timestamps.db'))
+        ids = db.add_tasks_bulk({'task_name': f"Task {i}", 'standard_time': 5} for i in range(args.tasks))
+        with db.transaction():
+            db.conn.executemany(
+                'UPDATE tasks SET start_time = ?, end_time = ?, status = ? WHERE id = ?',
+                (((base + span * i).isoformat(), (base + span * i + timedelta(minutes=7)).isoformat(),
+                  'Completed', task_id) for i, task_id in enumerate(ids)))
+
+        print(f"ISO text, all tasks:         {best_of(lambda: gantt_rows(db)) * 1000:10.1f} ms")
+        for label, window in windows:
+            print(f"ISO text, {label}:       {best_of(lambda: gantt_rows(db, *window)) * 1000:10.1f} ms")
+
+        start = time.perf_counter()
+        converted = db.migrate_to_epoch_timestamps()
+        print(f"migrate {converted:,} rows:       {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+        print(f"epoch µs, all tasks:         {best_of(lambda: gantt_rows(db)) * 1000:10.1f} ms")
+        for label, window in windows:
+            print(f"epoch µs, {label}:       {best_of(lambda: gantt_rows(db, *window)) * 1000:10.1f} ms")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
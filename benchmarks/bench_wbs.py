@@ -0,0 +1,56 @@
+"""
+WBS roll-up cost: cached read versus recursive recomputation, and the
+incremental upkeep paid by stop_task on a deep project tree.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+def tree(n_nodes, fanout):
+    """Breadth-first project tree: node i's parent is node (i - 1) // fanout."""
+    for i in range(n_nodes):
+        yield {'key': i, 'task_name': f"WBS {i}", 'standard_time': 60,
+               'parent_key': (i - 1) // fanout if i else None}
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=100_000)
+    parser.add_argument('--fanout', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'wbs.db'))
+        start = time.perf_counter()
+        ids = db.add_tasks_bulk(tree(args.nodes, args.fanout))
+        print(f"build {args.nodes:,}-node tree:     {(time.perf_counter() - start) * 1000:10.1f} ms")
+        root, leaf = ids[0], ids[-1]
+
+        print(f"get_wbs_rollup(root):        {best_of(lambda: db.get_wbs_rollup(root)) * 1e6:10.1f} µs")
+        print(f"compute_wbs_rollup(root):    {best_of(lambda: db.compute_wbs_rollup(root), 3) * 1e6:10.1f} µs")
+
+        def start_stop():
+            db.start_task(leaf)
+            db.stop_task(leaf)
+        print(f"start+stop deepest leaf:     {best_of(start_stop) * 1e6:10.1f} µs")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""
+Benchmark suite: every public ``Database`` method, the analytics behind the
+Pareto, Gantt and OEE screens, and ``TaskScreen.refresh`` (offscreen Qt), on
+synthetic industrial histories (see ``benchmarks.workload``) at several scales.
+
+Results are written as JSON so two commits can be compared::
+
+    python -m benchmarks.suite --scales 10k 100k --output before.json
+    git checkout my-branch
+    python -m benchmarks.suite --scales 10k 100k --output after.json --compare before.json
+
+``--compare`` prints the ratio of every timing to the baseline and exits
+non-zero if any got slower than ``--threshold``. The suite warns about public
+``Database`` methods it does not time, so new methods get a benchmark too.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+from benchmarks import workload  # noqa: E402
+from database import REPLICATED_TABLES, Database  # noqa: E402
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+
+# Public methods that issue no queries worth timing
+NOT_TIMED = {'connect', 'close', 'create_tables', 'schema_version', 'transaction'}
+
+# Cases that return (a large share of) the whole table are skipped above
+# this many tasks, where they measure memory allocation more than SQLite
+WHOLE_TABLE_LIMIT = 1_000_000
+
+MACHINES = 50
+# Equipment events stored per task, and per timed record_equipment_events()
+EVENTS_PER_TASK = 1
+EVENT_BATCH = 10_000
+# Tasks per timed add_tasks_bulk() / import_tasks_batch()
+BULK_SIZE = 1000
+# Plot width assumed for the Gantt resolution, as GanttScreen.MIN_BAR_PX
+GANTT_WIDTH_PX = 1500
+
+
+class Case:
+    """One timed call. ``call(i)`` gets the repeat number, so repeats of a
+    mutating call can work on a different row each time.
+
+    The query cache is emptied before each call, so reads are timed against
+    SQLite, unless ``cached`` is set to time cache hits instead.
+    """
+
+    def __init__(self, name, call, whole_table=False, cached=False):
+        self.name = name
+        self.call = call
+        self.whole_table = whole_table
+        self.cached = cached
+
+
+def time_case(db, case, repeat):
+    times = []
+    if case.cached:
+        case.call(-1)
+    for i in range(repeat):
+        if not case.cached:
+            db.manager.cache.clear()
+        start = time.perf_counter()
+        result = case.call(i)
+        if hasattr(result, '__next__'):
+            # Generators do their work as they are consumed
+            for _ in result:
+                pass
+        times.append(time.perf_counter() - start)
+    return {'best_ms': min(times) * 1000, 'median_ms': statistics.median(times) * 1000, 'repeat': repeat}
+
+
+def seed(db, n_tasks):
+    """The synthetic history; returns (first task id, machine ids)."""
+    first, _ = workload.populate(db, n_tasks)
+    for i in range(MACHINES):
+        db.add_equipment(f"Machine {i}", 8, 100)
+    machines = [row[0] for row in db.get_equipment()]
+    stream = workload.equipment_events(machines, n_tasks * EVENTS_PER_TASK)
+    while batch := [event for _, event in zip(range(EVENT_BATCH), stream)]:
+        db.record_equipment_events(batch)
+    return first, machines
+
+
+def time_range_cases(db, suffix=''):
+    """Cases whose SQL depends on the timestamp representation."""
+    first, last = db.task_time_span()
+    mid = first + (last - first) / 2
+    day = (mid, mid + timedelta(days=1))
+    whole = (first, last + timedelta(hours=1))
+
+    def resolution(t0, t1):
+        return (t1 - t0) * 2 / GANTT_WIDTH_PX
+
+    return [
+        Case('task_time_span' + suffix, lambda i: db.task_time_span()),
+        Case('get_tasks_between' + suffix + ' [one day]', lambda i: db.get_tasks_between(*day)),
+        Case('get_gantt_bars' + suffix + ' [one day]', lambda i: db.get_gantt_bars(*day, resolution(*day))),
+        Case('get_gantt_bars' + suffix + ' [whole history]',
+             lambda i: db.get_gantt_bars(*whole, resolution(*whole))),
+        Case('analytics.gantt_rows' + suffix + ' [whole history]',
+             lambda i: analytics.gantt_rows(db, *whole, resolution(*whole))),
+    ]
+
+
+def database_cases(db, first, machines, scratch):
+    """Every public method; ``scratch`` collects the ids add_task creates,
+    which the lifecycle, update and delete cases then work on in turn."""
+    parent, child = first, first + 1
+    operator = db.get_task(child)[3]
+    eq = machines[0]
+    t0 = workload.START.timestamp()
+    shift = (t0 + 30 * 86400, t0 + 30 * 86400 + 8 * 3600)
+    bulk = next(workload.tasks(BULK_SIZE, seed=1))
+    events = list(workload.equipment_events(machines, EVENT_BATCH, seed=1))
+    row = db.get_task(child)
+
+    def add_task(i):
+        scratch.append(db.add_task(f"Scratch {i}", '', operator, 600, parent, 'QUALITY'))
+
+    local = db.changes_since(0, BULK_SIZE)
+    own = f"{db.station_id}:"
+
+    def remote_batch(i):
+        """The first BULK_SIZE changes as if logged by another station, new rows on every repeat."""
+        def remote(global_id):
+            return global_id and global_id.replace(own, f"bench-{i}:")
+
+        changes = []
+        for change in local['changes']:
+            change = dict(change, id=remote(change['id']))
+            if 'row' in change:
+                ref = REPLICATED_TABLES[change['table']][1]
+                change['row'] = dict(change['row'], **({ref: remote(change['row'][ref])} if ref else {}))
+            changes.append(change)
+        return dict(local, station=f"bench-{i}", changes=changes)
+
+    return [
+        Case('add_task', add_task),
+        Case('start_task', lambda i: db.start_task(scratch[i])),
+        Case('pause_task', lambda i: db.pause_task(scratch[i])),
+        Case('resume_task', lambda i: db.resume_task(scratch[i], 'Relief Operator')),
+        Case('get_open_segments', lambda i: db.get_open_segments(scratch[i])),
+        Case('get_open_segments [all]', lambda i: db.get_open_segments()),
+        Case('stop_task', lambda i: db.stop_task(scratch[i])),
+        Case('get_segments', lambda i: db.get_segments(scratch[i])),
+        Case('update_task', lambda i: db.update_task(scratch[i], f"Scratch {i}", 'edited', operator, 600,
+                                                     parent, 'QUALITY')),
+        Case('add_tasks_bulk [1k]', lambda i: db.add_tasks_bulk(dict(task) for task in bulk)),
+        Case('get_all_tasks', lambda i: db.get_all_tasks(), whole_table=True),
+        Case('get_all_tasks [cached]', lambda i: db.get_all_tasks(), whole_table=True, cached=True),
+        Case('get_tasks_page', lambda i: db.get_tasks_page(first + i * 500, 500)),
+        Case('get_task_names', lambda i: db.get_task_names()),
+        Case('get_task_names [cached]', lambda i: db.get_task_names(), cached=True),
+        Case('get_task', lambda i: db.get_task(child + i)),
+        Case('get_task [cached]', lambda i: db.get_task(child), cached=True),
+        Case('task_interval', lambda i: db.task_interval(row)),
+        Case('get_children', lambda i: db.get_children(parent)),
+        Case('get_root_tasks', lambda i: db.get_root_tasks(), whole_table=True),
+        Case('find_tasks [status]', lambda i: db.find_tasks(status='Pending')),
+        Case('find_tasks [category]', lambda i: db.find_tasks(category='QUALITY'), whole_table=True),
+        Case('find_tasks [assignee]', lambda i: db.find_tasks(assigned_to=operator)),
+        Case('search_tasks [prefix]', lambda i: db.search_tasks('ins')),
+        Case('search_tasks [word]', lambda i: db.search_tasks('inspection')),
+        Case('search_tasks [words]', lambda i: db.search_tasks('qual ins')),
+        Case('get_wbs_rollup', lambda i: db.get_wbs_rollup(parent)),
+        Case('compute_wbs_rollup', lambda i: db.compute_wbs_rollup(parent)),
+        Case('get_descendant_ids', lambda i: db.get_descendant_ids(parent)),
+        *(Case(f'pareto [{group_by}]', lambda i, g=group_by: db.pareto(g, 20)) for group_by in db.PARETO_GROUPS),
+        Case('pareto [task] [cached]', lambda i: db.pareto('task', 20), cached=True),
+        Case('import_tasks_batch [1k]', lambda i: db.import_tasks_batch(
+            f"bench-{i}", [dict(task) for task in bulk], len(bulk))),
+        Case('get_import_progress', lambda i: db.get_import_progress('bench-0')),
+        Case('export_columns', lambda i: db.export_columns('tasks')),
+        Case('export_rows [tasks]', lambda i: db.export_rows('tasks')),
+        Case('existing_task_ids [1k]', lambda i: db.existing_task_ids(range(child, child + BULK_SIZE))),
+        Case('global_task_id', lambda i: db.global_task_id(child)),
+        Case('find_global_task', lambda i: db.find_global_task(f"{own}{child}")),
+        Case('changes_since [1k]', lambda i: db.changes_since(0, BULK_SIZE)),
+        Case('apply_changes [1k]', lambda i: db.apply_changes(remote_batch(i))),
+        Case('get_sync_progress', lambda i: db.get_sync_progress('bench-0')),
+        Case('add_equipment', lambda i: db.add_equipment(f"Extra {i}", 8, 100)),
+        Case('update_equipment', lambda i: db.update_equipment(eq, 1, 700, 690)),
+        Case('get_equipment', lambda i: db.get_equipment(eq)),
+        Case('get_equipment [all]', lambda i: db.get_equipment()),
+        Case('record_equipment_events [10k]', lambda i: db.record_equipment_events(events)),
+        Case('compute_oee', lambda i: db.compute_oee(eq)),
+        Case('compute_oee_window [shift]', lambda i: db.compute_oee_window(eq, *shift)),
+        Case('get_oee_history [day]', lambda i: db.get_oee_history(eq, 'day')),
+        Case('compute_oee_all', lambda i: db.compute_oee_all()),
+        *time_range_cases(db),
+        Case('analytics.pareto_rows [category]', lambda i: analytics.pareto_rows(db, 'category')),
+        Case('analytics.oee_rows', lambda i: analytics.oee_rows(db)),
+        Case('analytics.efficiency_rows', lambda i: analytics.efficiency_rows(db)),
+        Case('delete_task', lambda i: db.delete_task(scratch[i])),
+    ]
+
+
+def task_screen_case():
+    """TaskScreen.refresh on an offscreen platform, or the reason it can't run."""
+    if find_spec('PySide6') is None:
+        return "PySide6 is not installed"
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    import main
+    from task_screen import TaskScreen
+    app = QApplication.instance() or main.create_app(sys.argv[:1])
+    screen = TaskScreen()
+    screen.resize(1200, 800)
+    screen.show()
+    app.processEvents()
+
+    def refresh(i):
+        screen.refresh()
+        # The view fetches the first page when it lays itself out again
+        app.processEvents()
+
+    return Case('TaskScreen.refresh', refresh)
+
+
+def run_scale(label, n_tasks, repeat, qt):
+    """Seed one database of ``n_tasks`` tasks and time every case on it."""
+    result = {'tasks': n_tasks, 'cases': {}, 'skipped': {}}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # TaskScreen opens the default database in the working directory
+        os.chdir(tmp)
+        try:
+            db = Database('task_tracker.db')
+            start = time.perf_counter()
+            first, machines = seed(db, n_tasks)
+            result['seed_s'] = time.perf_counter() - start
+            print(f"{label}: seeded {n_tasks:,} tasks in {result['seed_s']:.1f} s", file=sys.stderr)
+
+            scratch = []
+            cases = database_cases(db, first, machines, scratch)
+            if qt:
+                case = task_screen_case()
+                if isinstance(case, str):
+                    result['skipped']['TaskScreen.refresh'] = case
+                else:
+                    cases.append(case)
+            for case in cases:
+                if case.whole_table and n_tasks > WHOLE_TABLE_LIMIT:
+                    result['skipped'][case.name] = f"returns the whole table above {WHOLE_TABLE_LIMIT:,} tasks"
+                    continue
+                result['cases'][case.name] = time_case(db, case, repeat)
+
+            # Time-range queries again after the opt-in epoch migration
+            migrate = Case('migrate_to_epoch_timestamps', lambda i: db.migrate_to_epoch_timestamps())
+            result['cases'][migrate.name] = time_case(db, migrate, 1)
+            for case in time_range_cases(db, ' [epoch]'):
+                result['cases'][case.name] = time_case(db, case, repeat)
+
+            # And once the older half of the history is archived
+            first_start, last_start = db.task_time_span()
+            cutoff = first_start + (last_start - first_start) / 2
+            archive = Case('archive_tasks [half]', lambda i: db.archive_tasks(cutoff, os.path.join(tmp, 'archive')))
+            result['cases'][archive.name] = time_case(db, archive, 1)
+            for case in [Case('get_archives', lambda i: db.get_archives()), *time_range_cases(db, ' [archived]')]:
+                result['cases'][case.name] = time_case(db, case, repeat)
+            db.close()
+        finally:
+            os.chdir(cwd)
+    return result
+
+
+def untimed(names):
+    """Public Database methods no case name starts with."""
+    timed = {name.split()[0] for name in names}
+    public = {m for m in dir(Database) if not m.startswith('_') and callable(getattr(Database, m))}
+    return sorted(public - timed - NOT_TIMED)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Print new/old best-time ratios; returns the names that got slower than ``threshold``.
+
+    Timings under ``min_ms`` in both runs are mostly noise and never flagged.
+    """
+    slower = []
+    print(f"{'':44} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for label, scale in results['scales'].items():
+        old_cases = baseline.get('scales', {}).get(label, {}).get('cases', {})
+        for name, case in scale['cases'].items():
+            old = old_cases.get(name)
+            if old is None:
+                continue
+            ratio = case['best_ms'] / max(old['best_ms'], 1e-6)
+            flag = ''
+            if max(case['best_ms'], old['best_ms']) < min_ms:
+                pass
+            elif ratio > threshold:
+                flag = '  SLOWER'
+                slower.append(f"{label} {name}")
+            elif ratio < 1 / threshold:
+                flag = '  faster'
+            print(f"{label:>4} {name[:39]:39} {old['best_ms']:10.2f} {case['best_ms']:10.2f} {ratio:7.2f}{flag}")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['10k', '100k'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="results file (default: bench-<commit>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="results file of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="slowdown ratio that --compare reports as a regression (default: %(default)s)")
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help="--compare ignores timings below this in both runs (default: %(default)s)")
+    parser.add_argument('--no-qt', action='store_true', help="skip TaskScreen.refresh")
+    args = parser.parse_args(argv)
+
+    commit, dirty = git_revision()
+    results = {
+        'commit': commit,
+        'dirty': dirty,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'scales': {},
+    }
+    for label in args.scales:
+        results['scales'][label] = run_scale(label, SCALES[label], args.repeat, not args.no_qt)
+        for name, case in results['scales'][label]['cases'].items():
+            print(f"{label:>4} {name:50} {case['best_ms']:10.2f} ms", file=sys.stderr)
+    results['untimed'] = untimed(name for scale in results['scales'].values() for name in scale['cases'])
+    if results['untimed']:
+        print(f"warning: Database methods without a benchmark: {', '.join(results['untimed'])}", file=sys.stderr)
+
+    output = args.output or f"bench-{commit or 'unknown'}{'-dirty' if dirty else ''}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold, args.min_ms)
+        if slower:
+            print(f"{len(slower)} timings slower than {args.threshold}x the baseline", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Synthetic industrial workload built from ``industrial_datasets.INDUSTRIAL_TASKS``.
+
+A history is a stream of work orders. Each order runs every operation of one
+template group in turn: a parent task for the order and one child task per
+operation, done by one of a crew of operators for the template's role, with
+the actual time jittered around the template's ``standard_time``. Operators
+work their orders back to back, so every assignee is a realistic Gantt lane.
+
+    from benchmarks import workload
+    workload.populate(db, 100_000)
+"""
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+
+from industrial_datasets import INDUSTRIAL_TASKS
+
+START = datetime(2024, 1, 1, 6)
+# Operators per template role
+CREW_SIZE = 12
+# Spread of the actual/standard time ratio (log-normal sigma); a few
+# operations in OUTLIER_RATE run much longer (rework, breakdowns)
+JITTER = 0.2
+OUTLIER_RATE = 0.03
+# Share of tasks, at the end of the history, that are not done yet
+OPEN_RATE = 0.01
+# Tasks handed to one add_tasks_bulk() call
+BATCH_SIZE = 100_000
+
+
+def actual_time(standard, rng):
+    """Seconds one operation really took: log-normal around its standard time."""
+    ratio = rng.lognormvariate(-JITTER ** 2 / 2, JITTER)
+    if rng.random() < OUTLIER_RATE:
+        ratio *= rng.uniform(1.5, 3.0)
+    return round(standard * ratio, 1)
+
+
+def work_orders(rng, start=START, crew_size=CREW_SIZE):
+    """Endless stream of work orders, each a list of ``add_tasks_bulk`` dicts.
+
+    The parent comes first and carries a ``key`` its operations point back to.
+    """
+    groups = list(INDUSTRIAL_TASKS.items())
+    clocks = {}  # operator -> when they are next free
+    order_clock = start
+    for number in itertools.count(1):
+        group, spec = rng.choice(groups)
+        operations = list(spec['tasks'].values())
+        key = f"WO{number}"
+        order = [{
+            'task_name': f"Work order {number}: {group.replace('_', ' ').title()}",
+            'description': spec['description'],
+            'category': spec['category'],
+            'standard_time': sum(op['standard_time'] for op in operations),
+            'key': key,
+        }]
+        # Orders are released a few minutes apart; each operation waits for
+        # the previous one and for its operator
+        order_clock += timedelta(seconds=rng.expovariate(1 / 300))
+        clock = order_clock
+        for op in operations:
+            operator = f"{op['assigned_to']} {rng.randrange(1, crew_size + 1)}"
+            began = max(clock, clocks.get(operator, start))
+            took = actual_time(op['standard_time'], rng)
+            clock = began + timedelta(seconds=took)
+            clocks[operator] = clock
+            order.append({
+                'task_name': op['name'],
+                'description': op['description'],
+                'assigned_to': operator,
+                'category': spec['category'],
+                'standard_time': op['standard_time'],
+                'total_time': took,
+                'start_time': began,
+                'end_time': clock,
+                'status': 'Completed',
+                'parent_key': key,
+            })
+        order[0].update(total_time=round(sum(t['total_time'] for t in order[1:]), 1), status='Completed')
+        yield order
+
+
+def tasks(n_tasks, seed=0, start=START):
+    """Exactly ``n_tasks`` task dicts, in batches of whole work orders.
+
+    Yields lists of at most about BATCH_SIZE tasks, so the keys of one
+    order never straddle two ``add_tasks_bulk`` calls. The last OPEN_RATE of
+    the tasks are left Pending, without times.
+    """
+    rng = random.Random(seed)
+    open_from = n_tasks - math.ceil(n_tasks * OPEN_RATE)
+    made = 0
+    batch = []
+    for order in work_orders(rng, start):
+        order = order[:n_tasks - made]
+        if made >= open_from:
+            for task in order:
+                for field in ('total_time', 'start_time', 'end_time'):
+                    task.pop(field, None)
+                task['status'] = 'Pending'
+        batch.extend(order)
+        made += len(order)
+        if made >= n_tasks or len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+        if made >= n_tasks:
+            return
+
+
+def populate(db, n_tasks, seed=0, start=START):
+    """Fill ``db`` with ``n_tasks`` tasks; returns (first id, last id)."""
+    first = last = None
+    for batch in tasks(n_tasks, seed, start):
+        ids = db.add_tasks_bulk(batch)
+        first = ids[0] if first is None else first
+        last = ids[-1]
+    return first, last
+
+
+def equipment_events(eq_ids, n_events, seed=0, start=START, days=90):
+    """(equipment id, epoch seconds, kind, value) for ``record_equipment_events``."""
+    rng = random.Random(seed)
+    t0 = start.timestamp()
+    for _ in range(n_events):
+        kind = rng.choices(('output', 'scrap', 'downtime'), weights=(80, 15, 5))[0]
+        value = rng.random() * 0.5 if kind == 'downtime' else rng.randint(1, 20)
+        yield rng.choice(eq_ids), t0 + rng.random() * days * 86400, kind, value
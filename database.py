@@ -1,21 +1,947 @@
 # database.py
+import math
+import queue
+import re
 import sqlite3
-from datetime import datetime
+import sys
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+# Read-only connections kept per database file. The GUI has four screens, so
+# four readers cover the common case without any of them waiting. Past that,
+# a reader waits this long for one to come back before it opens an extra
+# connection for itself, and a thread already holding one never waits.
+READER_POOL_SIZE = 4
+READER_WAIT_SECONDS = 1.0
+
+# Applied to every connection. journal_mode is persistent in the file, so it
+# only needs to be set by the writer.
+WRITER_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),   # durable at checkpoints, no fsync per commit in WAL
+    ('cache_size', -16000),      # negative = KiB, ~16 MB page cache
+    ('mmap_size', 268435456),    # 256 MB memory-mapped I/O
+    ('temp_store', 'MEMORY'),
+)
+READER_PRAGMAS = (
+    ('cache_size', -16000),
+    ('mmap_size', 268435456),
+    ('temp_store', 'MEMORY'),
+)
+
+# Archive files one query attaches at once. SQLite allows ten attached
+# databases per connection; the rest are left for callers.
+ARCHIVE_ATTACH_LIMIT = 8
+# Tasks archived per transaction
+ARCHIVE_BATCH_SIZE = 5000
+
+# Tasks search_tasks() returns, and how many of the newest matches of each
+# of SEARCH_TIERS it ranks to pick them: a short prefix can match most of
+# the table, and ranking all of it costs up to a second at 1M tasks
+SEARCH_LIMIT = 50
+SEARCH_CANDIDATES = 200
+# Longest prefix the search index keeps a prefix index for. Longer words are
+# looked up by their first SEARCH_PREFIX characters and checked here, as long
+# as enough rows pass to fill the candidates within SEARCH_SCAN_ROWS; past
+# that, FTS5 is left to find the rest itself
+SEARCH_PREFIX = 3
+SEARCH_SCAN_ROWS = 2000
+# Ranking weight of each of SEARCH_COLUMNS
+SEARCH_WEIGHTS = (10.0, 1.0, 4.0, 4.0)
+# Columns search_tasks() collects candidates from separately, heaviest first
+# (None: any column), so an old match in the name still outranks any number
+# of newer ones in the description
+SEARCH_TIERS = (('task_name',), ('assigned_to', 'category'), None)
+
+# Memory budget of the query result cache, per database file. A single
+# result larger than a quarter of it is never cached.
+QUERY_CACHE_BYTES = 64 * 1024 * 1024
+# Row versions remembered before they are folded into table versions
+QUERY_CACHE_MAX_ROWS = 100_000
+
+
+# Production calendar for equipment rollups: the production day starts with
+# the first shift, and a production week on Monday at that time, so every
+# week is made of whole days and every day of whole shifts.
+SHIFT_START_HOUR = 6
+SHIFT_HOURS = 8
+PERIOD_HOURS = {'shift': SHIFT_HOURS, 'day': 24, 'week': 24 * 7}
+
+
+def _bucket_bounds(ts, period):
+    """(start, end) epoch seconds of the ``period`` bucket holding ``ts`` (local time)."""
+    # Buckets start on a local hour, so the instants of an epoch hour share
+    # the bounds of its start, except in zones off UTC by a half hour, where
+    # a bucket can end inside the epoch hour and the next one holds the rest
+    lo, hi = _bucket_bounds_at(int(ts // 3600) * 3600, period)
+    if ts >= hi:
+        lo, hi = _bucket_bounds_at(hi, period)
+    if not lo <= ts < hi:
+        raise ValueError(f"no {period} bucket holds {ts!r} (found [{lo}, {hi}))")
+    return lo, hi
+
+
+@lru_cache(maxsize=65536)
+def _bucket_bounds_at(ts, period):
+    """_bucket_bounds() of the whole epoch second ``ts``, from its local clock time."""
+    clock = datetime.fromtimestamp(ts) - timedelta(hours=SHIFT_START_HOUR)
+    day = clock.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'shift':
+        start = day + timedelta(hours=clock.hour // SHIFT_HOURS * SHIFT_HOURS)
+    elif period == 'day':
+        start = day
+    else:
+        start = day - timedelta(days=day.weekday())
+    start += timedelta(hours=SHIFT_START_HOUR)
+    return int(start.timestamp()), int((start + timedelta(hours=PERIOD_HOURS[period])).timestamp())
+
+
+# Adds the own time of every task matching ``{nodes}`` to its WBS roll-up
+# row and to the row of each of its ancestors, creating rows as needed.
+WBS_ROLLUP_ACCUMULATE = '''
+WITH RECURSIVE anc(node, ancestor) AS (
+    SELECT id, id FROM tasks WHERE {nodes}
+    UNION
+    SELECT anc.node, t.parent_task_id FROM anc JOIN tasks t ON t.id = anc.ancestor
+    WHERE t.parent_task_id IS NOT NULL
+)
+INSERT INTO wbs_rollups (task_id, total_time, standard_time, node_count)
+SELECT anc.ancestor, SUM(COALESCE(n.total_time, 0)), SUM(COALESCE(n.standard_time, 0)), COUNT(*)
+FROM anc JOIN tasks n ON n.id = anc.node
+WHERE anc.ancestor IN (SELECT id FROM tasks)
+GROUP BY anc.ancestor
+ON CONFLICT (task_id) DO UPDATE SET
+    total_time = total_time + excluded.total_time,
+    standard_time = standard_time + excluded.standard_time,
+    node_count = node_count + excluded.node_count
+'''
+
+
+def _epoch_ms(value):
+    """Epoch milliseconds of a datetime or an ISO timestamp string."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp() * 1000)
+
+
+def _epoch_us(value):
+    """Epoch microseconds of a datetime or an ISO timestamp string."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return round(value.timestamp() * 1_000_000)
+
+
+def _from_stored(value):
+    """datetime of a stored task timestamp, epoch microseconds or ISO text."""
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value / 1e6)
+    return datetime.fromisoformat(value)
+
+
+def to_local_time(value):
+    """``value``, a datetime, as the naive local time task times are stored in.
+
+    An aware value is converted to the local zone first. Raises ValueError
+    for a time outside the platform's epoch range, since task times are also
+    stored as epoch milliseconds and microseconds.
+    """
+    try:
+        if value.tzinfo:
+            value = value.astimezone().replace(tzinfo=None)
+        value.timestamp()
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f"time out of range: {value}") from None
+    return value
+
+
+# _epoch_us() of a local ISO timestamp column, in SQL. SQLite parses only
+# milliseconds, so whole seconds and microseconds are read apart.
+EPOCH_US_SQL = '''(CAST(strftime('%s', substr({column}, 1, 19), 'utc') AS INTEGER) * 1000000
+    + CASE WHEN substr({column}, 20, 1) = '.' THEN CAST(substr({column} || '00000', 21, 6) AS INTEGER) ELSE 0 END)'''
+
+
+def _add_epoch_triggers(cursor):
+    """Keep start_us/end_us equal to start_time/end_time whoever writes them.
+
+    A process that opened the database before migrate_to_epoch_timestamps()
+    only writes the ISO text; these triggers fill in the integers for it.
+    Database's own writers fill them in themselves, fail the WHEN and cost
+    no update. The trigger stamps the row's version itself, so its update
+    takes one version, not another round of the version trigger.
+    """
+    start, end = EPOCH_US_SQL.format(column='NEW.start_time'), EPOCH_US_SQL.format(column='NEW.end_time')
+    for name, event in (('insert', 'INSERT'), ('update', 'UPDATE OF start_time, end_time')):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS tasks_epoch_{name} AFTER {event} ON tasks
+        WHEN NEW.start_us IS NOT {start} OR NEW.end_us IS NOT {end} BEGIN
+            UPDATE row_version SET version = version + 1 WHERE id = 1;
+            UPDATE tasks SET start_us = {start}, end_us = {end},
+                             version = (SELECT version FROM row_version WHERE id = 1)
+            WHERE id = NEW.id;
+        END
+        ''')
+
+
+def _backfill_segments(cursor):
+    """Give every already-timed task the segment its timestamps describe."""
+    reader = cursor.connection.cursor()
+    reader.execute('SELECT id, assigned_to, start_time, end_time FROM tasks WHERE start_time IS NOT NULL')
+    while True:
+        rows = reader.fetchmany(1000)
+        if not rows:
+            break
+        segments = []
+        for task_id, operator, start_time, end_time in rows:
+            try:
+                segments.append((task_id, operator, _epoch_ms(start_time),
+                                 _epoch_ms(end_time) if end_time else None))
+            except ValueError:
+                continue
+        cursor.executemany(
+            'INSERT INTO task_segments (task_id, operator, start_ms, end_ms) VALUES (?, ?, ?, ?)', segments)
+
+
+# Tables whose rows change in place, with the clause matching a trigger's NEW
+# row. Every insert or update stamps the row with the next value of the
+# database-wide row_version counter, which incremental exports use as a
+# watermark. Updates are stamped by a trigger unless the statement sets the
+# version itself; inserts must always take one from _next_version(), as a
+# per-row insert trigger would cost bulk inserts about a third of their speed.
+# equipment_rollups is left out: it is derived from equipment_events, and a
+# version on it would slow event ingest by some 40%.
+VERSIONED_TABLES = {
+    'tasks': 'id = NEW.id',
+    'task_segments': 'id = NEW.id',
+    'equipment': 'id = NEW.id',
+}
+
+
+def _add_row_versions(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS row_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)
+    ''')
+    # Everything written before versioning belongs to version 1
+    cursor.execute('INSERT OR IGNORE INTO row_version (id, version) VALUES (1, 1)')
+    for table, match in VERSIONED_TABLES.items():
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        cursor.execute(f'UPDATE {table} SET version = 1')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_version ON {table}(version)')
+        stamp = f'''
+            UPDATE row_version SET version = version + 1 WHERE id = 1;
+            UPDATE {table} SET version = (SELECT version FROM row_version WHERE id = 1) WHERE {match};
+        '''
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_version_update AFTER UPDATE ON {table}
+        WHEN NEW.version = OLD.version BEGIN {stamp} END
+        ''')
+
+
+def _next_version(cursor):
+    """Take the next row version, for rows the caller inserts or stamps itself."""
+    cursor.execute('UPDATE row_version SET version = version + 1 WHERE id = 1')
+    cursor.execute('SELECT version FROM row_version WHERE id = 1')
+    return cursor.fetchone()[0]
+
+
+# Tables replicated between stations through the change log: the columns
+# shipped, and the column referring to a task (shipped as the task's global id)
+REPLICATED_TABLES = {
+    'tasks': (('task_name', 'description', 'assigned_to', 'start_time', 'end_time', 'total_time',
+               'standard_time', 'efficiency', 'status', 'category'), 'parent_task_id'),
+    'task_segments': (('operator', 'start_ms', 'end_ms'), 'task_id'),
+    'equipment': (('equipment_name', 'planned_time', 'downtime', 'actual_output', 'good_units',
+                   'standard_output'), None),
+}
+
+
+def _add_change_log(cursor):
+    """Station identity, global row ids and the change log replication ships.
+
+    Every database gets a random station id. A row's global id is its
+    ``origin`` column when it was replicated from elsewhere, else
+    ``<station id>:<row id>``. The change log holds one entry per changed row,
+    renumbered on every change, so everything changed after a watermark is
+    one range scan and the log never outgrows the tables; deleted rows leave
+    a tombstone. Triggers log updates, once the version trigger has stamped
+    the row so each update logs once, and deletes. Inserts are logged by
+    their writer through _log_inserts(), as with row versions: a per-row
+    insert trigger would cost bulk inserts about a third of their speed.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS station (id INTEGER PRIMARY KEY CHECK (id = 1), station_id TEXT NOT NULL)
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO station (id, station_id) VALUES (1, ?)', (uuid.uuid4().hex,))
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        origin TEXT,
+        deleted INTEGER NOT NULL DEFAULT 0
+    )''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_change_log_row ON change_log(table_name, row_id)')
+    # How far each station's log has been applied here
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sync_progress (
+        station TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        applied INTEGER NOT NULL,
+        updated_at TEXT
+    )''')
+    for table in REPLICATED_TABLES:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN origin TEXT')
+        cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_origin ON {table}(origin) '
+                       f'WHERE origin IS NOT NULL')
+        # Rows written before the log existed are all unshipped changes
+        cursor.execute(f"INSERT INTO change_log (table_name, row_id) SELECT '{table}', id FROM {table} ORDER BY id")
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE ON {table}
+        WHEN NEW.version <> OLD.version BEGIN
+            INSERT OR REPLACE INTO change_log (table_name, row_id) VALUES ('{table}', NEW.id);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table} BEGIN
+            INSERT OR REPLACE INTO change_log (table_name, row_id, origin, deleted)
+            VALUES ('{table}', OLD.id, OLD.origin, 1);
+        END
+        ''')
+
+
+SEARCH_COLUMNS = ('task_name', 'description', 'assigned_to', 'category')
+SEARCH_TOKEN = re.compile(r'[^\W_]+')
+
+
+def _add_task_search(cursor):
+    """Full-text index over the task text columns, kept current by triggers.
+
+    An external-content FTS5 table: it stores only the index and reads the
+    text from tasks. Prefixes of up to three characters (SEARCH_PREFIX) have
+    their own indexes, so search-as-you-type never merges the matches of
+    every word sharing a prefix.
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    new = ', '.join(f'NEW.{column}' for column in SEARCH_COLUMNS)
+    old = ', '.join(f'OLD.{column}' for column in SEARCH_COLUMNS)
+    cursor.execute(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+        {columns}, content='tasks', content_rowid='id', prefix='1 2 3', tokenize='unicode61 remove_diacritics 2'
+    )''')
+    cursor.execute("INSERT INTO task_search (task_search) VALUES ('rebuild')")
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_search_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_search (rowid, {columns}) VALUES (NEW.id, {new});
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_search_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO task_search (task_search, rowid, {columns}) VALUES ('delete', OLD.id, {old});
+    END
+    ''')
+    # Timing updates rewrite the row without touching its text
+    changed = ' OR '.join(f'NEW.{column} IS NOT OLD.{column}' for column in SEARCH_COLUMNS)
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS tasks_search_update AFTER UPDATE OF {columns} ON tasks WHEN {changed} BEGIN
+        INSERT INTO task_search (task_search, rowid, {columns}) VALUES ('delete', OLD.id, {old});
+        INSERT INTO task_search (rowid, {columns}) VALUES (NEW.id, {new});
+    END
+    ''')
+
+
+def _search_text(text):
+    """``text`` casefolded and without diacritics, as the search index reads it."""
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return text.casefold()
+
+
+def _search_words(text):
+    """Words of ``text`` as the search index tokenizes them."""
+    return SEARCH_TOKEN.findall(_search_text(text)) if text else []
+
+
+def _rank_matches(matches, words, limit):
+    """Ids of the ``limit`` best of ``matches``, ``[(id, words of each column)]``.
+
+    BM25's term frequency and length normalization with SEARCH_WEIGHTS per
+    column, as FTS5's bm25() scores; its IDF is left out, as every match
+    holds every word. Ties go to the newest task.
+    """
+    if not matches:
+        return []
+    k1, b = 1.2, 0.75
+    lengths = [sum(len(column) for column in columns) for _, columns in matches]
+    average = sum(lengths) / len(lengths) or 1
+    scored = []
+    for (task_id, columns), length in zip(matches, lengths):
+        norm = k1 * (1 - b + b * length / average)
+        score = 0.0
+        for word in words:
+            tf = sum(weight * sum(1 for token in column if token.startswith(word))
+                     for weight, column in zip(SEARCH_WEIGHTS, columns))
+            score += tf * (k1 + 1) / (tf + norm)
+        scored.append((-score, -task_id))
+    scored.sort()
+    return [-task_id for _, task_id in scored[:limit]]
+
+
+def _log_inserts(cursor, table, where, params=()):
+    """Log the rows of ``table`` matching ``where`` as changed, after inserting them."""
+    cursor.execute(f"""
+    INSERT OR REPLACE INTO change_log (table_name, row_id) SELECT '{table}', id FROM {table} WHERE {where}
+    """, params)
+
+
+def _tier_select(schemas, columns, where):
+    """One SELECT of ``columns`` over the tasks of every schema in ``schemas``, as a UNION ALL."""
+    return ' UNION ALL '.join(f'SELECT {columns} FROM {schema}.tasks WHERE {where}' for schema in schemas)
+
+
+def _result_size(value):
+    """Rough memory footprint of a query result, estimated from a few rows."""
+    rows = value if isinstance(value, list) else [value]
+    sample = [row for row in rows[:8] if row is not None]
+    if not sample:
+        return sys.getsizeof(rows)
+    per_row = sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in sample) / len(sample)
+    return sys.getsizeof(rows) + int(per_row * len(rows))
+
+
+# Query cache dependencies of results read from a whole table
+ALL_TASKS = (('tasks', None),)
+ALL_EQUIPMENT = (('equipment', None),)
+
+
+class QueryCache:
+    """LRU cache of read results with version-based invalidation.
+
+    Every entry lists the rows or tables it was read from, as ``(table, row
+    id)`` or ``(table, None)``, and the versions they had before the read.
+    Writes report what they changed (see ``Database._changed``) once their
+    transaction has ended: a changed row bumps its own version and its
+    table's, a change to unknown rows bumps the table's and all its rows'.
+    An entry is served only while every version it depends on is unchanged,
+    so a write invalidates exactly the results that could have seen it.
+    """
+
+    def __init__(self, budget=QUERY_CACHE_BYTES):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, deps, versions, size)
+        self._clock = 0
+        self._epoch = 0   # bumped by clear()
+        self._tables = {}  # table -> version of its last change
+        self._whole = {}   # table -> version of its last change to unknown rows
+        self._rows = {}    # (table, row id) -> version of the row's last change
+
+    def _versions(self, deps):
+        return (self._epoch,) + tuple(
+            self._tables.get(table, 0) if row is None else (self._whole.get(table, 0), self._rows.get((table, row), 0))
+            for table, row in deps)
+
+    def versions(self, deps):
+        """Current versions of ``deps``; take them before running the query."""
+        with self._lock:
+            return self._versions(deps)
+
+    def get(self, key):
+        """``(True, value)`` for a current entry, else ``(False, None)``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, deps, versions, size = entry
+                if self._versions(deps) == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.size -= size
+            self.misses += 1
+            return False, None
+
+    def put(self, key, deps, versions, value):
+        """Store a result read after ``versions()`` returned ``versions``."""
+        size = _result_size(value)
+        if size > self.budget // 4:
+            return
+        with self._lock:
+            if self._versions(deps) != versions:
+                # A write ended while the query ran
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[3]
+            self._entries[key] = (value, deps, versions, size)
+            self.size += size
+            while self.size > self.budget:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted[3]
+
+    def invalidate(self, changes):
+        """Apply ``(table, row ids or None)`` changes; a None table means anything."""
+        if not changes:
+            return
+        with self._lock:
+            self._clock += 1
+            for table, ids in changes:
+                if table is None:
+                    self._clear()
+                    continue
+                self._tables[table] = self._clock
+                if ids is None:
+                    self._whole[table] = self._clock
+                else:
+                    for row in ids:
+                        self._rows[(table, row)] = self._clock
+            if len(self._rows) > QUERY_CACHE_MAX_ROWS:
+                for table in {table for table, _ in self._rows}:
+                    self._whole[table] = self._clock
+                self._rows.clear()
+
+    def _clear(self):
+        self._epoch += 1
+        self._entries.clear()
+        self.size = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+
+class ConnectionManager:
+    """Process-wide owner of the connections to one SQLite file.
+
+    There is one writer connection, guarded by ``write_lock``, and a small pool
+    of read-only connections. Every ``Database`` pointing at the same file
+    shares the same manager, so the schema is created once and all screens see
+    each other's writes as soon as they are committed.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+    # sqlite3 trace callback given to every new connection (see profiling.py)
+    trace_callback = None
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.in_memory = db_name in ('', ':memory:')
+        self.refcount = 0
+        self.schema_ready = False
+        self.write_lock = threading.RLock()
+        self.tx_depth = 0
+        self.tx_owner = None
+        self.task_columns = ()
+        self.epoch_columns = None
+        self.station_id = None
+        self.writer = sqlite3.connect(db_name, check_same_thread=False)
+        self._apply_pragmas(self.writer, WRITER_PRAGMAS)
+        if self.trace_callback:
+            self.writer.set_trace_callback(self.trace_callback)
+        self.cache = QueryCache()
+        # What the current transaction changed, applied to the cache when it
+        # ends; ``declared`` tells whether the innermost _write() reported any
+        self.changes = []
+        self.declared = False
+        self.data_version = self.writer.execute('PRAGMA data_version').fetchone()[0]
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._held = threading.local()  # readers borrowed by the current thread
+
+    @classmethod
+    def _key(cls, db_name):
+        if db_name in ('', ':memory:'):
+            return None
+        return str(Path(db_name).resolve())
+
+    @classmethod
+    def acquire(cls, db_name):
+        key = cls._key(db_name)
+        with cls._instances_lock:
+            manager = cls._instances.get(key) if key else None
+            if manager is None:
+                manager = cls(db_name)
+                if key:
+                    cls._instances[key] = manager
+            manager.refcount += 1
+            return manager
+
+    def release(self):
+        with self._instances_lock:
+            self.refcount -= 1
+            if self.refcount > 0:
+                return
+            key = self._key(self.db_name)
+            if key and self._instances.get(key) is self:
+                del self._instances[key]
+        self.close()
+
+    @staticmethod
+    def _apply_pragmas(conn, pragmas):
+        for name, value in pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+
+    def _open_reader(self):
+        uri = Path(self.db_name).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._apply_pragmas(conn, READER_PRAGMAS)
+        if self.trace_callback:
+            conn.set_trace_callback(self.trace_callback)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Hold the writer for a block of statements that commit together.
+
+        Blocks nest on the owning thread; only the outermost one commits, and an
+        exception escaping it rolls the whole block back.
+        """
+        with self.write_lock:
+            if self.tx_depth == 0:
+                # Take SQLite's write lock up front so read-then-write sequences
+                # cannot interleave with another process.
+                self.writer.execute('BEGIN IMMEDIATE')
+                self.tx_owner = threading.get_ident()
+            self.tx_depth += 1
+            try:
+                yield self.writer
+            except BaseException:
+                self.tx_depth -= 1
+                if self.tx_depth == 0:
+                    self.tx_owner = None
+                    self.writer.rollback()
+                    self._end_changes()
+                raise
+            self.tx_depth -= 1
+            if self.tx_depth == 0:
+                self.tx_owner = None
+                try:
+                    self.writer.commit()
+                finally:
+                    self._end_changes()
+
+    def _end_changes(self):
+        changes, self.changes = self.changes, []
+        self.cache.invalidate(changes)
+
+    def cache_ready(self):
+        """Whether this thread may use the query cache right now.
+
+        Not inside its own transaction, whose uncommitted rows nobody else
+        sees; nor while another thread holds the writer, as this needs it to
+        ask SQLite whether another process has committed (``data_version``
+        only moves for other connections' commits), which drops everything.
+        """
+        if self.tx_owner == threading.get_ident():
+            return False
+        if self.in_memory:
+            return True
+        if not self.write_lock.acquire(blocking=False):
+            return False
+        try:
+            version = self.writer.execute('PRAGMA data_version').fetchone()[0]
+        finally:
+            self.write_lock.release()
+        if version != self.data_version:
+            self.data_version = version
+            self.cache.clear()
+        return True
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection from the pool.
+
+        When the pool is exhausted, a connection of its own is opened for
+        the caller and closed afterwards, rather than waiting forever: a
+        thread holding readers open across generators (export_rows,
+        _tiers) and reading again would otherwise wait on itself.
+        """
+        if self.in_memory or self.tx_owner == threading.get_ident():
+            # A private in-memory database is only reachable through the writer,
+            # and a thread inside a transaction must see its own uncommitted rows
+            with self.write_lock:
+                yield self.writer
+            return
+        pooled = True
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                grow = self._reader_count < READER_POOL_SIZE
+                if grow:
+                    self._reader_count += 1
+            if grow:
+                conn = self._open_reader()
+            else:
+                try:
+                    if getattr(self._held, 'count', 0):
+                        raise queue.Empty
+                    conn = self._readers.get(timeout=READER_WAIT_SECONDS)
+                except queue.Empty:
+                    conn, pooled = self._open_reader(), False
+        self._held.count = getattr(self._held, 'count', 0) + 1
+        try:
+            yield conn
+        finally:
+            self._held.count -= 1
+            if pooled:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self._reader_count = 0
+        self.writer.close()
+
 
 class Database:
+    # Each step upgrades the schema by one version and PRAGMA user_version
+    # records the last one applied. Append new steps; never edit shipped ones.
+    MIGRATIONS = (
+        # 1: secondary indexes for hierarchy, filter and time-range lookups
+        (
+            'CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_task_id)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks(category)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_assigned ON tasks(assigned_to)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_time ON tasks(start_time, end_time)',
+        ),
+        # 2: make the Pareto grouping columns covering indexes, so aggregating
+        # recorded time reads the index in group order instead of the table
+        (
+            'DROP INDEX IF EXISTS idx_tasks_parent',
+            'DROP INDEX IF EXISTS idx_tasks_category',
+            'DROP INDEX IF EXISTS idx_tasks_assigned',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_parent_time ON tasks(parent_task_id, total_time)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_category_time ON tasks(category, total_time)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_assigned_time ON tasks(assigned_to, total_time)',
+            'CREATE INDEX IF NOT EXISTS idx_tasks_name_time ON tasks(task_name, total_time)',
+        ),
+        # 3: append-only equipment history and its per-shift/day/week rollups.
+        # Downtime events never cross a shift boundary (see record_equipment_events).
+        (
+            '''CREATE TABLE IF NOT EXISTS equipment_events (
+                id INTEGER PRIMARY KEY,
+                equipment_id INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                value REAL NOT NULL
+            )''',
+            'CREATE INDEX IF NOT EXISTS idx_events_equipment_ts ON equipment_events(equipment_id, ts)',
+            '''CREATE TABLE IF NOT EXISTS equipment_rollups (
+                equipment_id INTEGER NOT NULL,
+                period TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                downtime REAL NOT NULL DEFAULT 0,
+                output REAL NOT NULL DEFAULT 0,
+                scrap REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (equipment_id, period, bucket)
+            ) WITHOUT ROWID''',
+        ),
+        # 4: materialized WBS roll-ups: actual and standard time summed over
+        # each task's whole subtree, kept current by every task write
+        (
+            '''CREATE TABLE IF NOT EXISTS wbs_rollups (
+                task_id INTEGER PRIMARY KEY,
+                total_time REAL NOT NULL DEFAULT 0,
+                standard_time REAL NOT NULL DEFAULT 0,
+                node_count INTEGER NOT NULL DEFAULT 0
+            )''',
+            'DELETE FROM wbs_rollups',
+            WBS_ROLLUP_ACCUMULATE.format(nodes='1'),
+        ),
+        # 5: timing sessions. A task accumulates closed segments into
+        # total_time; open segments (end_ms NULL) are the ones running now.
+        (
+            '''CREATE TABLE IF NOT EXISTS task_segments (
+                id INTEGER PRIMARY KEY,
+                task_id INTEGER NOT NULL,
+                operator TEXT,
+                start_ms INTEGER NOT NULL,
+                end_ms INTEGER
+            )''',
+            'CREATE INDEX IF NOT EXISTS idx_segments_task ON task_segments(task_id, start_ms)',
+            'CREATE INDEX IF NOT EXISTS idx_segments_open ON task_segments(task_id) WHERE end_ms IS NULL',
+            _backfill_segments,
+        ),
+        # 6: bookkeeping for streaming imports: external keys per source, so
+        # parent references resolve across batches and runs, and how many
+        # input records of each source have been committed
+        (
+            '''CREATE TABLE IF NOT EXISTS import_keys (
+                source TEXT NOT NULL,
+                key TEXT NOT NULL,
+                task_id INTEGER NOT NULL,
+                PRIMARY KEY (source, key)
+            ) WITHOUT ROWID''',
+            'CREATE INDEX IF NOT EXISTS idx_import_keys_task ON import_keys(task_id)',
+            '''CREATE TABLE IF NOT EXISTS import_progress (
+                source TEXT PRIMARY KEY,
+                records INTEGER NOT NULL,
+                imported INTEGER NOT NULL,
+                updated_at TEXT
+            )''',
+        ),
+        # 7: row versions for incremental exports (see VERSIONED_TABLES)
+        (
+            _add_row_versions,
+        ),
+        # 8: change log and global ids for replication (see REPLICATED_TABLES)
+        (
+            _add_change_log,
+        ),
+        # 9: catalog of the archive files old tasks were moved to, with the
+        # time span each one covers (see archive_tasks)
+        (
+            '''CREATE TABLE IF NOT EXISTS archives (
+                path TEXT PRIMARY KEY,
+                tasks INTEGER NOT NULL,
+                first_start_us INTEGER,
+                last_start_us INTEGER,
+                last_end_us INTEGER
+            )''',
+            'CREATE INDEX IF NOT EXISTS idx_archives_span ON archives(first_start_us, last_end_us)',
+            'CREATE INDEX IF NOT EXISTS idx_archives_last_start ON archives(last_start_us)',
+        ),
+        # 10: full-text search over the task text (see search_tasks)
+        (
+            _add_task_search,
+        ),
+    )
+
     def __init__(self, db_name='task_tracker.db'):
         self.db_name = db_name
+        self.manager = None
         self.conn = None
-        self.create_tables()
+        self.connect()
 
     def connect(self):
         if not self.conn:
-            self.conn = sqlite3.connect(self.db_name)
+            self.manager = ConnectionManager.acquire(self.db_name)
+            self.conn = self.manager.writer
+            if not self.manager.schema_ready:
+                self.create_tables()
         return self.conn
 
+    @contextmanager
+    def transaction(self):
+        """Commit every write made inside the block at once.
+
+        ::
+
+            with db.transaction():
+                parent = db.add_task(...)
+                db.add_task(..., parent_task_id=parent)
+        """
+        self.connect()
+        with self.manager.transaction():
+            yield self
+
+    @contextmanager
+    def _write(self):
+        """Yield a cursor on the shared writer; commits unless inside transaction().
+
+        The block reports what it changes with ``_changed()``; a block that
+        reports nothing drops the whole query cache.
+        """
+        self.connect()
+        manager = self.manager
+        with manager.transaction() as conn:
+            outer, manager.declared = manager.declared, False
+            try:
+                yield conn.cursor()
+            finally:
+                if not manager.declared:
+                    manager.changes.append((None, None))
+                manager.declared = outer
+
+    def _changed(self, table, *ids):
+        """Report rows ``ids`` of ``table`` (all of them if none given) as changed."""
+        self.manager.changes.append((table, ids or None))
+        self.manager.declared = True
+
+    @contextmanager
+    def _read(self):
+        """Yield a cursor on a pooled read-only connection."""
+        self.connect()
+        with self.manager.reader() as conn:
+            yield conn.cursor()
+
+    def _query(self, deps, sql, params=(), one=False):
+        """Run a read-only query through the query cache (see QueryCache).
+
+        Results are keyed by ``sql`` and ``params``; ``deps`` are the
+        ``(table, row id or None)`` they come from. Lists are copied on the
+        way out, so callers may modify them.
+        """
+        def read():
+            with self._read() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchone() if one else cursor.fetchall()
+
+        self.connect()
+        manager = self.manager
+        if not manager.cache_ready():
+            return read()
+        key = (sql, tuple(params), one)
+        hit, value = manager.cache.get(key)
+        if not hit:
+            versions = manager.cache.versions(deps)
+            value = read()
+            manager.cache.put(key, deps, versions, value)
+        return list(value) if isinstance(value, list) else value
+
     def create_tables(self):
-        conn = self.connect()
-        cursor = conn.cursor()
+        with self._write() as cursor:
+            self._create_tables(cursor)
+            self._migrate(cursor)
+            self._load_task_columns(cursor)
+            if self.epoch_timestamps:
+                # Also for databases migrated before the triggers existed
+                _add_epoch_triggers(cursor)
+        self.manager.schema_ready = True
+
+    def _load_task_columns(self, cursor):
+        cursor.execute('PRAGMA table_info(tasks)')
+        columns = tuple(row[1] for row in cursor.fetchall())
+        self.manager.task_columns = columns
+        self.manager.epoch_columns = (
+            (columns.index('start_us'), columns.index('end_us')) if 'start_us' in columns else None)
+
+    @property
+    def epoch_timestamps(self):
+        """True once migrate_to_epoch_timestamps() has added start_us/end_us."""
+        return self.manager.epoch_columns is not None
+
+    def schema_version(self):
+        with self._read() as cursor:
+            return cursor.execute('PRAGMA user_version').fetchone()[0]
+
+    def _migrate(self, cursor):
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        for target, statements in enumerate(self.MIGRATIONS[version:], start=version + 1):
+            for step in statements:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(f'PRAGMA user_version = {target}')
+
+    def _create_tables(self, cursor):
 
         # Tasks Table
         cursor.execute('''
@@ -47,141 +973,1555 @@ class Database:
             standard_output REAL
         )
         ''')
-        conn.commit()
 
     # === TASK METHODS ===
 
     def add_task(self, task_name, description, assigned_to, standard_time=0, parent_task_id=None, category=None):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO tasks (task_name, description, assigned_to, standard_time, parent_task_id, status, category)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (task_name, description, assigned_to, standard_time, parent_task_id, 'Pending', category))
-        conn.commit()
-        return cursor.lastrowid
-
-    def start_task(self, task_id):
-        conn = self.connect()
-        cursor = conn.cursor()
-        start_time = datetime.now().isoformat()
-        cursor.execute('''
-        UPDATE tasks
-        SET start_time = ?
-        WHERE id = ?
-        ''', (start_time, task_id))
-        conn.commit()
-
-    def stop_task(self, task_id):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT start_time, standard_time FROM tasks WHERE id = ?', (task_id,))
-        result = cursor.fetchone()
-        if result and result[0]:
-            start_time_str = result[0]
-            standard_time = result[1]
-            start_time = datetime.fromisoformat(start_time_str)
-            end_time_obj = datetime.now()
-            total_time = (end_time_obj - start_time).total_seconds()
-            efficiency = total_time / standard_time if standard_time > 0 else 0
-
-            end_time = end_time_obj.isoformat()
+        with self._write() as cursor:
+            cursor.execute('''
+            INSERT INTO tasks (task_name, description, assigned_to, standard_time, parent_task_id, status, category,
+                               version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (task_name, description, assigned_to, standard_time, parent_task_id, 'Pending', category,
+                  _next_version(cursor)))
+            task_id = cursor.lastrowid
+            _log_inserts(cursor, 'tasks', 'id = ?', (task_id,))
+            cursor.execute(WBS_ROLLUP_ACCUMULATE.format(nodes='id = ?'), (task_id,))
+            self._changed('tasks', task_id)
+            self._changed('wbs_rollups')
+            return task_id
+
+    def add_tasks_bulk(self, tasks):
+        """Insert many tasks with one executemany and one commit.
+
+        ``tasks`` is an iterable of dicts using ``add_task``'s argument names.
+        A task may also carry a ``key`` and refer to an earlier task of the same
+        batch through ``parent_key`` instead of ``parent_task_id``. Historical
+        records may set ``status``, ``total_time`` and ``start_time``/``end_time``
+        (datetimes or ISO text); a task with both timestamps gets the closed
+        timing segment they describe.
+
+        Returns the new ids in input order.
+        """
+        ids = []
+        keys = {}
+        segments = []
+        epoch = self.epoch_timestamps
+        with self._write() as cursor:
+            # The writer holds an immediate transaction, so nobody else can take
+            # ids between reading the sequence and inserting.
+            cursor.execute('''
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'tasks'), 0),
+                       COALESCE((SELECT MAX(id) FROM tasks), 0))
+            ''')
+            next_id = cursor.fetchone()[0] + 1
+            version = _next_version(cursor)
+
+            def rows():
+                nonlocal next_id
+                for task in tasks:
+                    task_id = next_id
+                    next_id += 1
+                    parent_id = task.get('parent_task_id')
+                    if task.get('parent_key') is not None:
+                        parent_id = keys[task['parent_key']]
+                    if task.get('key') is not None:
+                        keys[task['key']] = task_id
+                    ids.append(task_id)
+                    standard = task.get('standard_time', 0)
+                    total = task.get('total_time') or 0
+                    efficiency = (total / standard if standard else 0) if total else None
+                    start, end = task.get('start_time'), task.get('end_time')
+                    start = start.isoformat() if isinstance(start, datetime) else start
+                    end = end.isoformat() if isinstance(end, datetime) else end
+                    if start and end:
+                        segments.append((task_id, task.get('assigned_to'), _epoch_ms(start), _epoch_ms(end), version))
+                    row = (task_id, task['task_name'], task.get('description'), task.get('assigned_to'),
+                           standard, parent_id, task.get('status', 'Pending'), task.get('category'),
+                           total, efficiency, start, end, version)
+                    if epoch:
+                        row += (_epoch_us(start) if start else None, _epoch_us(end) if end else None)
+                    yield row
+
+            cursor.executemany(f'''
+            INSERT INTO tasks (id, task_name, description, assigned_to, standard_time, parent_task_id, status, category,
+                               total_time, efficiency, start_time, end_time, version{', start_us, end_us' if epoch else ''})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?{', ?, ?' if epoch else ''})
+            ''', rows())
+            if ids:
+                # ids are contiguous, so one range covers the whole batch
+                _log_inserts(cursor, 'tasks', 'id BETWEEN ? AND ?', (ids[0], ids[-1]))
+                cursor.execute(WBS_ROLLUP_ACCUMULATE.format(nodes='id BETWEEN ? AND ?'), (ids[0], ids[-1]))
+            if segments:
+                cursor.executemany('''
+                INSERT INTO task_segments (task_id, operator, start_ms, end_ms, version) VALUES (?, ?, ?, ?, ?)
+                ''', segments)
+                _log_inserts(cursor, 'task_segments', 'task_id BETWEEN ? AND ?', (ids[0], ids[-1]))
+            for table in ('tasks', 'wbs_rollups', 'task_segments'):
+                self._changed(table)
+        return ids
+
+    def start_task(self, task_id, operator=None, at=None):
+        """Open a timing segment for ``operator`` (default: the assignee).
+
+        Several operators can time the same task at once; starting an operator
+        who is already running does nothing. ``at`` is when it happened
+        (default: now). Returns the open segment's id.
+        """
+        now = at or datetime.now()
+        with self._write() as cursor:
+            self._changed('tasks', task_id)
+            self._changed('task_segments')
+            cursor.execute('SELECT assigned_to FROM tasks WHERE id = ?', (task_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            if operator is None:
+                operator = row[0]
             cursor.execute('''
+            SELECT id FROM task_segments
+            WHERE task_id = ? AND end_ms IS NULL AND operator IS ?
+            ''', (task_id, operator))
+            running = cursor.fetchone()
+            if running:
+                return running[0]
+            cursor.execute('''
+            INSERT INTO task_segments (task_id, operator, start_ms, version)
+            VALUES (?, ?, ?, ?)
+            ''', (task_id, operator, _epoch_ms(now), _next_version(cursor)))
+            segment_id = cursor.lastrowid
+            _log_inserts(cursor, 'task_segments', 'id = ?', (segment_id,))
+            # The epoch columns go in the same statement, so the epoch trigger finds them current
+            epoch = self.epoch_timestamps
+            cursor.execute(f'''
             UPDATE tasks
-            SET end_time = ?, total_time = ?, status = 'Completed', efficiency = ?
+            SET start_time = COALESCE(start_time, ?), end_time = NULL, status = 'In Progress'
+                {', start_us = COALESCE(start_us, ?), end_us = NULL' if epoch else ''}
             WHERE id = ?
-            ''', (end_time, total_time, efficiency, task_id))
-        else:
+            ''', (now.isoformat(), *((_epoch_us(now),) if epoch else ()), task_id))
+            return segment_id
+
+    resume_task = start_task
+
+    def pause_task(self, task_id, operator=None, at=None):
+        """Close the open segment of ``operator``, or all of them if None, at
+        ``at`` (default: now).
+
+        Returns the task's accumulated total time in seconds.
+        """
+        with self._write() as cursor:
+            self._changed('tasks', task_id)
+            total_time = self._close_segments(cursor, task_id, operator, at or datetime.now())
+            cursor.execute('''
+            UPDATE tasks SET status = 'Paused'
+            WHERE id = ? AND start_time IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM task_segments WHERE task_id = tasks.id AND end_ms IS NULL)
+            ''', (task_id,))
+            return total_time
+
+    def stop_task(self, task_id, at=None):
+        """Close every open segment and complete the task at ``at`` (default: now).
+
+        Returns the task's accumulated total time in seconds.
+        """
+        now = at or datetime.now()
+        with self._write() as cursor:
+            self._changed('tasks', task_id)
+            total_time = self._close_segments(cursor, task_id, None, now)
+            cursor.execute('SELECT start_time FROM tasks WHERE id = ?', (task_id,))
+            result = cursor.fetchone()
+            if result and result[0]:
+                epoch = self.epoch_timestamps
+                cursor.execute(f'''
+                UPDATE tasks
+                SET end_time = ?, status = 'Completed'{', end_us = ?' if epoch else ''}
+                WHERE id = ?
+                ''', (now.isoformat(), *((_epoch_us(now),) if epoch else ()), task_id))
+            else:
+                cursor.execute('''
+                UPDATE tasks
+                SET status = 'Pending'
+                WHERE id = ?
+                ''', (task_id,))
+            return total_time
+
+    def _close_segments(self, cursor, task_id, operator, now):
+        """End open segments at ``now`` and add their time to the task.
+
+        total_time grows by exactly the closed time, so it is never re-summed.
+        A segment started after ``now`` (events recorded out of order) closes
+        empty. Returns the new total_time (0 for an unknown task).
+        """
+        self._changed('task_segments')
+        self._changed('wbs_rollups')
+        now_ms = _epoch_ms(now)
+        where = 'task_id = ? AND end_ms IS NULL'
+        params = [task_id]
+        if operator is not None:
+            where += ' AND operator IS ?'
+            params.append(operator)
+        cursor.execute(f'SELECT COUNT(*), COALESCE(SUM(MAX(? - start_ms, 0)), 0) FROM task_segments WHERE {where}',
+                       [now_ms] + params)
+        closing, added = cursor.fetchone()
+        added /= 1000
+        if closing:
+            cursor.execute(f'UPDATE task_segments SET end_ms = MAX(?, start_ms) WHERE {where}', [now_ms] + params)
             cursor.execute('''
             UPDATE tasks
-            SET status = 'Pending'
+            SET total_time = COALESCE(total_time, 0) + ?,
+                efficiency = CASE WHEN standard_time > 0 THEN (COALESCE(total_time, 0) + ?) / standard_time ELSE 0 END
             WHERE id = ?
-            ''', (task_id,))
-        conn.commit()
-        return total_time
+            ''', (added, added, task_id))
+            self._rollup_add(cursor, task_id, added, 0)
+        cursor.execute('SELECT total_time FROM tasks WHERE id = ?', (task_id,))
+        row = cursor.fetchone()
+        return (row[0] or 0) if row else 0
+
+    SEGMENT_COLUMNS = 'id, task_id, operator, start_ms, end_ms'
+
+    def get_segments(self, task_id):
+        """``(id, task_id, operator, start_ms, end_ms)`` of a task, oldest first."""
+        with self._read() as cursor:
+            cursor.execute(f'SELECT {self.SEGMENT_COLUMNS} FROM task_segments WHERE task_id = ? ORDER BY start_ms',
+                           (task_id,))
+            return cursor.fetchall()
+
+    def get_open_segments(self, task_id=None):
+        """Segments that are running now, for one task or for all tasks."""
+        with self._read() as cursor:
+            if task_id is None:
+                cursor.execute(f'SELECT {self.SEGMENT_COLUMNS} FROM task_segments WHERE end_ms IS NULL')
+            else:
+                cursor.execute(f'SELECT {self.SEGMENT_COLUMNS} FROM task_segments WHERE task_id = ? AND end_ms IS NULL',
+                               (task_id,))
+            return cursor.fetchall()
 
     def get_all_tasks(self):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks')
-        return cursor.fetchall()
+        return self._query(ALL_TASKS, 'SELECT * FROM tasks')
+
+    def get_tasks_page(self, after_id=0, limit=500):
+        """Up to ``limit`` tasks with an id above ``after_id``, in id order.
+
+        Keyset paging on the primary key, so every page costs the same no
+        matter how deep into the table it is.
+        """
+        return self._query(ALL_TASKS, 'SELECT * FROM tasks WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit))
+
+    def get_task_names(self, before_id=None, limit=SEARCH_LIMIT):
+        """``(id, task_name)`` of up to ``limit`` tasks below ``before_id``, newest first, for pickers."""
+        return self._query(ALL_TASKS, 'SELECT id, task_name FROM tasks WHERE id < ? ORDER BY id DESC LIMIT ?',
+                           (sys.maxsize if before_id is None else before_id, limit))
+
+    def _overlap_clauses(self, cursor, t0, t1):
+        """WHERE clauses and parameters selecting timed tasks overlapping [t0, t1)."""
+        epoch = self.epoch_timestamps
+        start_col, end_col = ('start_us', 'end_us') if epoch else ('start_time', 'end_time')
+
+        def bound(value):
+            us = _epoch_us(value) if isinstance(value, datetime) else value
+            return us if epoch else datetime.fromtimestamp(us / 1e6).isoformat()
+
+        start_idx = end_idx = ''
+        if epoch and t0 is not None and t1 is not None:
+            # Both sides are indexed; let the one selecting fewer rows drive
+            # the lookup and demote the other to a filter with unary +
+            cursor.execute('SELECT (SELECT MIN(start_us) FROM tasks), (SELECT MAX(end_us) FROM tasks)')
+            first, last = cursor.fetchone()
+            if first is not None and last is not None:
+                if last - bound(t0) < bound(t1) - first:
+                    start_idx = '+'
+                else:
+                    end_idx = '+'
+        clauses = [f'{start_col} IS NOT NULL', f'{end_col} IS NOT NULL']
+        params = []
+        if t1 is not None:
+            clauses.append(f'{start_idx}{start_col} < ?')
+            params.append(bound(t1))
+        if t0 is not None:
+            clauses.append(f'{end_idx}{end_col} > ?')
+            params.append(bound(t0))
+        return clauses, params
+
+    def get_tasks_between(self, t0=None, t1=None):
+        """Timed tasks whose [start, end] overlaps [t0, t1).
+
+        ``t0``/``t1`` are datetimes or epoch microseconds; None leaves that
+        side open. Uses the integer columns once they exist, ISO text before.
+        Tasks moved to archives the range reaches are included (see
+        archive_tasks()).
+        """
+        columns = ', '.join(self.manager.task_columns)
+        tasks = []
+        with self._read() as cursor:
+            clauses, params = self._overlap_clauses(cursor, t0, t1)
+            for tier, schemas in self._tiers(cursor, t0, t1):
+                tier.execute(_tier_select(schemas, columns, ' AND '.join(clauses)), params * len(schemas))
+                tasks.extend(tier.fetchall())
+        return tasks
+
+    def get_gantt_bars(self, t0=None, t1=None, resolution=0):
+        """Gantt bars for [t0, t1), one lane per assignee.
+
+        Within a lane, bars separated by less than ``resolution`` (a timedelta
+        or epoch microseconds; typically the time one pixel covers) are merged
+        into one, so the number of bars a lane can return is bounded by the
+        window width rather than by how many tasks it holds. ``resolution=0``
+        keeps every task as its own bar.
+
+        Returns [(lane, start, end, task_count, task_id, task_name)] ordered by
+        lane and start; start/end are datetimes and task_id/task_name are only
+        set for bars that hold a single task.
+        """
+        if isinstance(resolution, timedelta):
+            resolution = resolution // timedelta(microseconds=1)
+        if self.epoch_timestamps:
+            start_col, end_col = 'start_us', 'end_us'
+            start, end = start_col, end_col
+        else:
+            # julianday() gives the ISO text something to subtract. A day count
+            # near 2.46M only resolves to tens of microseconds, so round it to
+            # whole milliseconds: gaps then compare exactly, as in epoch mode
+            start_col, end_col = 'start_time', 'end_time'
+            start, end = (f'CAST(ROUND((julianday({col}) - 2440587.5) * 86400000) AS INTEGER) * 1000'
+                          for col in (start_col, end_col))
+        gap = resolution
+        # Tasks starting within one resolution of each other always end up in
+        # the same bar, so SQL collapses each resolution-wide bucket and only
+        # neighbouring buckets are left to join here
+        if gap > 0:
+            # Buckets already run in start order, which spares a second sort
+            bucket, order = f'CAST({start} / ? AS INTEGER)', 'bucket'
+        else:
+            bucket, order = 'id', f'MIN({start})'
+        rows = []
+        groups = 0
+        with self._read() as cursor:
+            clauses, params = self._overlap_clauses(cursor, t0, t1)
+            for tier, schemas in self._tiers(cursor, t0, t1):
+                source = _tier_select(schemas, f'assigned_to, {start_col}, {end_col}, id, task_name',
+                                      ' AND '.join(clauses))
+                tier.execute(f'''
+                SELECT COALESCE(assigned_to, '') AS lane, {bucket} AS bucket,
+                       MIN({start}), MAX({end}), MIN({start_col}), MAX({end_col}),
+                       COUNT(*), MIN(id), MIN(task_name)
+                FROM ({source})
+                GROUP BY lane, bucket
+                ORDER BY lane, {order}
+                ''', ([gap] if gap > 0 else []) + params * len(schemas))
+                rows.extend(tier.fetchall())
+                groups += 1
+        if groups > 1:
+            # Archives read in separate groups may share buckets; fold them
+            # together and put everything back in order
+            buckets = {}
+            for row in rows:
+                prev = buckets.get(row[:2])
+                buckets[row[:2]] = row if prev is None else (
+                    row[0], row[1], min(prev[2], row[2]), max(prev[3], row[3]), min(prev[4], row[4]),
+                    max(prev[5], row[5]), prev[6] + row[6], min(prev[7], row[7]), min(prev[8], row[8]))
+            rows = sorted(buckets.values(), key=lambda row: (row[0], row[1] if gap > 0 else row[2]))
+        bars = []
+        for lane, _, s, e, first, last, count, task_id, name in rows:
+            if gap > 0 and bars and bars[-1][0] == lane and s - bars[-1][2] < gap:
+                _, prev_s, prev_e, prev_first, prev_last, prev_count, _, _ = bars[-1]
+                if e > prev_e:
+                    prev_e, prev_last = e, last
+                bars[-1] = (lane, prev_s, prev_e, prev_first, prev_last, prev_count + count, None, None)
+            else:
+                bars.append((lane, s, e, first, last, count, task_id, name))
+        return [(lane, _from_stored(first), _from_stored(last), count,
+                 task_id if count == 1 else None, name if count == 1 else None)
+                for lane, _, _, first, last, count, task_id, name in bars]
+
+    def task_time_span(self):
+        """(earliest start, latest start) over all timed tasks, archived ones included, or None."""
+        column = 'start_us' if self.epoch_timestamps else 'start_time'
+        with self._read() as cursor:
+            cursor.execute(f'''
+            SELECT (SELECT MIN({column}) FROM tasks WHERE {column} IS NOT NULL),
+                   (SELECT MAX({column}) FROM tasks),
+                   (SELECT MIN(first_start_us) FROM archives),
+                   (SELECT MAX(last_start_us) FROM archives)
+            ''')
+            first, last, archived_first, archived_last = cursor.fetchone()
+        firsts = [_from_stored(value) for value in (first, archived_first) if value is not None]
+        lasts = [_from_stored(value) for value in (last, archived_last) if value is not None]
+        if not firsts:
+            return None
+        return min(firsts), max(lasts)
+
+    def migrate_to_epoch_timestamps(self, chunk_size=10_000, progress=None):
+        """Opt-in: add indexed integer start_us/end_us columns and fill them.
+
+        SQLite cannot retype the existing TEXT columns in place, so the epoch
+        microseconds go into new INTEGER columns and the ISO text is kept for
+        older readers. Rows are converted ``chunk_size`` at a time, each chunk
+        in its own transaction, so memory stays flat on any database size and
+        an interrupted run simply continues where it stopped when called
+        again. ``progress(converted)`` is called after every chunk.
+
+        Returns the number of rows converted by this call.
+        """
+        with self._write() as cursor:
+            if not self.epoch_timestamps:
+                cursor.execute('ALTER TABLE tasks ADD COLUMN start_us INTEGER')
+                cursor.execute('ALTER TABLE tasks ADD COLUMN end_us INTEGER')
+                # From here on every write fills the new columns, including
+                # those of processes that opened the database before
+                _add_epoch_triggers(cursor)
+                self._load_task_columns(cursor)
+
+        converted = 0
+        last_id = 0
+        while True:
+            with self._write() as cursor:
+                cursor.execute('''
+                SELECT id, start_time, end_time FROM tasks
+                WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, chunk_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                updates = []
+                for task_id, start_time, end_time in rows:
+                    if not start_time:
+                        continue
+                    try:
+                        updates.append((_epoch_us(start_time), _epoch_us(end_time) if end_time else None, task_id))
+                    except ValueError:
+                        continue
+                cursor.executemany('''
+                UPDATE tasks SET start_us = ?, end_us = ?
+                WHERE id = ? AND start_us IS NULL
+                ''', updates)
+                converted += cursor.rowcount if cursor.rowcount > 0 else 0
+            if progress:
+                progress(converted)
+
+        with self._write() as cursor:
+            # Each index carries the other bound, so the overlap test is settled
+            # inside whichever one drives the lookup
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_start_us ON tasks(start_us, end_us)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_end_us ON tasks(end_us, start_us)')
+        # Archives keep this database's schema, so queries read them alike
+        for path, *_ in self.get_archives():
+            archive = Database(path)
+            try:
+                archive.migrate_to_epoch_timestamps(chunk_size)
+            finally:
+                archive.close()
+        return converted
+
+    def task_interval(self, task):
+        """(start, end) datetimes of a task row, or None if it is not finished."""
+        epoch = self.manager.epoch_columns
+        if epoch:
+            start, end = task[epoch[0]], task[epoch[1]]
+            if start is None or end is None:
+                return None
+            return datetime.fromtimestamp(start / 1e6), datetime.fromtimestamp(end / 1e6)
+        if not (task[4] and task[5]):
+            return None
+        try:
+            return datetime.fromisoformat(task[4]), datetime.fromisoformat(task[5])
+        except ValueError:
+            return None
 
     def get_task(self, task_id):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        return cursor.fetchone()
+        return self._query((('tasks', task_id),), 'SELECT * FROM tasks WHERE id = ?', (task_id,), one=True)
+
+    def existing_task_ids(self, task_ids):
+        """The subset of ``task_ids`` that are tasks, as a set."""
+        wanted = list(set(task_ids))
+        found = set()
+        with self._read() as cursor:
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i:i + 500]
+                cursor.execute(f'SELECT id FROM tasks WHERE id IN ({", ".join("?" * len(chunk))})', chunk)
+                found.update(row[0] for row in cursor.fetchall())
+        return found
 
     def update_task(self, task_id, task_name, description, assigned_to, standard_time, parent_task_id=None, category=None):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE tasks
-        SET task_name = ?, description = ?, assigned_to = ?, standard_time = ?, parent_task_id = ?, category = ?
-        WHERE id = ?
-        ''', (task_name, description, assigned_to, standard_time, parent_task_id, category, task_id))
-        conn.commit()
+        with self._write() as cursor:
+            self._changed('tasks', task_id)
+            self._changed('wbs_rollups')
+            cursor.execute('SELECT standard_time, parent_task_id FROM tasks WHERE id = ?', (task_id,))
+            old = cursor.fetchone()
+            if old:
+                # Standard time changes along the current chain, then the
+                # whole subtree moves if the task was re-parented
+                self._rollup_add(cursor, task_id, 0, (standard_time or 0) - (old[0] or 0))
+                if parent_task_id != old[1]:
+                    self._rollup_move(cursor, task_id, old[1], parent_task_id)
+            cursor.execute('''
+            UPDATE tasks
+            SET task_name = ?, description = ?, assigned_to = ?, standard_time = ?, parent_task_id = ?, category = ?
+            WHERE id = ?
+            ''', (task_name, description, assigned_to, standard_time, parent_task_id, category, task_id))
 
     def delete_task(self, task_id):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-        conn.commit()
+        with self._write() as cursor:
+            self._changed('tasks', task_id)
+            for table in ('wbs_rollups', 'task_segments', 'import_keys'):
+                self._changed(table)
+            cursor.execute('SELECT parent_task_id FROM tasks WHERE id = ?', (task_id,))
+            old = cursor.fetchone()
+            if old:
+                # The subtree leaves its ancestors; orphaned children keep their own roll-ups
+                self._rollup_move(cursor, task_id, old[0], None)
+                cursor.execute('DELETE FROM wbs_rollups WHERE task_id = ?', (task_id,))
+            cursor.execute('DELETE FROM task_segments WHERE task_id = ?', (task_id,))
+            cursor.execute('DELETE FROM import_keys WHERE task_id = ?', (task_id,))
+            cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
 
     def get_children(self, parent_task_id):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks WHERE parent_task_id = ?', (parent_task_id,))
+        return self._query(ALL_TASKS, 'SELECT * FROM tasks WHERE parent_task_id = ?', (parent_task_id,))
+
+    def get_root_tasks(self):
+        """Tasks without a parent, i.e. the top level of the WBS."""
+        return self._query(ALL_TASKS, 'SELECT * FROM tasks WHERE parent_task_id IS NULL')
+
+    def find_tasks(self, status=None, category=None, assigned_to=None):
+        """Tasks matching every given filter; ``None`` means "any"."""
+        clauses = []
+        params = []
+        for column, value in (('status', status), ('category', category), ('assigned_to', assigned_to)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if not clauses:
+            return self.get_all_tasks()
+        return self._query(ALL_TASKS, 'SELECT * FROM tasks WHERE ' + ' AND '.join(clauses), params)
+
+    def search_tasks(self, text, limit=SEARCH_LIMIT):
+        """The ``limit`` tasks best matching ``text``, best first.
+
+        Every word of ``text`` must start a word of the task's name,
+        description, assignee or category. FTS5 yields matches newest first
+        at no cost per match. For each of SEARCH_TIERS, the SEARCH_CANDIDATES
+        newest matches found there are ranked here together (see
+        _rank_matches()), so a match older than that within its tier is not
+        returned. FTS5's own bm25() would rank every match, at 0.1-0.9 s per
+        keystroke at 1M tasks.
+        """
+        words = _search_words(text)
+        if not words:
+            return []
+        matches = {}
+        with self._read() as cursor:
+            for columns in SEARCH_TIERS:
+                for task_id, texts in self._search_candidates(cursor, words, columns):
+                    matches.setdefault(task_id, texts)
+            ids = _rank_matches(list(matches.items()), words, limit)
+            if not ids:
+                return []
+            cursor.execute(f"SELECT * FROM tasks WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            tasks = {t[0]: t for t in cursor.fetchall()}
+        return [tasks[task_id] for task_id in ids if task_id in tasks]
+
+    def _search_candidates(self, cursor, words, columns):
+        """The SEARCH_CANDIDATES newest ``(id, words of each column)`` matching ``words`` in ``columns``."""
+        # Long words are looked up through the prefix index of their first
+        # characters, and the rows found then checked for the whole word,
+        # longest (likely rarest) first
+        long_words = sorted((word for word in words if len(word) > SEARCH_PREFIX), key=len, reverse=True)
+        patterns = [re.compile(r'(?<![^\W_])' + word) for word in long_words]
+        rejected = [0] * len(long_words)
+        full = None
+        matches = []
+        before = None
+        scanned = 0
+        while len(matches) < SEARCH_CANDIDATES:
+            if full is None and scanned and len(matches) * SEARCH_SCAN_ROWS < scanned * SEARCH_CANDIDATES:
+                # Too few rows pass, so the word turning most away is rare
+                # behind its prefix; FTS5 looks that one up in full from here on
+                full = long_words[rejected.index(max(rejected))]
+            query = ' '.join(f'"{word if word == full else word[:SEARCH_PREFIX]}"*' for word in words)
+            if columns:
+                query = f"{{{' '.join(columns)}}} : ({query})"
+            rows = self._search_page(cursor, query, before, SEARCH_CANDIDATES)
+            for task_id, *texts in rows:
+                if patterns:
+                    text = _search_text(' '.join(value for value in texts if value))
+                    for i, pattern in enumerate(patterns):
+                        if pattern.search(text) is None:
+                            rejected[i] += 1
+                            break
+                    else:
+                        matches.append((task_id, [_search_words(value) for value in texts]))
+                else:
+                    matches.append((task_id, [_search_words(value) for value in texts]))
+                if len(matches) == SEARCH_CANDIDATES:
+                    break
+            if len(rows) < SEARCH_CANDIDATES:
+                break
+            before = rows[-1][0]
+            scanned += len(rows)
+        return matches
+
+    @staticmethod
+    def _search_page(cursor, query, before, limit):
+        """Up to ``limit`` ``(id, *SEARCH_COLUMNS)`` matching ``query`` below id ``before``, newest first."""
+        columns = ', '.join(f'tasks.{column}' for column in SEARCH_COLUMNS)
+        cursor.execute(f'''
+        SELECT tasks.id, {columns} FROM task_search JOIN tasks ON tasks.id = task_search.rowid
+        WHERE task_search MATCH ? AND task_search.rowid < ?
+        ORDER BY task_search.rowid DESC
+        LIMIT ?
+        ''', (query, sys.maxsize if before is None else before, limit))
         return cursor.fetchall()
 
+    # === WORK BREAKDOWN STRUCTURE ===
+
+    # The task itself and each of its ancestors, nearest first
+    _ANCESTRY = '''
+    WITH RECURSIVE chain(id) AS (
+        SELECT ?
+        UNION
+        SELECT t.parent_task_id FROM tasks t JOIN chain ON t.id = chain.id
+        WHERE t.parent_task_id IS NOT NULL
+    )
+    '''
+
+    def _rollup_add(self, cursor, task_id, d_total, d_standard, d_count=0):
+        """Add deltas to the roll-up of ``task_id`` and of all its ancestors."""
+        if not (d_total or d_standard or d_count):
+            return
+        cursor.execute(self._ANCESTRY + '''
+        UPDATE wbs_rollups
+        SET total_time = total_time + ?, standard_time = standard_time + ?, node_count = node_count + ?
+        WHERE task_id IN chain
+        ''', (task_id, d_total, d_standard, d_count))
+
+    def _rollup_move(self, cursor, task_id, old_parent, new_parent):
+        """Move the subtree totals of ``task_id`` from one ancestor chain to another."""
+        cursor.execute('SELECT total_time, standard_time, node_count FROM wbs_rollups WHERE task_id = ?', (task_id,))
+        subtree = cursor.fetchone()
+        if not subtree:
+            return
+        if old_parent is not None:
+            self._rollup_add(cursor, old_parent, *(-v for v in subtree))
+        if new_parent is not None:
+            self._rollup_add(cursor, new_parent, *subtree)
+
+    def get_wbs_rollup(self, task_id):
+        """Cached subtree totals of a task, read in constant time.
+
+        Returns ``(task_id, total_time, standard_time, efficiency, node_count)``
+        or None, where the subtree includes the task itself.
+        """
+        return self._query((('wbs_rollups', task_id),), '''
+        SELECT task_id, total_time, standard_time,
+               CASE WHEN standard_time > 0 THEN total_time / standard_time ELSE 0 END,
+               node_count
+        FROM wbs_rollups WHERE task_id = ?
+        ''', (task_id,), one=True)
+
+    def compute_wbs_rollup(self, task_id):
+        """Same as ``get_wbs_rollup`` but recomputed by walking the subtree."""
+        with self._read() as cursor:
+            cursor.execute('''
+            WITH RECURSIVE subtree(id) AS (
+                SELECT id FROM tasks WHERE id = ?
+                UNION
+                SELECT t.id FROM tasks t JOIN subtree ON t.parent_task_id = subtree.id
+            )
+            SELECT ?, total, standard,
+                   CASE WHEN standard > 0 THEN total / standard ELSE 0 END,
+                   nodes
+            FROM (
+                SELECT SUM(COALESCE(t.total_time, 0)) AS total,
+                       SUM(COALESCE(t.standard_time, 0)) AS standard,
+                       COUNT(*) AS nodes
+                FROM subtree JOIN tasks t ON t.id = subtree.id
+            )
+            WHERE nodes > 0
+            ''', (task_id, task_id))
+            return cursor.fetchone()
+
+    def get_descendant_ids(self, task_id):
+        """Ids of every task below ``task_id`` in the WBS, at any depth."""
+        with self._read() as cursor:
+            cursor.execute('''
+            WITH RECURSIVE subtree(id) AS (
+                SELECT id FROM tasks WHERE parent_task_id = ?
+                UNION
+                SELECT t.id FROM tasks t JOIN subtree ON t.parent_task_id = subtree.id
+            )
+            SELECT id FROM subtree
+            ''', (task_id,))
+            return [row[0] for row in cursor.fetchall()]
+
+    # === IMPORT ===
+
+    def import_tasks_batch(self, source, tasks, records):
+        """Add one batch of an import and record that ``records`` input records are done.
+
+        ``tasks`` are ``add_tasks_bulk`` dicts whose ``key``/``parent_key`` are
+        external ids scoped to ``source``. Keys are remembered across batches
+        and runs, so a task can name a parent imported by any earlier batch. A
+        task whose key was already imported, or whose parent key is unknown,
+        is skipped. The batch and the progress commit together, which is what
+        lets an interrupted import resume from ``get_import_progress()``.
+
+        Returns ``(inserted, [(index in tasks, reason), ...])``.
+        """
+        tasks = list(tasks)
+        rejected = []
+        with self._write() as cursor:
+            wanted = list({key for task in tasks for key in (task.get('key'), task.get('parent_key'))
+                           if key is not None})
+            known = {}
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i:i + 500]
+                cursor.execute(f'''
+                SELECT key, task_id FROM import_keys
+                WHERE source = ? AND key IN ({', '.join('?' * len(chunk))})
+                ''', (source, *chunk))
+                known.update(cursor.fetchall())
+
+            accepted = []
+            batch_keys = set()
+            for i, task in enumerate(tasks):
+                key, parent_key = task.get('key'), task.get('parent_key')
+                if key is not None and (key in known or key in batch_keys):
+                    rejected.append((i, f"key {key!r} was already imported"))
+                    continue
+                if parent_key is not None and parent_key not in batch_keys:
+                    if parent_key not in known:
+                        rejected.append((i, f"unknown parent key {parent_key!r}"))
+                        continue
+                    task = dict(task, parent_key=None, parent_task_id=known[parent_key])
+                if key is not None:
+                    batch_keys.add(key)
+                accepted.append(task)
+
+            ids = self.add_tasks_bulk(accepted)
+            cursor.executemany('INSERT INTO import_keys (source, key, task_id) VALUES (?, ?, ?)',
+                               [(source, task['key'], task_id) for task, task_id in zip(accepted, ids)
+                                if task.get('key') is not None])
+            cursor.execute('''
+            INSERT INTO import_progress (source, records, imported, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (source) DO UPDATE SET
+                records = excluded.records,
+                imported = imported + excluded.imported,
+                updated_at = excluded.updated_at
+            ''', (source, records, len(ids), datetime.now().isoformat()))
+        return len(ids), rejected
+
+    def get_import_progress(self, source):
+        """(input records committed, tasks inserted) so far for ``source``."""
+        with self._read() as cursor:
+            cursor.execute('SELECT records, imported FROM import_progress WHERE source = ?', (source,))
+            return cursor.fetchone() or (0, 0)
+
+    # === EXPORT ===
+
+    # Exportable table -> watermark column. Equipment events are append-only,
+    # so their id serves; most other tables are versioned (VERSIONED_TABLES).
+    # None: no watermark, every export is a full snapshot in primary key order.
+    EXPORT_TABLES = {
+        'tasks': 'version',
+        'task_segments': 'version',
+        'equipment': 'version',
+        'equipment_events': 'id',
+        'equipment_rollups': None,
+    }
+
+    def export_columns(self, table):
+        """``[(name, declared type), ...]`` of an exportable table."""
+        if table not in self.EXPORT_TABLES:
+            raise ValueError(f"unknown export table {table!r}")
+        with self._read() as cursor:
+            cursor.execute(f'PRAGMA table_info({table})')
+            return [(row[1], row[2]) for row in cursor.fetchall()]
+
+    def export_rows(self, table, after=None, chunk_size=5000):
+        """Yield the rows of ``table`` written after watermark ``after``, in chunks.
+
+        Rows come in watermark order (see ``EXPORT_TABLES``), so the last row
+        holds the watermark to pass next time; ``after`` None reads every row,
+        and tables without a watermark always do. A single statement streams the
+        whole result through ``fetchmany``: the export sees one consistent
+        snapshot and only one chunk is in memory at a time.
+        """
+        if table not in self.EXPORT_TABLES:
+            raise ValueError(f"unknown export table {table!r}")
+        column = self.EXPORT_TABLES[table]
+        with self._read() as cursor:
+            if column is None:
+                cursor.execute(f'SELECT * FROM {table}')
+            elif after is None:
+                cursor.execute(f'SELECT * FROM {table} ORDER BY {column}')
+            else:
+                cursor.execute(f'SELECT * FROM {table} WHERE {column} > ? ORDER BY {column}', (after,))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+    # === REPLICATION ===
+
+    @property
+    def station_id(self):
+        """Random id of this database; rows created here have global ids ``<station_id>:<id>``."""
+        manager = self.manager
+        if manager.station_id is None:
+            with self._read() as cursor:
+                cursor.execute('SELECT station_id FROM station WHERE id = 1')
+                manager.station_id = cursor.fetchone()[0]
+        return manager.station_id
+
+    def global_task_id(self, task_id):
+        """Id of a task that stays the same in every database it is replicated to."""
+        with self._read() as cursor:
+            cursor.execute('SELECT origin FROM tasks WHERE id = ?', (task_id,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return row[0] or f"{self.station_id}:{task_id}"
+
+    def find_global_task(self, global_id):
+        """Local id of the task with global id ``global_id``, or None."""
+        with self._read() as cursor:
+            return self._local_ids(cursor, 'tasks', [global_id]).get(global_id)
+
+    def _local_ids(self, cursor, table, global_ids):
+        """``{global id: local id}`` of the rows of ``table`` present here."""
+        wanted = list(set(global_ids))
+        own = f"{self.station_id}:"
+        found = {}
+        for i in range(0, len(wanted), 500):
+            chunk = wanted[i:i + 500]
+            cursor.execute(f'SELECT origin, id FROM {table} WHERE origin IN ({", ".join("?" * len(chunk))})', chunk)
+            found.update(cursor.fetchall())
+            # Rows created here, possibly on their way back from another station
+            mine = {int(gid[len(own):]): gid for gid in chunk if gid.startswith(own)}
+            if mine:
+                cursor.execute(f'''
+                SELECT id FROM {table} WHERE id IN ({", ".join("?" * len(mine))}) AND origin IS NULL
+                ''', list(mine))
+                found.update((mine[row[0]], row[0]) for row in cursor.fetchall())
+        return found
+
+    def changes_since(self, after=0, limit=1000):
+        """The next ``limit`` entries of this database's change log after ``after``.
+
+        Returns ``{'station', 'last_seq', 'changes'}``, where ``last_seq`` is the
+        watermark to pass next time (``after`` itself once nothing is left) and
+        each change is ``{'table', 'id', 'deleted'}`` plus, for rows that still
+        exist, their REPLICATED_TABLES columns as ``row``. Rows are named by
+        global id, including the task a row refers to. Tasks referred to but
+        not shipped yet come along, so every batch applies on its own. The
+        whole batch is plain JSON.
+        """
+        station = self.station_id
+        changes = []
+        with self._read() as cursor:
+            cursor.execute('''
+            SELECT seq, table_name, row_id, origin, deleted FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?
+            ''', (after, limit))
+            entries = cursor.fetchall()
+            wanted = {table: [] for table in REPLICATED_TABLES}
+            for _, table, row_id, origin, deleted in entries:
+                if deleted:
+                    changes.append({'table': table, 'id': origin or f"{station}:{row_id}", 'deleted': True})
+                else:
+                    wanted[table].append(row_id)
+            referred = set()
+            for table, ids in wanted.items():
+                changes.extend(self._replica_rows(cursor, table, ids, referred))
+            # Referred tasks whose entries come later in the log, and their parents
+            shipped = set(wanted['tasks'])
+            while referred - shipped:
+                missing = list(referred - shipped)[:500]
+                shipped.update(missing)
+                cursor.execute(f'''
+                SELECT row_id FROM change_log
+                WHERE table_name = 'tasks' AND row_id IN ({", ".join("?" * len(missing))}) AND seq > ? AND deleted = 0
+                ''', (*missing, after))
+                changes.extend(self._replica_rows(cursor, 'tasks', [row[0] for row in cursor.fetchall()], referred))
+        return {'station': station, 'last_seq': entries[-1][0] if entries else after, 'changes': changes}
+
+    def _replica_rows(self, cursor, table, ids, referred):
+        """Upsert changes for rows ``ids`` of ``table``; adds the task ids they refer to to ``referred``."""
+        columns, ref = REPLICATED_TABLES[table]
+        station = self.station_id
+        select = ', '.join(f't.{column}' for column in columns)
+        join = f'LEFT JOIN tasks r ON r.id = t.{ref}' if ref else ''
+        refs = f't.{ref}, r.origin' if ref else 'NULL, NULL'
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cursor.execute(f'''
+            SELECT t.id, t.origin, {refs}, {select} FROM {table} t {join}
+            WHERE t.id IN ({", ".join("?" * len(chunk))})
+            ''', chunk)
+            for row_id, origin, ref_id, ref_origin, *values in cursor.fetchall():
+                row = dict(zip(columns, values))
+                if ref:
+                    row[ref] = None if ref_id is None else ref_origin or f"{station}:{ref_id}"
+                    if ref_id is not None:
+                        referred.add(ref_id)
+                yield {'table': table, 'id': origin or f"{station}:{row_id}", 'deleted': False, 'row': row}
+
+    def apply_changes(self, batch):
+        """Apply a ``changes_since()`` batch from another database, once.
+
+        Rows are matched on global ids, so applying a batch twice changes
+        nothing, and the batch commits together with the station's watermark
+        (``get_sync_progress()``): a batch not past it is skipped. Roll-ups
+        stay current as with local writes. Returns the number of changes applied.
+        """
+        station, last_seq, changes = batch['station'], batch['last_seq'], batch['changes']
+        if station == self.station_id:
+            raise ValueError("a database cannot apply its own changes")
+        upserts = {table: [] for table in REPLICATED_TABLES}
+        deletes = {table: [] for table in REPLICATED_TABLES}
+        for change in changes:
+            (deletes if change['deleted'] else upserts)[change['table']].append(change)
+        epoch = self.epoch_timestamps
+        with self._write() as cursor:
+            for table in (*REPLICATED_TABLES, 'wbs_rollups'):
+                self._changed(table)
+            cursor.execute('SELECT seq FROM sync_progress WHERE station = ?', (station,))
+            done = cursor.fetchone()
+            if done and done[0] >= last_seq:
+                return 0
+            task_ids = [change['id'] for change in changes if change['table'] == 'tasks']
+            for change in changes:
+                ref = REPLICATED_TABLES[change['table']][1]
+                if ref and not change['deleted'] and change['row'][ref]:
+                    task_ids.append(change['row'][ref])
+            tasks = self._local_ids(cursor, 'tasks', task_ids)
+
+            # Tasks first, without parents, so a parent anywhere in the batch exists when linked
+            for change in upserts['tasks']:
+                values = {column: change['row'][column] for column in REPLICATED_TABLES['tasks'][0]}
+                if epoch:
+                    values['start_us'] = _epoch_us(values['start_time']) if values['start_time'] else None
+                    values['end_us'] = _epoch_us(values['end_time']) if values['end_time'] else None
+                task_id = tasks.get(change['id'])
+                if task_id is None:
+                    tasks[change['id']] = task_id = self._upsert_replica(cursor, 'tasks', change['id'], None, values)
+                    cursor.execute(WBS_ROLLUP_ACCUMULATE.format(nodes='id = ?'), (task_id,))
+                else:
+                    cursor.execute('SELECT total_time, standard_time FROM tasks WHERE id = ?', (task_id,))
+                    old_total, old_standard = cursor.fetchone()
+                    self._upsert_replica(cursor, 'tasks', change['id'], task_id, values)
+                    self._rollup_add(cursor, task_id, (values['total_time'] or 0) - (old_total or 0),
+                                     (values['standard_time'] or 0) - (old_standard or 0))
+            for change in upserts['tasks']:
+                task_id = tasks[change['id']]
+                parent = change['row']['parent_task_id']
+                parent_id = tasks.get(parent) if parent else None
+                cursor.execute('SELECT parent_task_id FROM tasks WHERE id = ?', (task_id,))
+                old_parent = cursor.fetchone()[0]
+                if parent_id != old_parent:
+                    self._rollup_move(cursor, task_id, old_parent, parent_id)
+                    cursor.execute('UPDATE tasks SET parent_task_id = ? WHERE id = ?', (parent_id, task_id))
+
+            for table in ('task_segments', 'equipment'):
+                columns, ref = REPLICATED_TABLES[table]
+                local = self._local_ids(cursor, table, [c['id'] for c in upserts[table] + deletes[table]])
+                for change in upserts[table]:
+                    values = {column: change['row'][column] for column in columns}
+                    if ref:
+                        values[ref] = tasks.get(change['row'][ref])
+                        if values[ref] is None:
+                            continue  # its task is gone
+                    self._upsert_replica(cursor, table, change['id'], local.get(change['id']), values)
+                for change in deletes[table]:
+                    if change['id'] in local:
+                        cursor.execute(f'DELETE FROM {table} WHERE id = ?', (local[change['id']],))
+            for change in deletes['tasks']:
+                if change['id'] in tasks:
+                    self.delete_task(tasks[change['id']])
+
+            cursor.execute('''
+            INSERT INTO sync_progress (station, seq, applied, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (station) DO UPDATE SET
+                seq = excluded.seq, applied = applied + excluded.applied, updated_at = excluded.updated_at
+            ''', (station, last_seq, len(changes), datetime.now().isoformat()))
+            return len(changes)
+
+    @staticmethod
+    def _upsert_replica(cursor, table, global_id, row_id, values):
+        """Insert (``row_id`` None) or update one replicated row; returns its local id."""
+        names = list(values)
+        if row_id is None:
+            cursor.execute(f'''
+            INSERT INTO {table} (origin, version, {", ".join(names)}) VALUES (?, ?, {", ".join("?" * len(names))})
+            ''', (global_id, _next_version(cursor), *values.values()))
+            row_id = cursor.lastrowid
+            _log_inserts(cursor, table, 'id = ?', (row_id,))
+        else:
+            # Rows already up to date stay untouched, so they are not logged
+            # again and two databases syncing both ways settle
+            cursor.execute(f'''
+            UPDATE {table} SET {", ".join(f"{name} = ?" for name in names)}
+            WHERE id = ? AND NOT ({" AND ".join(f"{name} IS ?" for name in names)})
+            ''', (*values.values(), row_id, *values.values()))
+        return row_id
+
+    def get_sync_progress(self, station):
+        """(change-log sequence applied up to, changes applied) for ``station``."""
+        with self._read() as cursor:
+            cursor.execute('SELECT seq, applied FROM sync_progress WHERE station = ?', (station,))
+            return cursor.fetchone() or (0, 0)
+
+    # === ARCHIVE ===
+
+    # Of the subtrees under {roots}, those archive_tasks() may move: every
+    # task Completed and the last one ended before the cutoff. One row per
+    # subtree: (root, tasks, last end).
+    ARCHIVABLE_SUBTREES = '''
+    WITH RECURSIVE subtree(root, id) AS (
+        SELECT id, id FROM tasks WHERE id IN ({roots})
+        UNION
+        SELECT subtree.root, t.id FROM tasks t JOIN subtree ON t.parent_task_id = subtree.id
+    )
+    SELECT subtree.root, COUNT(*), MAX(t.{end_col})
+    FROM subtree JOIN tasks t ON t.id = subtree.id
+    GROUP BY subtree.root
+    HAVING SUM(COALESCE(t.status, '') <> 'Completed') = 0 AND MAX(t.{end_col}) < ?
+    '''
+
+    def archive_tasks(self, before, directory, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+        """Move finished work that ended before ``before`` into monthly archive files.
+
+        A task moves with its whole WBS subtree, once every task in it is
+        Completed and the last one ended before ``before`` (a datetime), so
+        the roll-ups left behind stay whole. Each subtree goes, with its
+        segments and roll-ups, to ``<directory>/tasks-YYYY-MM.db`` for the
+        month it ended in, about ``batch_size`` tasks per transaction. The
+        archives have this database's schema and are listed in the
+        ``archives`` table, through which the time-range queries read them.
+
+        A batch is committed to its archive before it is deleted here, so a
+        crash in between leaves it in both, and the next run moves it again.
+        Archiving is not deleting: it leaves no tombstones in the change log,
+        so sync a station before archiving it. ``progress(archived)`` is called
+        after every batch. Returns the number of tasks archived.
+        """
+        self.connect()
+        manager = self.manager
+        epoch = self.epoch_timestamps
+        start_col, end_col = ('start_us', 'end_us') if epoch else ('start_time', 'end_time')
+        cutoff = _epoch_us(before) if epoch else before.isoformat()
+
+        with self._read() as cursor:
+            # Roots of everything that finished early enough to be a candidate;
+            # a task whose parent is gone is a root too
+            cursor.execute(f'''
+            WITH RECURSIVE up(id, parent) AS (
+                SELECT id, parent_task_id FROM tasks
+                WHERE {start_col} < ? AND {end_col} < ? AND status = 'Completed'
+                UNION
+                SELECT t.id, t.parent_task_id FROM tasks t JOIN up ON t.id = up.parent
+            )
+            SELECT id FROM up
+            WHERE parent IS NULL OR NOT EXISTS (SELECT 1 FROM tasks p WHERE p.id = up.parent)
+            ''', (cutoff, cutoff))
+            roots = [row[0] for row in cursor.fetchall()]
+            months = {}
+            for i in range(0, len(roots), 500):
+                chunk = roots[i:i + 500]
+                cursor.execute(self.ARCHIVABLE_SUBTREES.format(roots=', '.join('?' * len(chunk)), end_col=end_col),
+                               chunk + [cutoff])
+                for root, count, last_end in cursor.fetchall():
+                    try:
+                        month = _from_stored(last_end).strftime('%Y-%m')
+                    except (TypeError, ValueError):
+                        continue
+                    months.setdefault(month, []).append((root, count))
+
+        archived = 0
+        for month, subtrees in sorted(months.items()):
+            path = self._archive_file(directory, month)
+            batch, size = [], 0
+            for n, (root, count) in enumerate(subtrees, start=1):
+                batch.append(root)
+                size += count
+                if size < batch_size and n < len(subtrees):
+                    continue
+                with manager.write_lock:
+                    if manager.tx_depth:
+                        raise RuntimeError("archive_tasks() cannot run inside a transaction")
+                    # ATTACH is not allowed inside a transaction
+                    self.conn.execute('ATTACH DATABASE ? AS archive', (path,))
+                    try:
+                        archived += self._archive_batch(path, batch, start_col, end_col, cutoff)
+                    finally:
+                        self.conn.execute('DETACH DATABASE archive')
+                batch, size = [], 0
+                if progress:
+                    progress(archived)
+        return archived
+
+    def _archive_file(self, directory, month):
+        """Path of the archive for ``month``, created with this database's schema if new."""
+        path = Path(directory) / f'tasks-{month}.db'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        archive = Database(str(path))
+        try:
+            if self.epoch_timestamps and not archive.epoch_timestamps:
+                archive.migrate_to_epoch_timestamps()
+        finally:
+            archive.close()
+        return str(path.resolve())
+
+    def _archive_batch(self, path, roots, start_col, end_col, cutoff):
+        """Move the subtrees under ``roots`` to the archive attached as ``archive``."""
+        with self._write() as cursor:
+            # Checked again under the write lock: a subtree may have changed
+            # since it was picked
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS archive_move (id INTEGER PRIMARY KEY)')
+            cursor.execute('DELETE FROM temp.archive_move')
+            cursor.execute(self.ARCHIVABLE_SUBTREES.format(roots=', '.join('?' * len(roots)), end_col=end_col),
+                           roots + [cutoff])
+            roots = [row[0] for row in cursor.fetchall()]
+            if not roots:
+                return 0
+            cursor.execute(f'''
+            WITH RECURSIVE subtree(id) AS (
+                SELECT id FROM tasks WHERE id IN ({', '.join('?' * len(roots))})
+                UNION
+                SELECT t.id FROM tasks t JOIN subtree ON t.parent_task_id = subtree.id
+            )
+            INSERT INTO temp.archive_move (id) SELECT id FROM subtree
+            ''', roots)
+            # Left there by a run that crashed before deleting them here
+            cursor.execute('SELECT COUNT(*) FROM archive.tasks WHERE id IN (SELECT id FROM temp.archive_move)')
+            present = cursor.fetchone()[0]
+            for table, key in (('tasks', 'id'), ('task_segments', 'task_id'), ('wbs_rollups', 'task_id')):
+                cursor.execute(f'PRAGMA main.table_info({table})')
+                columns = ', '.join(row[1] for row in cursor.fetchall())
+                # Deleted and inserted rather than replaced, which would skip
+                # the archive's delete triggers
+                cursor.execute(f'DELETE FROM archive.{table} WHERE {key} IN (SELECT id FROM temp.archive_move)')
+                cursor.execute(f'''
+                INSERT INTO archive.{table} ({columns})
+                SELECT {columns} FROM main.{table} WHERE {key} IN (SELECT id FROM temp.archive_move)
+                ''')
+
+        with self._write() as cursor:
+            cursor.execute(f'''
+            SELECT COUNT(*), MIN({start_col}), MAX({start_col}), MAX({end_col}) FROM tasks
+            WHERE id IN (SELECT id FROM temp.archive_move)
+            ''')
+            moved, first, last, last_end = cursor.fetchone()
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+            seq = cursor.fetchone()[0]
+            cursor.execute('DELETE FROM task_segments WHERE task_id IN (SELECT id FROM temp.archive_move)')
+            cursor.execute('DELETE FROM wbs_rollups WHERE task_id IN (SELECT id FROM temp.archive_move)')
+            cursor.execute('DELETE FROM tasks WHERE id IN (SELECT id FROM temp.archive_move)')
+            # The rows live on in the archive; drop the tombstones the deletes logged
+            cursor.execute('DELETE FROM change_log WHERE seq > ?', (seq,))
+            first, last, last_end = (value if value is None or isinstance(value, int) else _epoch_us(value)
+                                     for value in (first, last, last_end))
+            cursor.execute('''
+            INSERT INTO archives (path, tasks, first_start_us, last_start_us, last_end_us) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (path) DO UPDATE SET
+                tasks = tasks + excluded.tasks,
+                first_start_us = MIN(COALESCE(first_start_us, excluded.first_start_us),
+                                     COALESCE(excluded.first_start_us, first_start_us)),
+                last_start_us = MAX(COALESCE(last_start_us, excluded.last_start_us),
+                                    COALESCE(excluded.last_start_us, last_start_us)),
+                last_end_us = MAX(COALESCE(last_end_us, excluded.last_end_us),
+                                  COALESCE(excluded.last_end_us, last_end_us))
+            ''', (path, moved - present, first, last, last_end))
+            for table in ('tasks', 'task_segments', 'wbs_rollups'):
+                self._changed(table)
+        return moved
+
+    def get_archives(self):
+        """[(path, tasks, first start, last start, last end)] of the archive files, oldest first."""
+        with self._read() as cursor:
+            cursor.execute('''
+            SELECT path, tasks, first_start_us, last_start_us, last_end_us FROM archives ORDER BY first_start_us
+            ''')
+            return [(path, tasks, *(None if value is None else _from_stored(value) for value in span))
+                    for path, tasks, *span in cursor.fetchall()]
+
+    def _archive_paths(self, cursor, t0, t1):
+        """Archive files holding tasks that may overlap [t0, t1), oldest first."""
+        clauses, params = [], []
+        if t1 is not None:
+            clauses.append('first_start_us < ?')
+            params.append(_epoch_us(t1) if isinstance(t1, datetime) else t1)
+        if t0 is not None:
+            clauses.append('last_end_us > ?')
+            params.append(_epoch_us(t0) if isinstance(t0, datetime) else t0)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        cursor.execute(f'SELECT path FROM archives{where} ORDER BY first_start_us', params)
+        return [row[0] for row in cursor.fetchall()]
+
+    def _tiers(self, cursor, t0, t1):
+        """Yield ``(cursor, schemas)`` to read the tasks overlapping [t0, t1) from, a group at a time.
+
+        The first group is ``main`` and the first archives the range reaches,
+        attached to ``cursor``'s connection as ``archive_<n>`` while the group
+        is read; further groups only hold archives, so a connection never has
+        more than ARCHIVE_ATTACH_LIMIT of them attached. Inside a transaction,
+        where a database read cannot be detached again, ``main`` is read alone
+        and the archives through a connection of their own.
+        """
+        paths = self._archive_paths(cursor, t0, t1)
+        groups = [paths[i:i + ARCHIVE_ATTACH_LIMIT] for i in range(0, len(paths), ARCHIVE_ATTACH_LIMIT)]
+        if not cursor.connection.in_transaction:
+            yield from self._attached(cursor, groups or [[]], with_main=True)
+            return
+        yield cursor, ['main']
+        if not groups:
+            return
+        conn = sqlite3.connect(':memory:')
+        if self.manager.trace_callback:
+            conn.set_trace_callback(self.manager.trace_callback)
+        try:
+            yield from self._attached(conn.cursor(), groups, with_main=False)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _attached(cursor, groups, with_main):
+        """_tiers() of ``groups`` of archive paths, each attached to ``cursor`` while it is read."""
+        for number, group in enumerate(groups):
+            attached = []
+            try:
+                for path in group:
+                    if not Path(path).exists():
+                        raise FileNotFoundError(f"Archive {path} is missing")
+                    schema = f'archive_{len(attached)}'
+                    cursor.execute(f'ATTACH DATABASE ? AS {schema}', (path,))
+                    attached.append(schema)
+                yield cursor, (['main'] if with_main and number == 0 else []) + attached
+            finally:
+                for schema in attached:
+                    cursor.execute(f'DETACH DATABASE {schema}')
+
+    # === ANALYTICS ===
+
+    # group_by name -> (query yielding one ``(k, total)`` row per group, label
+    # expression over ``k``). Labels are looked up once per group after
+    # aggregating. Each query walks a (column, total_time) covering index.
+    PARETO_GROUPS = {
+        'task': (
+            'SELECT task_name AS k, SUM(total_time) AS total FROM tasks WHERE total_time > 0 GROUP BY task_name',
+            'k',
+        ),
+        'category': (
+            'SELECT category AS k, SUM(total_time) AS total FROM tasks WHERE total_time > 0 GROUP BY category',
+            "COALESCE(k, 'Uncategorized')",
+        ),
+        # The task dialog saves a blank assignee as '', bulk adds and imports as NULL
+        'assignee': (
+            '''SELECT NULLIF(assigned_to, '') AS k, SUM(total_time) AS total FROM tasks
+               WHERE total_time > 0 GROUP BY NULLIF(assigned_to, '')''',
+            "COALESCE(k, 'Unassigned')",
+        ),
+        # A root task is its own WBS node
+        'parent': (
+            '''SELECT k, SUM(total) AS total FROM (
+                SELECT parent_task_id AS k, SUM(total_time) AS total FROM tasks
+                WHERE parent_task_id IS NOT NULL AND total_time > 0 GROUP BY parent_task_id
+                UNION ALL
+                SELECT id, total_time FROM tasks WHERE parent_task_id IS NULL AND total_time > 0
+            ) GROUP BY k''',
+            "'[' || k || '] ' || COALESCE((SELECT task_name FROM tasks WHERE id = k), '?')",
+        ),
+    }
+
+    def pareto(self, group_by='task', top_n=None):
+        """Chart-ready Pareto series of recorded time, computed in SQLite.
+
+        Groups completed time by ``group_by`` (see ``PARETO_GROUPS``), ranks the
+        groups by total time and keeps the ``top_n`` largest, folding the rest
+        into one "Other" bucket.
+
+        Returns ``[(label, total_time, cumulative_pct), ...]`` largest first.
+        """
+        grouped, label = self.PARETO_GROUPS[group_by]
+        limit = top_n if top_n else -1
+        return self._query(ALL_TASKS, f'''
+        WITH grouped AS ({grouped}),
+        ranked AS (
+            SELECT {label} AS label, total, ROW_NUMBER() OVER (ORDER BY total DESC, k) AS rank
+            FROM grouped
+        ),
+        bucketed AS (
+            SELECT CASE WHEN ? < 0 OR rank <= ? THEN label ELSE 'Other' END AS label,
+                   SUM(total) AS total,
+                   MIN(rank) AS rank
+            FROM ranked
+            GROUP BY CASE WHEN ? < 0 OR rank <= ? THEN rank ELSE ? + 1 END
+        )
+        SELECT label, total,
+               100.0 * SUM(total) OVER (ORDER BY rank ROWS UNBOUNDED PRECEDING) / SUM(total) OVER ()
+        FROM bucketed
+        ORDER BY rank
+        ''', (limit, limit, limit, limit, limit))
+
     # === EQUIPMENT METHODS ===
 
     def add_equipment(self, name, planned_time, standard_output):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-        INSERT INTO equipment (equipment_name, planned_time, standard_output)
-        VALUES (?, ?, ?)
-        ''', (name, planned_time, standard_output))
-        conn.commit()
+        with self._write() as cursor:
+            cursor.execute('''
+            INSERT INTO equipment (equipment_name, planned_time, standard_output, version)
+            VALUES (?, ?, ?, ?)
+            ''', (name, planned_time, standard_output, _next_version(cursor)))
+            eq_id = cursor.lastrowid
+            _log_inserts(cursor, 'equipment', 'id = ?', (eq_id,))
+            self._changed('equipment', eq_id)
 
     def update_equipment(self, eq_id, downtime, actual_output, good_units):
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE equipment
-        SET downtime = ?, actual_output = ?, good_units = ?
-        WHERE id = ?
-        ''', (downtime, actual_output, good_units, eq_id))
-        conn.commit()
+        """Set a machine's running totals; they can only grow.
+
+        The growth against the current totals is recorded as events at the
+        current time, so the history keeps adding up to the totals. Raises
+        ValueError if a total would shrink, or scrap would (good units
+        growing by more than output).
+        """
+        with self._write() as cursor:
+            self._changed('equipment', eq_id)
+            cursor.execute('SELECT downtime, actual_output, good_units FROM equipment WHERE id = ?', (eq_id,))
+            current = cursor.fetchone()
+            if current:
+                now = datetime.now().timestamp()
+                d_down = downtime - (current[0] or 0)
+                d_out = actual_output - (current[1] or 0)
+                d_scrap = d_out - (good_units - (current[2] or 0))
+                events = [(eq_id, now, 'downtime', d_down), (eq_id, now, 'output', d_out),
+                          (eq_id, now, 'scrap', d_scrap)]
+                for _, _, kind, value in events:
+                    if value < 0:
+                        raise ValueError(f"{kind} of machine {eq_id} cannot decrease (by {-value:g})")
+                self._record_events(cursor, [e for e in events if e[3]], update_totals=False)
+            cursor.execute('''
+            UPDATE equipment
+            SET downtime = ?, actual_output = ?, good_units = ?
+            WHERE id = ?
+            ''', (downtime, actual_output, good_units, eq_id))
+
+    EQUIPMENT_COLUMNS = 'id, equipment_name, planned_time, downtime, actual_output, good_units, standard_output'
 
     def get_equipment(self, eq_id=None):
-        conn = self.connect()
-        cursor = conn.cursor()
         if eq_id:
-            cursor.execute('SELECT * FROM equipment WHERE id = ?', (eq_id,))
-            return cursor.fetchone()
-        else:
-            cursor.execute('SELECT * FROM equipment')
+            return self._query((('equipment', eq_id),), f'SELECT {self.EQUIPMENT_COLUMNS} FROM equipment WHERE id = ?',
+                               (eq_id,), one=True)
+        return self._query(ALL_EQUIPMENT, f'SELECT {self.EQUIPMENT_COLUMNS} FROM equipment')
+
+    # === EQUIPMENT HISTORY ===
+
+    EVENT_KINDS = ('downtime', 'output', 'scrap')
+
+    def record_equipment_events(self, events):
+        """Append equipment events and fold them into the rollups.
+
+        ``events`` is an iterable of ``(equipment_id, ts, kind, value)`` with
+        ``ts`` in epoch seconds and ``kind`` one of ``EVENT_KINDS``: a downtime
+        interval starting at ``ts`` lasting ``value`` hours, or a count of
+        produced or scrapped units. The machine's running totals are updated
+        too. Returns the number of events stored. Raises ValueError, storing
+        nothing, for an unknown kind, a negative or non-finite value or a
+        non-finite time.
+        """
+        with self._write() as cursor:
+            return self._record_events(cursor, events, update_totals=True)
+
+    def _record_events(self, cursor, events, update_totals):
+        rows = []
+        rollups = {}
+        totals = {}
+        for eq_id, ts, kind, value in events:
+            if kind not in self.EVENT_KINDS:
+                raise ValueError(f"unknown equipment event kind: {kind!r}")
+            if not (isinstance(value, (int, float)) and 0 <= value < math.inf):
+                raise ValueError(f"equipment event value must be a finite number >= 0: {value!r}")
+            if not (isinstance(ts, (int, float)) and -math.inf < ts < math.inf):
+                raise ValueError(f"equipment event time must be finite epoch seconds: {ts!r}")
+            idx = self.EVENT_KINDS.index(kind)
+            if kind == 'downtime' and value > 0:
+                # Split at shift boundaries so every stored interval sits in one shift
+                end = ts + value * 3600
+                pieces = []
+                while ts < end:
+                    piece_end = min(_bucket_bounds(ts, 'shift')[1], end)
+                    if piece_end <= ts:
+                        raise RuntimeError(f"shift split stuck at {ts} splitting downtime of machine {eq_id}")
+                    pieces.append((ts, (piece_end - ts) / 3600))
+                    ts = piece_end
+            else:
+                pieces = [(ts, value)]
+            for piece_ts, piece_value in pieces:
+                rows.append((eq_id, piece_ts, kind, piece_value))
+                for period in PERIOD_HOURS:
+                    key = (eq_id, period, _bucket_bounds(piece_ts, period)[0])
+                    rollups.setdefault(key, [0, 0, 0])[idx] += piece_value
+                totals.setdefault(eq_id, [0, 0, 0])[idx] += piece_value
+
+        self._changed('equipment_events')
+        self._changed('equipment_rollups')
+        cursor.executemany(
+            'INSERT INTO equipment_events (equipment_id, ts, kind, value) VALUES (?, ?, ?, ?)', rows)
+        cursor.executemany('''
+        INSERT INTO equipment_rollups (equipment_id, period, bucket, downtime, output, scrap)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (equipment_id, period, bucket) DO UPDATE SET
+            downtime = downtime + excluded.downtime,
+            output = output + excluded.output,
+            scrap = scrap + excluded.scrap
+        ''', [key + tuple(delta) for key, delta in rollups.items()])
+        if update_totals:
+            self._changed('equipment', *totals)
+            version = _next_version(cursor)
+            cursor.executemany('''
+            UPDATE equipment
+            SET downtime = COALESCE(downtime, 0) + ?,
+                actual_output = COALESCE(actual_output, 0) + ?,
+                good_units = COALESCE(good_units, 0) + ? - ?,
+                version = ?
+            WHERE id = ?
+            ''', [(d, o, o, s, version, eq_id) for eq_id, (d, o, s) in totals.items()])
+        return len(rows)
+
+    def _window_totals(self, eq_id, start, end):
+        """(downtime hours, output, scrap) of one machine over [start, end)."""
+        buckets = {period: [] for period in PERIOD_HOURS}
+        edges = []
+        t = start
+        while t < end:
+            last = t
+            # Largest whole bucket starting at t that fits, else a partial shift
+            for period in ('week', 'day', 'shift'):
+                lo, hi = _bucket_bounds(t, period)
+                if lo == t and hi <= end:
+                    buckets[period].append(lo)
+                    t = hi
+                    break
+            else:
+                lo, hi = _bucket_bounds(t, 'shift')
+                edges.append((lo, t, min(hi, end)))
+                t = min(hi, end)
+            if t <= last:
+                raise RuntimeError(f"bucket split stuck at {t} totalling machine {eq_id}")
+
+        totals = [0.0, 0.0, 0.0]
+        with self._read() as cursor:
+            for period, keys in buckets.items():
+                if not keys:
+                    continue
+                cursor.execute(f'''
+                SELECT COALESCE(SUM(downtime), 0), COALESCE(SUM(output), 0), COALESCE(SUM(scrap), 0)
+                FROM equipment_rollups
+                WHERE equipment_id = ? AND period = ? AND bucket IN ({', '.join('?' * len(keys))})
+                ''', (eq_id, period, *keys))
+                for i, v in enumerate(cursor.fetchone()):
+                    totals[i] += v
+            for shift_start, lo, hi in edges:
+                # Events of a partial shift all start inside that shift
+                cursor.execute('''
+                SELECT ts, kind, value FROM equipment_events
+                WHERE equipment_id = ? AND ts >= ? AND ts < ?
+                ''', (eq_id, shift_start, hi))
+                for ts, kind, value in cursor.fetchall():
+                    if kind == 'downtime' and value > 0:
+                        overlap = min(hi, ts + value * 3600) - max(lo, ts)
+                        if overlap > 0:
+                            totals[0] += overlap / 3600
+                    elif lo <= ts < hi:
+                        totals[self.EVENT_KINDS.index(kind)] += value
+        return tuple(totals)
+
+    def get_oee_history(self, eq_id, period='shift', start=None, end=None):
+        """Per-bucket OEE of one machine straight from the rollups.
+
+        Returns ``[(bucket_start, name, availability, performance, quality,
+        oee_pct), ...]`` in time order; each bucket's nominal length is its
+        planned time.
+        """
+        clauses = ['r.equipment_id = ?', 'r.period = ?']
+        params = [PERIOD_HOURS[period], eq_id, period]
+        if start is not None:
+            clauses.append('r.bucket >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('r.bucket < ?')
+            params.append(end)
+        source = f'''(SELECT r.bucket AS id, e.equipment_name, ? AS planned_time, r.downtime,
+                    r.output AS actual_output, r.output - r.scrap AS good_units, e.standard_output
+                    FROM equipment_rollups r JOIN equipment e ON e.id = r.equipment_id
+                    WHERE {' AND '.join(clauses)})'''
+        with self._read() as cursor:
+            cursor.execute(self.OEE_SELECT.format(source=source) + ' ORDER BY id', params)
             return cursor.fetchall()
 
-    def compute_oee(self, eq_id):
-        eq = self.get_equipment(eq_id)
-        if not eq:
-            return 0
+    # Availability, performance and quality per machine, as fractions, with
+    # the same zero guards compute_oee has always applied: no planned time,
+    # no available time, no standard output or no output each yield 0.
+    # Availability stays within [0, 1] when downtime exceeds planned time.
+    # ``{source}`` supplies rows shaped like the equipment table.
+    OEE_SELECT = '''
+    SELECT id, equipment_name, availability, performance, quality,
+           availability * performance * quality * 100 AS oee
+    FROM (
+        SELECT id, equipment_name,
+               CASE WHEN planned_time > 0
+                    THEN MIN(MAX((planned_time - COALESCE(downtime, 0)) / planned_time, 0), 1)
+                    ELSE 0 END AS availability,
+               CASE WHEN planned_time > 0 AND planned_time - COALESCE(downtime, 0) > 0 AND standard_output > 0
+                    THEN (1.0 * COALESCE(actual_output, 0) / standard_output) / (planned_time - COALESCE(downtime, 0))
+                    ELSE 0 END AS performance,
+               CASE WHEN planned_time > 0 AND actual_output > 0
+                    THEN 1.0 * COALESCE(good_units, 0) / actual_output
+                    ELSE 0 END AS quality
+        FROM {source}
+    )
+    '''
+
+    def compute_oee(self, eq_id, start=None, end=None):
+        """OEE percentage of one machine.
 
-        _, name, planned_time, downtime, actual_output, good_units, standard_output = eq
+        Without a window this uses the machine's current totals. With epoch
+        seconds ``start``/``end`` it uses the event history of that window, and
+        the window length (in hours) is the planned time.
+        """
+        if start is None or end is None:
+            with self._read() as cursor:
+                cursor.execute(self.OEE_SELECT.format(source='equipment WHERE id = ?'), (eq_id,))
+                row = cursor.fetchone()
+            return row[5] if row else 0  # as percentage
+        breakdown = self.compute_oee_window(eq_id, start, end)
+        return breakdown[5] if breakdown else 0
 
-        if planned_time <= 0:
-            return 0
+    def compute_oee_window(self, eq_id, start, end):
+        """``(id, name, availability, performance, quality, oee_pct)`` over [start, end).
+
+        Whole shifts, days and weeks inside the window are read from
+        ``equipment_rollups``; only the partial shifts at either edge touch the
+        raw events.
+        """
+        downtime, output, scrap = self._window_totals(eq_id, start, end)
+        source = '''(SELECT id, equipment_name, ? AS planned_time, ? AS downtime,
+                    ? AS actual_output, ? AS good_units, standard_output
+                    FROM equipment WHERE id = ?)'''
+        with self._read() as cursor:
+            cursor.execute(self.OEE_SELECT.format(source=source),
+                           ((end - start) / 3600, downtime, output, output - scrap, eq_id))
+            return cursor.fetchone()
 
-        availability = (planned_time - downtime) / planned_time if planned_time > 0 else 0
-        performance = (actual_output / standard_output) / (planned_time - downtime) if (planned_time - downtime) > 0 else 0
-        quality = good_units / actual_output if actual_output > 0 else 0
+    def compute_oee_all(self):
+        """OEE breakdown for every machine in one query.
 
-        oee = availability * performance * quality
-        return oee * 100  # as percentage
+        Returns ``[(id, name, availability, performance, quality, oee_pct), ...]``
+        with the three components as fractions.
+        """
+        return self._query(ALL_EQUIPMENT, self.OEE_SELECT.format(source='equipment'))
 
     def close(self):
+        """Drop this handle; the file is closed when the last handle goes."""
         if self.conn:
-            self.conn.close()
+            self.manager.release()
+            self.manager = None
+            self.conn = None
@@ -0,0 +1,117 @@
+# diagnostics_screen.py
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog)
+import profiling
+
+
+class DiagnosticsScreen(QWidget):
+    """Hidden screen (Ctrl+Shift+D) with the timings collected by profiling.py.
+
+    One table per kind: instrumented calls (Database methods and screen
+    stages) and SQL statements, both slowest total first. Refreshes itself
+    while visible.
+    """
+
+    REFRESH_MS = 2000
+    # (header, snapshot key); None is the row's name
+    CALL_COLUMNS = (
+        ("Call", None), ("Calls", 'count'), ("Rows", 'rows'), ("Mean ms", 'mean_ms'),
+        ("p50 ms", 'p50_ms'), ("p95 ms", 'p95_ms'), ("Max ms", 'max_ms'), ("Total ms", 'total_ms'),
+    )
+    STATEMENT_COLUMNS = (
+        ("SQL", None), ("Runs", 'count'), ("Mean ms", 'mean_ms'),
+        ("p95 ms", 'p95_ms'), ("Max ms", 'max_ms'), ("Total ms", 'total_ms'),
+    )
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        self.btn_refresh = QPushButton("Refresh")
+        self.btn_reset = QPushButton("Reset")
+        self.btn_dump = QPushButton("Dump to File…")
+        top.addWidget(self.btn_refresh)
+        top.addWidget(self.btn_reset)
+        top.addWidget(self.btn_dump)
+        layout.addLayout(top)
+
+        self.status = QLabel("")
+        layout.addWidget(self.status)
+        layout.addWidget(QLabel("Calls"))
+        self.calls = self._table(self.CALL_COLUMNS)
+        layout.addWidget(self.calls)
+        layout.addWidget(QLabel("SQL statements"))
+        self.statements = self._table(self.STATEMENT_COLUMNS)
+        layout.addWidget(self.statements)
+
+        self.btn_refresh.clicked.connect(self.refresh)
+        self.btn_reset.clicked.connect(self.reset)
+        self.btn_dump.clicked.connect(self.dump)
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+        self.refresh()
+
+    @staticmethod
+    def _table(columns):
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels([header for header, _ in columns])
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().hide()
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if profiling.PROFILER.enabled:
+            self.refresh()
+            self.timer.start()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        enabled = profiling.PROFILER.enabled
+        for btn in (self.btn_refresh, self.btn_reset, self.btn_dump):
+            btn.setEnabled(enabled)
+        if not enabled:
+            self.status.setText(f"Profiling is off. Start the app with {profiling.ENV_VAR}=1 to collect timings.")
+            return
+        snapshot = profiling.PROFILER.snapshot()
+        self.status.setText(f"Since {snapshot['since']}: {len(snapshot['calls'])} calls, "
+                            f"{len(snapshot['statements'])} distinct SQL statements")
+        self._fill(self.calls, self.CALL_COLUMNS, snapshot['calls'])
+        self._fill(self.statements, self.STATEMENT_COLUMNS, snapshot['statements'])
+
+    @staticmethod
+    def _fill(table, columns, stats):
+        table.setSortingEnabled(False)
+        table.setRowCount(len(stats))
+        for row, (name, values) in enumerate(stats.items()):
+            for col, (_, key) in enumerate(columns):
+                item = QTableWidgetItem()
+                if key is None:
+                    item.setText(name)
+                    item.setToolTip(name)
+                else:
+                    value = values[key]
+                    # Numbers as data, so sorting by a column sorts numerically
+                    item.setData(Qt.DisplayRole, round(value, 3) if isinstance(value, float) else value)
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, col, item)
+        table.setSortingEnabled(True)
+
+    def reset(self):
+        profiling.PROFILER.reset()
+        self.refresh()
+
+    def dump(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Dump Profile", "profile.json", "JSON (*.json)")
+        if not path:
+            return
+        profiling.PROFILER.dump(path)
+        self.status.setText(f"Profile written to {path}")
@@ -0,0 +1,212 @@
+# exporter.py
+"""
+Streaming export of tasks, timing segments and equipment history for
+analysis in pandas or Polars.
+
+Rows are streamed out of SQLite a chunk at a time into CSV, JSON Lines,
+Parquet or Arrow IPC files, so memory stays flat whatever the table size::
+
+    python -m exporter exports/ --format parquet
+    python -m exporter exports/ --format parquet --incremental
+    python -m exporter exports/ --format csv --tables tasks task_segments
+
+Each run writes one file per table (``tasks.000003.parquet``) and records the
+watermark it reached in ``exports/manifest.json``. A plain run is a full
+snapshot and replaces the table's earlier files; ``--incremental`` writes only
+the rows inserted or changed since the last watermark. A table's current
+state is then the union of its files, keeping the highest ``version`` of each
+row id. Deleted rows are not reported. equipment_rollups has no watermark
+and is exported in full every time.
+
+Parquet and Arrow output need pyarrow (``pip install pyarrow``).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from importlib.util import find_spec
+from database import Database
+
+MANIFEST = 'manifest.json'
+CHUNK_SIZE = 10_000
+EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'parquet': 'parquet', 'arrow': 'arrow'}
+COLUMNAR = ('parquet', 'arrow')
+# SQLite declared type -> pyarrow type factory name
+ARROW_TYPES = {'INTEGER': 'int64', 'REAL': 'float64', 'TEXT': 'string'}
+
+
+class ExportError(Exception):
+    pass
+
+
+def write_csv(path, columns, chunks):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+def write_jsonl(path, columns, chunks):
+    names = [name for name, _ in columns]
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.writelines(json.dumps(dict(zip(names, row))) + '\n' for row in chunk)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportError("Parquet and Arrow output need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _arrow_schema(pa, columns):
+    return pa.schema([(name, getattr(pa, ARROW_TYPES.get(declared.upper(), 'string'))())
+                      for name, declared in columns])
+
+
+def _record_batch(pa, schema, chunk):
+    """One Arrow record batch per chunk, columns converted to the schema's types."""
+    arrays = []
+    for values, field in zip(zip(*chunk), schema):
+        if pa.types.is_integer(field.type):
+            # SQLite may hand back whole numbers stored as REAL
+            values = [int(v) if isinstance(v, float) and v.is_integer() else v for v in values]
+        elif pa.types.is_string(field.type):
+            values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(path, columns, chunks):
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(pa, columns)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            # One row group per chunk
+            writer.write_table(pa.Table.from_batches([_record_batch(pa, schema, chunk)]))
+
+
+def write_arrow(path, columns, chunks):
+    pa = _pyarrow()
+    schema = _arrow_schema(pa, columns)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(_record_batch(pa, schema, chunk))
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'parquet': write_parquet, 'arrow': write_arrow}
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {'tables': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def export_table(db, table, out_dir, fmt='csv', incremental=False, chunk_size=CHUNK_SIZE):
+    """Export one table into ``out_dir``; returns the manifest entry of the new file.
+
+    Returns None when an incremental export finds nothing new. Tables without
+    a watermark column are always exported in full. The manifest is
+    only updated after the file is complete, so an interrupted export leaves
+    the previous watermark in place and the next run repeats it.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    state = manifest['tables'].setdefault(table, {'watermark': 0, 'files': []})
+    watermark = db.EXPORT_TABLES[table]
+    incremental = incremental and watermark is not None
+    after = state['watermark'] if incremental else 0
+    columns = db.export_columns(table)
+    mark = [name for name, _ in columns].index(watermark) if watermark else None
+    stats = {'rows': 0, 'watermark': after}
+
+    def chunks():
+        # A full snapshot includes rows still at the default version 0
+        for chunk in db.export_rows(table, after if incremental else None, chunk_size):
+            stats['rows'] += len(chunk)
+            if mark is not None:
+                stats['watermark'] = chunk[-1][mark]
+            yield chunk
+
+    part = max((entry['part'] for entry in state['files']), default=0) + 1
+    name = f"{table}.{part:06d}.{EXTENSIONS[fmt]}"
+    path = os.path.join(out_dir, name)
+    try:
+        WRITERS[fmt](path + '.tmp', columns, chunks())
+    except BaseException:
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        raise
+    if incremental and not stats['rows']:
+        os.remove(path + '.tmp')
+        return None
+    os.replace(path + '.tmp', path)
+
+    entry = {'part': part, 'file': name, 'rows': stats['rows'], 'after': after,
+             'watermark': stats['watermark'], 'exported_at': datetime.now().isoformat(timespec='seconds')}
+    if not incremental:
+        # A full snapshot supersedes every earlier file of the table
+        for old in state['files']:
+            old_path = os.path.join(out_dir, old['file'])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        state['files'] = []
+    state['files'].append(entry)
+    state['watermark'] = stats['watermark']
+    save_manifest(out_dir, manifest)
+    return entry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m exporter', description="Export tables for analysis.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--db', default='task_tracker.db', help="database file (default: %(default)s)")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--tables', nargs='+', choices=sorted(Database.EXPORT_TABLES),
+                        default=sorted(Database.EXPORT_TABLES))
+    parser.add_argument('--incremental', action='store_true', help="only rows changed since the last export")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    # Located without importing it, like plotly in plotly_widget
+    if args.format in COLUMNAR and find_spec('pyarrow') is None:
+        parser.error(f"--format {args.format} needs pyarrow: pip install pyarrow")
+    if not os.path.exists(args.db):
+        parser.error(f"no such database: {args.db}")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    db = Database(args.db)
+    try:
+        for table in args.tables:
+            start = time.perf_counter()
+            entry = export_table(db, table, args.out_dir, args.format, args.incremental, args.chunk_size)
+            elapsed = time.perf_counter() - start
+            if entry is None:
+                print(f"{table}: no changes", file=sys.stderr)
+            else:
+                print(f"{table}: {entry['rows']:,} rows -> {entry['file']} "
+                      f"({entry['rows'] / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,43 +1,96 @@
 # gantt_screen.py
+from datetime import datetime, timedelta
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel
+import analytics
 from database import Database
-import plotly.express as px
-from plotly_widget import plotly_to_qwebengine
-from datetime import datetime
+from jobs import JobRunner
 
 class GanttScreen(QWidget):
+    """Gantt chart of the visible time window only.
+
+    Each assignee gets one lane. Bars closer together than a pixel are merged
+    by the database, so a figure never holds more bars than the chart can
+    draw. Zooming or panning fetches the new window at its own detail.
+    """
+
+    # Fetched on either side of the visible window so short pans stay filled
+    MARGIN = 0.5
+    # Merge bars closer together than this many pixels
+    MIN_BAR_PX = 2
+
     def __init__(self):
         super().__init__()
         self.db = Database()
         self.layout = QVBoxLayout(self)
         self.btn = QPushButton("Generate Gantt")
         self.status = QLabel("")
+        self.jobs = JobRunner(self.status, self)
         self.btn.clicked.connect(self.generate)
         self.layout.addWidget(self.btn)
         self.layout.addWidget(self.status)
         self.chart = None
+        # Bumped on every full redraw; plotly keeps the user's zoom between
+        # figures with the same uirevision
+        self.revision = 0
 
     def generate(self):
-        tasks = self.db.get_all_tasks()
-        rows = []
-        for t in tasks:
-            # t: id, name, desc, assigned_to, start_time, end_time, total_time, ...
-            if t[4] and t[5]:
-                try:
-                    start = datetime.fromisoformat(t[4])
-                    end = datetime.fromisoformat(t[5])
-                    rows.append(dict(Task=f"[{t[0]}] {t[1]}", Start=start, Finish=end, Resource=t[3] or ""))
-                except Exception:
-                    continue
+        self.revision += 1
+        self._load(None, None)
+
+    def _load(self, t0, t1):
+        width = (self.chart or self).width()
+        self.jobs.submit(self._build_chart, t0, t1, width, self.revision, on_done=self._show_chart)
+
+    def _range_changed(self, x0, x1):
+        if not (x0 and x1):
+            self._load(None, None)
+            return
+        try:
+            t0, t1 = datetime.fromisoformat(x0), datetime.fromisoformat(x1)
+        except ValueError:
+            return
+        self._load(t0, t1)
+
+    def _build_chart(self, job, t0, t1, width, revision):
+        """Runs on a pool thread; returns (figure JSON, bar count, task count).
+
+        None if no task has been timed yet; no figure if the window is empty.
+        """
+        # plotly is imported on first use, off the GUI thread
+        import plotly.express as px
+        if t0 is None:
+            span = self.db.task_time_span()
+            if span is None:
+                return None
+            t0, t1 = span
+            # The span ends at the last start; leave room for that bar
+            t1 += max((t1 - t0) / 50, timedelta(hours=1))
+        margin = (t1 - t0) * self.MARGIN
+        job.progress("Loading tasks…")
+        rows = list(analytics.gantt_rows(self.db, t0 - margin, t1 + margin,
+                                         (t1 - t0) * self.MIN_BAR_PX / max(width, 1)))
         if not rows:
+            return None, 0, 0
+        job.progress("Building chart…")
+        fig = px.timeline(rows, x_start="start", x_end="finish", y="resource", color="resource",
+                          hover_name="label", hover_data={"tasks": True, "resource": False})
+        fig.update_yaxes(autorange="reversed")
+        fig.update_layout(uirevision=revision, xaxis_range=[t0, t1], showlegend=False)
+        job.progress("Serializing chart…")
+        return fig.to_json(), len(rows), sum(r["tasks"] for r in rows)
+
+    def _show_chart(self, result):
+        if result is None:
             self.status.setText("No tasks with both start and end timestamps.")
             return
-        fig = px.timeline(rows, x_start="Start", x_end="Finish", y="Task", color="Resource")
-        fig.update_yaxes(autorange="reversed")
-        view = plotly_to_qwebengine(fig)
-        if self.chart:
-            self.layout.removeWidget(self.chart)
-            self.chart.deleteLater()
-        self.chart = view
-        self.layout.addWidget(view)
-        self.status.setText(f"{len(rows)} tasks plotted")
+        from plotly_widget import PlotlyView
+        fig_json, bars, tasks = result
+        if fig_json is None:
+            self.status.setText("No tasks in the visible time range.")
+            return
+        if self.chart is None:
+            self.chart = PlotlyView()
+            self.chart.xRangeChanged.connect(self._range_changed)
+            self.layout.addWidget(self.chart)
+        self.chart.show_figure(fig_json)
+        self.status.setText(f"{tasks} tasks plotted as {bars} bars")
@@ -0,0 +1,243 @@
+# importer.py
+"""
+Streaming import of historical time-study records from CSV or JSON Lines.
+
+Records flow through a generator pipeline (read, validate, batch) and each
+batch is written in one transaction together with the import's progress, so
+memory stays constant whatever the file size and an interrupted import picks
+up after the last committed batch when run again::
+
+    python -m importer history.csv
+    python -m importer mes-2019.jsonl --batch-size 5000 --rejects rejects.jsonl
+    python -m importer export.csv --column "Operation=task_name" --column "Operator=assigned_to"
+
+Recognised fields: task_name (required), description, assigned_to, category,
+standard_time, total_time (seconds), start_time, end_time (ISO 8601), status,
+key and parent_key (the source's own ids, used to rebuild the WBS) or
+parent_task_id (an id already in the database).
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from database import Database, to_local_time
+from industrial_datasets import CATEGORIES
+
+FIELDS = ('task_name', 'description', 'assigned_to', 'category', 'standard_time', 'total_time',
+          'start_time', 'end_time', 'status', 'key', 'parent_key', 'parent_task_id')
+STATUSES = ('Pending', 'In Progress', 'Paused', 'Completed')
+BATCH_SIZE = 2000
+
+
+class RecordError(ValueError):
+    """A record that cannot be imported; the message says why."""
+
+
+def read_records(path, fmt=None):
+    """Yield one dict per record of a CSV (with header) or JSON Lines file."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    # Keep the record count aligned with the file; clean() rejects it
+                    yield RecordError(f"invalid JSON: {e.msg}")
+
+
+def _number(record, field, default):
+    value = record.get(field)
+    if value is None or value == '':
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise RecordError(f"{field} is not a number: {value!r}") from None
+    if number < 0:
+        raise RecordError(f"{field} is negative: {value!r}")
+    return number
+
+
+def _timestamp(record, field):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        at = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RecordError(f"{field} is not an ISO 8601 timestamp: {value!r}") from None
+    try:
+        return to_local_time(at)
+    except ValueError:
+        raise RecordError(f"{field} is out of range: {value!r}") from None
+
+
+def _text(record, field):
+    value = record.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def clean(record):
+    """An ``add_tasks_bulk`` dict for one raw record; raises RecordError."""
+    if isinstance(record, RecordError):
+        raise record
+    name = _text(record, 'task_name')
+    if not name:
+        raise RecordError("task_name is missing")
+    category = _text(record, 'category')
+    if category:
+        category = category.upper()
+        if category not in CATEGORIES:
+            raise RecordError(f"unknown category {category!r}")
+    start, end = _timestamp(record, 'start_time'), _timestamp(record, 'end_time')
+    if end and not start:
+        raise RecordError("end_time without start_time")
+    if start and end and end < start:
+        raise RecordError("end_time is before start_time")
+    total = _number(record, 'total_time', None)
+    if total is None:
+        total = (end - start).total_seconds() if start and end else 0
+    status = _text(record, 'status')
+    if status is None:
+        status = 'Completed' if end else 'Pending'
+    elif status not in STATUSES:
+        raise RecordError(f"unknown status {status!r}")
+    parent_task_id = _text(record, 'parent_task_id')
+    if parent_task_id is not None:
+        try:
+            parent_task_id = int(parent_task_id)
+        except ValueError:
+            raise RecordError(f"parent_task_id is not an id: {parent_task_id!r}") from None
+    return {
+        'task_name': name,
+        'description': _text(record, 'description'),
+        'assigned_to': _text(record, 'assigned_to'),
+        'category': category,
+        'standard_time': _number(record, 'standard_time', 0),
+        'total_time': total,
+        'start_time': start,
+        'end_time': end,
+        'status': status,
+        'key': _text(record, 'key'),
+        'parent_key': _text(record, 'parent_key'),
+        'parent_task_id': parent_task_id,
+    }
+
+
+def renamed(records, columns):
+    """Rename source columns (``{source name: field}``) on the fly."""
+    for record in records:
+        if not isinstance(record, RecordError):
+            record = {columns.get(name, name): value for name, value in record.items()}
+        yield record
+
+
+def batched(records, size):
+    iterator = iter(records)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def import_file(db, path, source=None, fmt=None, columns=None, batch_size=BATCH_SIZE,
+                on_reject=None, progress=None):
+    """Stream ``path`` into ``db``; returns ``(records read, tasks inserted, rejected)``.
+
+    ``source`` (default: the absolute path) names the import for resuming and
+    for scoping its keys: records committed by an earlier run of the same
+    source are skipped. ``on_reject(record number, reason)`` is called for
+    every rejected record and ``progress(records, inserted, rejected)`` after
+    every batch.
+    """
+    source = source or os.path.abspath(path)
+    done, _ = db.get_import_progress(source)
+    records = read_records(path, fmt)
+    if columns:
+        records = renamed(records, columns)
+    # Records already committed are still parsed, but never validated or written
+    numbered = itertools.islice(enumerate(records, 1), done, None)
+
+    read = done
+    inserted = rejected = 0
+    for batch in batched(numbered, batch_size):
+        numbers, tasks = [], []
+        for number, record in batch:
+            try:
+                tasks.append(clean(record))
+                numbers.append(number)
+            except RecordError as e:
+                rejected += 1
+                if on_reject:
+                    on_reject(number, str(e))
+        read = batch[-1][0]
+        added, refused = db.import_tasks_batch(source, tasks, read)
+        inserted += added
+        rejected += len(refused)
+        if on_reject:
+            for index, reason in refused:
+                on_reject(numbers[index], reason)
+        if progress:
+            progress(read, inserted, rejected)
+    return read, inserted, rejected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m importer', description="Import historical task records.")
+    parser.add_argument('file')
+    parser.add_argument('--db', default='task_tracker.db', help="database file (default: %(default)s)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="default: from the file extension")
+    parser.add_argument('--source', help="import name used for resuming (default: the file's absolute path)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--column', action='append', default=[], metavar='SOURCE=FIELD',
+                        help=f"map a source column to one of: {', '.join(FIELDS)}")
+    parser.add_argument('--rejects', help="write rejected records as JSON Lines (record number, reason)")
+    args = parser.parse_args(argv)
+
+    columns = {}
+    for mapping in args.column:
+        name, _, field = mapping.partition('=')
+        if field not in FIELDS:
+            parser.error(f"--column {mapping}: unknown field {field!r}")
+        columns[name] = field
+
+    db = Database(args.db)
+    rejects = open(args.rejects, 'a', encoding='utf-8') if args.rejects else None
+    started = time.perf_counter()
+    first, _ = db.get_import_progress(args.source or os.path.abspath(args.file))
+    if first:
+        print(f"Resuming after record {first:,}", file=sys.stderr)
+
+    def on_reject(number, reason):
+        if rejects:
+            rejects.write(json.dumps({'record': number, 'reason': reason}) + '\n')
+
+    def progress(read, inserted, rejected):
+        rate = (read - first) / max(time.perf_counter() - started, 1e-9)
+        print(f"\r{read:,} records, {inserted:,} imported, {rejected:,} rejected ({rate:,.0f} records/s)",
+              end='', file=sys.stderr)
+
+    try:
+        read, inserted, rejected = import_file(db, args.file, args.source, args.format, columns,
+                                               args.batch_size, on_reject, progress)
+    finally:
+        if rejects:
+            rejects.close()
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(f"\nDone: {read - first:,} records in {elapsed:.1f} s, {inserted:,} imported, {rejected:,} rejected",
+          file=sys.stderr)
+    return 1 if rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,346 @@
+# ingest_server.py
+"""
+Local HTTP service through which shop-floor scanners start, pause and stop tasks.
+
+    python -m ingest_server --port 8765
+
+Barcode stations POST events as JSON, one object or a list of them::
+
+    POST /events
+    {"task_id": 42, "action": "start", "operator": "Welder 3"}
+
+``action`` is start, pause or stop. ``operator`` is optional: start defaults
+to the task's assignee, pause to every running operator, and stop always
+ends them all. ``at`` (ISO 8601 or epoch seconds) defaults to when the
+request arrived. The reply is sent once the events are committed:
+``{"results": [...]}`` with each start's segment id and each pause or stop's
+total time, or an ``"error"``.
+
+Events from every connection wait in one queue and a single writer commits
+them together, at most every COMMIT_INTERVAL_MS, in one transaction. One
+commit (and fsync) then carries a whole batch, so throughput grows with the
+load rather than being capped by commits per second. ``GET /stats`` reports
+counts, batch sizes and ingest latency (arrival to commit) percentiles.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from database import Database, to_local_time
+from profiling import Histogram
+
+ACTIONS = ('start', 'pause', 'stop')
+# Longest an event waits for the previous commit's batch to be joined
+COMMIT_INTERVAL_MS = 5
+# Events committed in one transaction at most
+MAX_BATCH = 5000
+# Events queued before new requests are refused with 503
+MAX_QUEUED = 50_000
+MAX_BODY_BYTES = 1024 * 1024
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class EventError(ValueError):
+    """An event that cannot be queued; the message says why."""
+
+
+class QueueFull(Exception):
+    """More events are waiting than MAX_QUEUED."""
+
+
+def _event_time(value, received):
+    if value is None:
+        return received
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value)
+        at = datetime.fromisoformat(str(value).strip())
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise EventError(f"at is neither ISO 8601 nor epoch seconds: {value!r}") from None
+    try:
+        return to_local_time(at)
+    except ValueError:
+        raise EventError(f"at is out of range: {value!r}") from None
+
+
+def parse_event(obj, received):
+    """``(task_id, action, operator, at)`` of one event object; raises EventError."""
+    if not isinstance(obj, dict):
+        raise EventError("an event must be a JSON object")
+    task_id = obj.get('task_id')
+    if isinstance(task_id, bool) or not isinstance(task_id, int):
+        raise EventError(f"task_id must be an integer: {task_id!r}")
+    action = obj.get('action')
+    if action not in ACTIONS:
+        raise EventError(f"action must be one of {', '.join(ACTIONS)}: {action!r}")
+    operator = obj.get('operator')
+    if operator is not None and not isinstance(operator, str):
+        raise EventError(f"operator must be a string: {operator!r}")
+    if action == 'stop' and operator is not None:
+        raise EventError("stop ends every operator's segment; pause one operator instead")
+    return task_id, action, operator, _event_time(obj.get('at'), received)
+
+
+class IngestService:
+    """The queue, the group-commit writer and their statistics.
+
+    The writer runs the database calls on one dedicated thread, so the event
+    loop keeps accepting requests while a batch commits.
+    """
+
+    def __init__(self, db, commit_interval_ms=COMMIT_INTERVAL_MS, max_batch=MAX_BATCH, max_queued=MAX_QUEUED):
+        self.db = db
+        self.commit_interval = commit_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_queued = max_queued
+        # (events, perf_counter at arrival, future for their results), one per request
+        self.queue = asyncio.Queue()
+        self.queued = 0
+        self.latency = Histogram()
+        self.events = 0
+        self.errors = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.since = datetime.now()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='ingest-writer')
+
+    async def submit(self, events):
+        """Queue parsed events; returns one result dict per event once committed."""
+        if self.queued + len(events) > self.max_queued:
+            raise QueueFull()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((events, time.perf_counter(), future))
+        self.queued += len(events)
+        return await future
+
+    async def run_writer(self):
+        loop = asyncio.get_running_loop()
+        last_commit = 0.0
+        while True:
+            requests = [await self.queue.get()]
+            # Give events arriving right after this one the chance to share its
+            # commit; under load commits run back to back and this never waits
+            wait = last_commit + self.commit_interval - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            count = len(requests[0][0])
+            while count < self.max_batch and not self.queue.empty():
+                request = self.queue.get_nowait()
+                requests.append(request)
+                count += len(request[0])
+            self.queued -= count
+            events = [event for request in requests for event in request[0]]
+            try:
+                results = await loop.run_in_executor(self._executor, self._commit, events)
+            except Exception as e:
+                for _, _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            last_commit = time.perf_counter()
+            self._record(requests, results, last_commit)
+
+    def _record(self, requests, results, committed):
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(results))
+        self.events += len(results)
+        self.errors += sum(1 for result in results if 'error' in result)
+        start = 0
+        for events, received, future in requests:
+            for _ in events:
+                self.latency.add(committed - received)
+            if not future.done():
+                future.set_result(results[start:start + len(events)])
+            start += len(events)
+
+    def _commit(self, events):
+        """Apply a batch in one transaction (on the writer thread)."""
+        try:
+            with self.db.transaction():
+                known = self.db.existing_task_ids(event[0] for event in events)
+                return [self._apply(known, *event) for event in events]
+        except Exception:
+            # Do not let one failing event cost the rest of the batch their
+            # commit: retry them one transaction each
+            results = []
+            for event in events:
+                try:
+                    with self.db.transaction():
+                        results.append(self._apply(self.db.existing_task_ids([event[0]]), *event))
+                except Exception as e:
+                    results.append({'error': str(e)})
+            return results
+
+    def _apply(self, known, task_id, action, operator, at):
+        if task_id not in known:
+            return {'error': f"unknown task {task_id}"}
+        if action == 'start':
+            return {'segment_id': self.db.start_task(task_id, operator, at)}
+        if action == 'pause':
+            return {'total_time': self.db.pause_task(task_id, operator, at)}
+        return {'total_time': self.db.stop_task(task_id, at)}
+
+    def stats(self):
+        latency = self.latency.to_dict()
+        return {
+            'since': self.since.isoformat(timespec='seconds'),
+            'events': self.events,
+            'errors': self.errors,
+            'queued': self.queued,
+            'batches': self.batches,
+            'mean_batch': self.events / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            # Percentiles are histogram bucket upper bounds (see profiling.BUCKETS_MS)
+            'latency_ms': {
+                'mean': latency['mean_ms'],
+                **{f"p{round(q * 100)}": self.latency.percentile(q) for q in LATENCY_QUANTILES},
+                'max': latency['max_ms'],
+            },
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    # --- HTTP ---
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {}, False)
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ')
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': "malformed request line"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                if 'transfer-encoding' in headers:
+                    await self._respond(writer, HTTPStatus.LENGTH_REQUIRED, {'error': "send a Content-Length"}, False)
+                    break
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {'error': f"body must be at most {MAX_BODY_BYTES} bytes"}, False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                status, payload = await self.dispatch(method, path.split('?')[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body):
+        """(HTTPStatus, JSON payload) for one request."""
+        if path == '/events':
+            if method != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "POST events here"}
+            return await self.post_events(body)
+        if path in ('/stats', '/health'):
+            if method != 'GET':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"GET {path}"}
+            return HTTPStatus.OK, self.stats() if path == '/stats' else {'status': 'ok'}
+        return HTTPStatus.NOT_FOUND, {'error': f"no such endpoint: {path}"}
+
+    async def post_events(self, body):
+        received = datetime.now()
+        try:
+            objects = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return HTTPStatus.BAD_REQUEST, {'error': f"invalid JSON: {e}"}
+        if not isinstance(objects, list):
+            objects = [objects]
+        events = []
+        # A request is all or nothing: one invalid event refuses all of them
+        for index, obj in enumerate(objects):
+            try:
+                events.append(parse_event(obj, received))
+            except EventError as e:
+                return HTTPStatus.BAD_REQUEST, {'error': str(e), 'index': index}
+        if not events:
+            return HTTPStatus.OK, {'results': []}
+        try:
+            results = await self.submit(events)
+        except QueueFull:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': "too many events queued, retry shortly"}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+        return HTTPStatus.OK, {'results': results}
+
+
+async def serve(db, host='127.0.0.1', port=8765, ready=None, **options):
+    """Run the service until cancelled; ``ready(port)`` is called once it listens."""
+    service = IngestService(db, **options)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    writer_task = asyncio.create_task(service.run_writer())
+    if ready:
+        ready(server.sockets[0].getsockname()[1])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        writer_task.cancel()
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ingest_server',
+                                     description="Accept start/pause/stop task events over HTTP.")
+    parser.add_argument('--db', default='task_tracker.db', help="database file (default: %(default)s)")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--commit-interval', type=float, default=COMMIT_INTERVAL_MS, metavar='MS',
+                        help="longest wait for a batch to fill (default: %(default)s)")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    args = parser.parse_args(argv)
+
+    db = Database(args.db)
+
+    def ready(port):
+        print(f"Listening on http://{args.host}:{port} (database {args.db})", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(db, args.host, args.port, ready,
+                          commit_interval_ms=args.commit_interval, max_batch=args.max_batch))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# jobs.py
+"""
+Background jobs for the screens.
+
+Chart generation (querying, building the Plotly figure and serializing it)
+runs on the shared ``QThreadPool`` so the Qt event loop never blocks. Each
+screen owns a ``JobRunner``; submitting a new job cancels the one still in
+flight, so repeated clicks only ever deliver the latest result.
+"""
+import itertools
+import traceback
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when a newer job has replaced it."""
+
+
+class JobSignals(QObject):
+    progress = Signal(int, str)
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+
+
+class Job(QRunnable):
+    """Runs ``fn(job, *args)`` on a pool thread.
+
+    ``fn`` calls ``job.progress(text)`` between its stages; that both reports
+    progress and raises ``JobCancelled`` if the job has gone stale.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.id = next(self._ids)
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+        self.signals = JobSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def progress(self, text):
+        if self.cancelled:
+            raise JobCancelled()
+        self.signals.progress.emit(self.id, text)
+
+    def run(self):
+        # Always report back, even when cancelled, so the runner can let go of
+        # the job; it ignores results from jobs that are no longer current.
+        try:
+            result = self.fn(self, *self.args)
+        except JobCancelled:
+            result = None
+        except Exception:
+            self.signals.failed.emit(self.id, traceback.format_exc(limit=3))
+            return
+        self.signals.finished.emit(self.id, result)
+
+
+class JobRunner(QObject):
+    """Keeps at most one live job for a screen and routes its signals.
+
+    Progress text goes to ``status`` (a QLabel); the result of the latest job
+    is handed to the ``on_done`` callback on the GUI thread.
+    """
+
+    def __init__(self, status, parent=None):
+        super().__init__(parent)
+        self.status = status
+        self.pool = QThreadPool.globalInstance()
+        self.current = None
+        self._on_done = None
+        # Python references keep running jobs alive until they report back
+        self._jobs = {}
+
+    def submit(self, fn, *args, on_done):
+        self.cancel()
+        job = Job(fn, *args)
+        job.setAutoDelete(False)
+        job.signals.progress.connect(self._progress)
+        job.signals.finished.connect(self._finished)
+        job.signals.failed.connect(self._failed)
+        self._jobs[job.id] = job
+        self.current = job
+        self._on_done = on_done
+        self.pool.start(job)
+        return job
+
+    def cancel(self):
+        if self.current:
+            self.current.cancel()
+            self.current = None
+
+    def _is_current(self, job_id):
+        return self.current is not None and self.current.id == job_id
+
+    def _progress(self, job_id, text):
+        if self._is_current(job_id):
+            self.status.setText(text)
+
+    def _finished(self, job_id, result):
+        self._jobs.pop(job_id, None)
+        if self._is_current(job_id):
+            self.current = None
+            self._on_done(result)
+
+    def _failed(self, job_id, message):
+        self._jobs.pop(job_id, None)
+        if self._is_current(job_id):
+            self.current = None
+            self.status.setText(f"Failed: {message.strip().splitlines()[-1]}")
@@ -1,14 +1,57 @@
 # main.py
+import importlib
 import sys
+from PySide6.QtCore import Qt, QCoreApplication
+from PySide6.QtGui import QKeySequence, QShortcut
 from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QPushButton
-
-from task_screen import TaskScreen
-from pareto_screen import ParetoScreen
-from gantt_screen import GanttScreen
-from oee_screen import OeeScreen
+import profiling
+
+# ───────────────────────────────
+# DARK THEME STYLESHEET (works on all PySide6 versions)
+# ───────────────────────────────
+DARK_STYLESHEET = """
+QWidget {
+    background-color: #121212;
+    color: #EEEEEE;
+    font-size: 14px;
+}
+QPushButton {
+    background-color: #1E1E1E;
+    border: 1px solid #333;
+    padding: 6px;
+}
+QPushButton:hover {
+    background-color: #333333;
+}
+QPushButton:checked {
+    background-color: #444444;
+}
+QLineEdit, QTextEdit, QComboBox, QListWidget, QTableView {
+    background-color: #1A1A1A;
+    border: 1px solid #333;
+    color: #EEEEEE;
+}
+QHeaderView::section {
+    background-color: #1E1E1E;
+    border: 1px solid #333;
+    padding: 4px;
+}
+"""
 
 
 class MainWindow(QMainWindow):
+    # Screen modules are imported and built the first time their button is
+    # clicked, so their dependencies stay off the startup path.
+    SCREENS = {
+        'tasks': ('task_screen', 'TaskScreen'),
+        'pareto': ('pareto_screen', 'ParetoScreen'),
+        'gantt': ('gantt_screen', 'GanttScreen'),
+        'oee': ('oee_screen', 'OeeScreen'),
+        # No button: opened with DIAGNOSTICS_SHORTCUT
+        'diagnostics': ('diagnostics_screen', 'DiagnosticsScreen'),
+    }
+    DIAGNOSTICS_SHORTCUT = "Ctrl+Shift+D"
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Task Tracker — Dark Dashboard")
@@ -40,22 +83,20 @@ class MainWindow(QMainWindow):
         self.container_layout.setContentsMargins(10, 10, 10, 10)
         self.container_layout.setSpacing(10)
 
-        # Instantiate screens
-        self.task_screen = TaskScreen()
-        self.pareto_screen = ParetoScreen()
-        self.gantt_screen = GanttScreen()
-        self.oee_screen = OeeScreen()
+        self.screens = {}
 
         # Default screen
-        self.container_layout.addWidget(self.task_screen)
-        self.current = self.task_screen
+        self.current = self._screen('tasks')
+        self.container_layout.addWidget(self.current)
         self.btn_tasks.setChecked(True)
 
         # Button signals
-        self.btn_tasks.clicked.connect(lambda: self._switch(self.task_screen, self.btn_tasks))
-        self.btn_pareto.clicked.connect(lambda: self._switch(self.pareto_screen, self.btn_pareto))
-        self.btn_gantt.clicked.connect(lambda: self._switch(self.gantt_screen, self.btn_gantt))
-        self.btn_oee.clicked.connect(lambda: self._switch(self.oee_screen, self.btn_oee))
+        self.btn_tasks.clicked.connect(lambda: self._switch(self._screen('tasks'), self.btn_tasks))
+        self.btn_pareto.clicked.connect(lambda: self._switch(self._screen('pareto'), self.btn_pareto))
+        self.btn_gantt.clicked.connect(lambda: self._switch(self._screen('gantt'), self.btn_gantt))
+        self.btn_oee.clicked.connect(lambda: self._switch(self._screen('oee'), self.btn_oee))
+        self.diagnostics_shortcut = QShortcut(QKeySequence(self.DIAGNOSTICS_SHORTCUT), self)
+        self.diagnostics_shortcut.activated.connect(lambda: self._switch(self._screen('diagnostics'), None))
 
         # ───────────────────────────────
         # Main layout
@@ -67,12 +108,22 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.container)
         self.setCentralWidget(central)
 
+    def _screen(self, name):
+        """Return the screen widget, building it on first use."""
+        if name not in self.screens:
+            module, cls = self.SCREENS[name]
+            cls = getattr(importlib.import_module(module), cls)
+            profiling.instrument_screen(cls)
+            self.screens[name] = cls()
+        return self.screens[name]
+
     def _switch(self, widget, button):
         """Switch the visible screen widget."""
         # reset buttons
         for b in (self.btn_tasks, self.btn_pareto, self.btn_gantt, self.btn_oee):
             b.setChecked(False)
-        button.setChecked(True)
+        if button is not None:
+            button.setChecked(True)
 
         # replace screen
         self.container_layout.replaceWidget(self.current, widget)
@@ -81,36 +132,18 @@ class MainWindow(QMainWindow):
         self.current = widget
 
 
+def create_app(argv):
+    # Lets QtWebEngine be imported after the application exists, when the
+    # first chart is drawn
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication(argv)
+    app.setStyleSheet(DARK_STYLESHEET)
+    return app
+
+
 def main():
-    app = QApplication(sys.argv)
-
-    # ───────────────────────────────
-    # DARK THEME STYLESHEET (works on all PySide6 versions)
-    # ───────────────────────────────
-    dark_stylesheet = """
-    QWidget {
-        background-color: #121212;
-        color: #EEEEEE;
-        font-size: 14px;
-    }
-    QPushButton {
-        background-color: #1E1E1E;
-        border: 1px solid #333;
-        padding: 6px;
-    }
-    QPushButton:hover {
-        background-color: #333333;
-    }
-    QPushButton:checked {
-        background-color: #444444;
-    }
-    QLineEdit, QTextEdit, QComboBox, QListWidget {
-        background-color: #1A1A1A;
-        border: 1px solid #333;
-        color: #EEEEEE;
-    }
-    """
-    app.setStyleSheet(dark_stylesheet)
+    profiling.enable_from_env()
+    app = create_app(sys.argv)
 
     # Run app
     win = MainWindow()
@@ -1,8 +1,8 @@
 # oee_screen.py
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout, QLineEdit, QMessageBox, QListWidget, QListWidgetItem
+import analytics
 from database import Database
-import plotly.graph_objects as go
-from plotly_widget import plotly_to_qwebengine
+from jobs import JobRunner
 
 class OeeScreen(QWidget):
     def __init__(self):
@@ -31,6 +31,7 @@ class OeeScreen(QWidget):
 
         self.summary = QLabel("OEE: --")
         self.layout.addWidget(self.summary)
+        self.jobs = JobRunner(self.summary, self)
 
         self.chart = None
         self.refresh()
@@ -55,25 +56,40 @@ class OeeScreen(QWidget):
         self.refresh()
 
     def calculate_oee(self):
-        equipments = self.db.get_equipment()
-        if not equipments:
+        self.jobs.submit(self._build_chart, on_done=self._show_chart)
+
+    def _build_chart(self, job):
+        """Runs on a pool thread; returns (figure JSON, average OEE) or None."""
+        # plotly is imported on first use, off the GUI thread
+        import plotly.graph_objects as go
+        job.progress("Computing OEE…")
+        rows = list(analytics.oee_rows(self.db))
+        if not rows:
+            return None
+        labels = [row['equipment'] for row in rows]
+        oees = [row['oee_pct'] for row in rows]
+        components = [[row['availability_pct'], row['performance_pct'], row['quality_pct']] for row in rows]
+        avg = analytics.oee_average(rows)
+
+        job.progress("Building chart…")
+        fig = go.Figure([go.Bar(
+            x=labels, y=oees, text=[f"{v:.2f}%" for v in oees], textposition="auto",
+            customdata=components,
+            hovertemplate="%{x}<br>OEE %{y:.2f}%<br>Availability %{customdata[0]:.1f}%"
+                          "<br>Performance %{customdata[1]:.1f}%<br>Quality %{customdata[2]:.1f}%<extra></extra>",
+        )])
+        fig.update_layout(title="OEE per Equipment", yaxis=dict(title="OEE %"))
+        job.progress("Serializing chart…")
+        return fig.to_json(), avg
+
+    def _show_chart(self, result):
+        if result is None:
             self.summary.setText("No equipment")
             return
-        oees = []
-        labels = []
-        for eq in equipments:
-            oid = eq[0]
-            oee = self.db.compute_oee(oid)
-            oees.append(oee)
-            labels.append(eq[1] or f"EQ{oid}")
-        avg = sum(oees) / len(oees)
+        from plotly_widget import PlotlyView
+        fig_json, avg = result
         self.summary.setText(f"OEE Average: {avg:.2f}%")
-
-        fig = go.Figure([go.Bar(x=labels, y=oees, text=[f"{v:.2f}%" for v in oees], textposition="auto")])
-        fig.update_layout(title="OEE per Equipment", yaxis=dict(title="OEE %"))
-        view = plotly_to_qwebengine(fig)
-        if self.chart:
-            self.layout.removeWidget(self.chart)
-            self.chart.deleteLater()
-        self.chart = view
-        self.layout.addWidget(view)
+        if self.chart is None:
+            self.chart = PlotlyView()
+            self.layout.addWidget(self.chart)
+        self.chart.show_figure(fig_json)
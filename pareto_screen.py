@@ -1,38 +1,62 @@
 # pareto_screen.py
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QComboBox, QSpinBox
+import analytics
 from database import Database
-import plotly.graph_objects as go
-from plotly_widget import plotly_to_qwebengine
+from jobs import JobRunner
+
+# combo label -> Database.pareto group_by
+GROUPINGS = {
+    "Task": "task",
+    "Category": "category",
+    "Assignee": "assignee",
+    "Parent (WBS)": "parent",
+}
 
 class ParetoScreen(QWidget):
     def __init__(self):
         super().__init__()
         self.db = Database()
         layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.group_by = QComboBox()
+        self.group_by.addItems(list(GROUPINGS))
+        self.top_n = QSpinBox()
+        self.top_n.setRange(0, 1000)
+        self.top_n.setValue(20)
+        self.top_n.setSpecialValueText("All")
         top_btn = QPushButton("Generate Pareto")
+        controls.addWidget(QLabel("Group by:"))
+        controls.addWidget(self.group_by)
+        controls.addWidget(QLabel("Top N:"))
+        controls.addWidget(self.top_n)
+        controls.addWidget(top_btn)
+
         self.status = QLabel("")
+        self.jobs = JobRunner(self.status, self)
         top_btn.clicked.connect(self.generate)
-        layout.addWidget(top_btn)
+        layout.addLayout(controls)
         layout.addWidget(self.status)
         self.chart_holder = None
         self.layout = layout
 
     def generate(self):
-        tasks = self.db.get_all_tasks()
-        times = [(t[1], t[6] or 0) for t in tasks if (t[6] or 0) > 0]
-        if not times:
-            self.status.setText("No completed tasks with recorded time.")
-            return
-        times.sort(key=lambda x: x[1], reverse=True)
-        names = [n for n, _ in times]
-        durations = [d for _, d in times]
-        total = sum(durations)
-        cum = []
-        s = 0
-        for d in durations:
-            s += d
-            cum.append(s/total*100)
+        group_by = GROUPINGS[self.group_by.currentText()]
+        self.jobs.submit(self._build_chart, group_by, self.top_n.value() or None, on_done=self._show_chart)
 
+    def _build_chart(self, job, group_by, top_n):
+        """Runs on a pool thread; returns (figure JSON, group count) or None."""
+        # plotly is imported on first use, off the GUI thread
+        import plotly.graph_objects as go
+        job.progress("Aggregating task times…")
+        series = list(analytics.pareto_rows(self.db, group_by, top_n))
+        if not series:
+            return None
+        names = [row['label'] for row in series]
+        durations = [row['total_time'] for row in series]
+        cum = [row['cumulative_pct'] for row in series]
+
+        job.progress("Building chart…")
         fig = go.Figure()
         fig.add_trace(go.Bar(x=names, y=durations, name='Time (s)'))
         fig.add_trace(go.Scatter(x=names, y=cum, name='Cumulative %', yaxis='y2', mode='lines+markers'))
@@ -43,11 +67,18 @@ class ParetoScreen(QWidget):
             yaxis2=dict(title='Cumulative %', overlaying='y', side='right', range=[0, 100])
         )
 
-        view = plotly_to_qwebengine(fig)
-        # clear previous
-        if self.chart_holder:
-            self.layout.removeWidget(self.chart_holder)
-            self.chart_holder.deleteLater()
-        self.chart_holder = view
-        self.layout.addWidget(view)
-        self.status.setText(f"Total tasks used: {len(names)}")
+        job.progress("Serializing chart…")
+        return fig.to_json(), len(names)
+
+    def _show_chart(self, result):
+        if result is None:
+            self.status.setText("No completed tasks with recorded time.")
+            return
+        from plotly_widget import PlotlyView
+        fig_json, groups = result
+        # one embedded view, updated in place on every later run
+        if self.chart_holder is None:
+            self.chart_holder = PlotlyView()
+            self.layout.addWidget(self.chart_holder)
+        self.chart_holder.show_figure(fig_json)
+        self.status.setText(f"Groups plotted: {groups}")
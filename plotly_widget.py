@@ -1,11 +1,103 @@
-import tempfile, webbrowser
-import plotly.io as pio
-from PySide6.QtWidgets import QLabel
-
-def plotly_to_qwebengine(fig):
-    html = pio.to_html(fig, full_html=True, include_plotlyjs='cdn')
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".html")
-    tmp.write(html.encode())
-    tmp.close()
-    webbrowser.open(tmp.name)
-    return QLabel("Plot opened in browser")
+# plotly_widget.py
+"""
+Embedded, offline Plotly chart view.
+
+``PlotlyView`` loads one small page with the plotly.js bundled inside the
+plotly Python package (no CDN, works air-gapped). Later figures are pushed
+through a ``QWebChannel`` and drawn with ``Plotly.react``, so updating a chart
+never reloads the page or writes anything to disk. Zooming or panning the x
+axis is reported back through ``PlotlyView.xRangeChanged``.
+"""
+import os
+from importlib.util import find_spec
+from PySide6.QtCore import QObject, QUrl, Signal, Slot
+from PySide6.QtWebChannel import QWebChannel
+from PySide6.QtWebEngineWidgets import QWebEngineView
+
+# Located without importing plotly, which is slow to import
+PLOTLY_JS_DIR = os.path.join(find_spec('plotly').submodule_search_locations[0], 'package_data')
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>html, body, #chart { margin: 0; width: 100%; height: 100%; background: #121212; }</style>
+<script src="plotly.min.js"></script>
+<script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+</head>
+<body>
+<div id="chart"></div>
+<script>
+new QWebChannel(qt.webChannelTransport, function (channel) {
+    var bridge = channel.objects.bridge;
+    var chart = document.getElementById('chart');
+    var listening = false;
+    bridge.figureChanged.connect(function (json) {
+        var fig = JSON.parse(json);
+        Plotly.react(chart, fig.data, fig.layout, {responsive: true, displaylogo: false});
+        if (!listening) {
+            listening = true;
+            chart.on('plotly_relayout', function (e) {
+                if (e['xaxis.range[0]'] !== undefined) {
+                    bridge.relayout(String(e['xaxis.range[0]']), String(e['xaxis.range[1]']));
+                } else if (e['xaxis.range']) {
+                    bridge.relayout(String(e['xaxis.range'][0]), String(e['xaxis.range'][1]));
+                } else if (e['xaxis.autorange']) {
+                    bridge.relayout('', '');
+                }
+            });
+        }
+    });
+    bridge.ready();
+});
+</script>
+</body>
+</html>
+"""
+
+
+class _Bridge(QObject):
+    figureChanged = Signal(str)
+    xRangeChanged = Signal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.loaded = False
+        self.pending = None
+
+    @Slot()
+    def ready(self):
+        self.loaded = True
+        if self.pending is not None:
+            self.figureChanged.emit(self.pending)
+            self.pending = None
+
+    @Slot(str, str)
+    def relayout(self, x0, x1):
+        self.xRangeChanged.emit(x0, x1)
+
+
+class PlotlyView(QWebEngineView):
+    """A chart widget that is created once and then updated in place."""
+
+    # x-axis range after a zoom or pan, as plotly prints it; both empty on autorange
+    xRangeChanged = Signal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(400)
+        self._bridge = _Bridge(self)
+        self._bridge.xRangeChanged.connect(self.xRangeChanged)
+        self._channel = QWebChannel(self)
+        self._channel.registerObject('bridge', self._bridge)
+        self.page().setWebChannel(self._channel)
+        # The base URL lets the page pick up plotly.min.js from the package
+        self.setHtml(PAGE, QUrl.fromLocalFile(PLOTLY_JS_DIR + os.sep))
+
+    def show_figure(self, fig_json):
+        """Draw a figure serialized with ``Figure.to_json()``."""
+        if self._bridge.loaded:
+            self._bridge.figureChanged.emit(fig_json)
+        else:
+            # Only the latest figure matters until the page is ready
+            self._bridge.pending = fig_json
@@ -0,0 +1,261 @@
+# profiling.py
+"""
+Opt-in instrumentation: where the time goes between SQL, Python, chart
+building and Qt.
+
+Start the dashboard with ``TASK_TRACKER_PROFILE`` set to turn it on::
+
+    TASK_TRACKER_PROFILE=1 python main.py
+    TASK_TRACKER_PROFILE=profile.json python main.py   # also dump on exit
+
+Every public ``Database`` method and every screen's ``refresh``/``generate``
+and chart-building stages then record a latency histogram and, for methods
+returning rows, how many. The SQL each connection runs is timed through
+sqlite3's trace callback. The hidden diagnostics screen (Ctrl+Shift+D)
+shows the numbers and dumps them to JSON.
+
+When it is off nothing is wrapped and no trace callback is installed, so it
+costs nothing; when on, small queries take about twice as long. It must be
+enabled before the first ``Database`` is opened.
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+ENV_VAR = 'TASK_TRACKER_PROFILE'
+
+# Histogram bucket upper bounds in milliseconds (1-2.5-5 steps); the last
+# bucket takes everything slower
+BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Screen methods instrumented besides the Database ones: GUI-thread work and
+# the pool-thread chart stages (query, figure, serialization)
+SCREEN_METHODS = ('refresh', 'generate', '_build_chart', '_show_chart')
+# Public methods that are not worth a histogram: transaction() returns a
+# context manager, connect() runs before every query and is a no-op after the first
+NOT_INSTRUMENTED = ('transaction', 'connect')
+
+# Literals inlined into the traced SQL, and the placeholder lists they leave
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b|(?<=[(,=] )NULL\b|(?<=[(,=])NULL\b")
+_LISTS = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+def normalize_sql(sql):
+    """One key per statement shape: literals become ``?`` and whitespace is collapsed."""
+    sql = _LITERALS.sub('?', ' '.join(sql.split()))
+    return _LISTS.sub('?, …', sql)
+
+
+class Histogram:
+    """Call count, total/max time and a bucketed latency distribution."""
+
+    __slots__ = ('count', 'total', 'max', 'buckets', 'rows')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.rows = None
+
+    def add(self, seconds, rows=None):
+        ms = seconds * 1000
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        if rows is not None:
+            self.rows = (self.rows or 0) + rows
+
+    def percentile(self, q):
+        """Upper bound (ms) of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max,
+            'rows': self.rows,
+            'buckets': {f"<={bound}": n for bound, n in zip(BUCKETS_MS, self.buckets) if n},
+            'slower': self.buckets[-1],
+        }
+
+
+def _row_count(result):
+    """Rows in a Database method's result, or None when it is not rows."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple):
+        return 1
+    if result is None:
+        return 0
+    return None
+
+
+class Profiler:
+    """Thread-safe collector behind the module-level ``PROFILER``."""
+
+    def __init__(self):
+        self.enabled = False
+        self.since = None
+        self.calls = {}
+        self.statements = {}
+        self._lock = threading.Lock()
+        # thread -> (normalized SQL, start) of the statement running there
+        self._local = threading.local()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.statements = {}
+            self.since = datetime.now()
+
+    def record_call(self, name, seconds, rows=None):
+        self.end_statement()
+        with self._lock:
+            hist = self.calls.get(name)
+            if hist is None:
+                hist = self.calls[name] = Histogram()
+            hist.add(seconds, rows)
+
+    def trace(self, sql):
+        """sqlite3 trace callback.
+
+        SQLite only reports when a statement starts, so a statement is timed
+        until the next one starts on the same thread or the instrumented
+        call that ran it returns; that includes fetching its rows.
+        """
+        now = time.perf_counter()
+        self.end_statement(now)
+        self._local.current = (normalize_sql(sql), now)
+
+    def end_statement(self, now=None):
+        current = getattr(self._local, 'current', None)
+        if current is None:
+            return
+        self._local.current = None
+        sql, start = current
+        elapsed = (now or time.perf_counter()) - start
+        with self._lock:
+            hist = self.statements.get(sql)
+            if hist is None:
+                hist = self.statements[sql] = Histogram()
+            hist.add(elapsed)
+
+    def snapshot(self):
+        """Everything collected so far as plain dicts, slowest total first."""
+        with self._lock:
+            calls = {name: hist.to_dict() for name, hist in self.calls.items()}
+            statements = {sql: hist.to_dict() for sql, hist in self.statements.items()}
+
+        def by_total(items):
+            return dict(sorted(items.items(), key=lambda item: -item[1]['total_ms']))
+
+        return {
+            'enabled': self.enabled,
+            'since': self.since.isoformat(timespec='seconds') if self.since else None,
+            'taken': datetime.now().isoformat(timespec='seconds'),
+            'calls': by_total(calls),
+            'statements': by_total(statements),
+        }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+PROFILER = Profiler()
+
+
+def _instrumented(name, func):
+    if inspect.isgeneratorfunction(func):
+        # Timed from the first item to the last, including the consumer's
+        # work in between; "rows" counts the items
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            items = 0
+            try:
+                for item in func(*args, **kwargs):
+                    items += 1
+                    yield item
+            finally:
+                PROFILER.record_call(name, time.perf_counter() - start, items)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                PROFILER.record_call(name, time.perf_counter() - start, _row_count(result))
+    wrapper.__profiled__ = func
+    return wrapper
+
+
+def instrument(cls, names=None):
+    """Wrap methods of ``cls`` (default: every public one) so their calls are recorded.
+
+    Calls are recorded as ``Class.method``. Wrapping twice is harmless.
+    """
+    if names is None:
+        names = [name for name, value in vars(cls).items()
+                 if not name.startswith('_') and inspect.isfunction(value) and name not in NOT_INSTRUMENTED]
+    for name in names:
+        func = vars(cls).get(name)
+        if not inspect.isfunction(func) or hasattr(func, '__profiled__'):
+            continue
+        setattr(cls, name, _instrumented(f"{cls.__name__}.{name}", func))
+
+
+def instrument_screen(cls):
+    """Instrument a screen class's SCREEN_METHODS, if profiling is on."""
+    if PROFILER.enabled:
+        instrument(cls, SCREEN_METHODS)
+
+
+def enable():
+    """Turn instrumentation on; call before the first Database is opened."""
+    if PROFILER.enabled:
+        return
+    from database import ConnectionManager, Database
+    instrument(Database)
+    # Every connection opened from now on reports its statements
+    ConnectionManager.trace_callback = PROFILER.trace
+    PROFILER.enabled = True
+    PROFILER.reset()
+
+
+def enable_from_env():
+    """Enable when TASK_TRACKER_PROFILE is set; a value other than 1 is a
+    file to dump the profile to at exit."""
+    value = os.environ.get(ENV_VAR)
+    if not value or value == '0':
+        return False
+    enable()
+    if value != '1':
+        atexit.register(PROFILER.dump, value)
+    return True
@@ -0,0 +1,174 @@
+# station_sync.py
+"""
+Replicate workstation databases into a central one through their change logs.
+
+    python -m station_sync pull central.db line1.db line2.db
+    python -m station_sync serve line1.db --port 9100        # on the station
+    python -m station_sync pull central.db tcp://127.0.0.1:9100
+
+Every database logs its changes and names its rows by global ids (see
+``Database.changes_since``), so stations never collide on ids. A pull ships
+only the entries logged after the central database's watermark for that
+station, in batches, each applied in one transaction together with the new
+watermark: an interrupted sync resumes where it stopped and a replayed batch
+changes nothing. Sources are database files, or stations serving their log
+over a local socket as one JSON request and one JSON reply per line.
+"""
+import argparse
+import json
+import socket
+import socketserver
+import sys
+import time
+from database import Database
+
+BATCH_SIZE = 1000
+
+
+class SocketSource:
+    """A station serving its change log (``serve``), used like its Database."""
+
+    def __init__(self, host, port, timeout=60):
+        self.address = (host, port)
+        self._sock = socket.create_connection(self.address, timeout=timeout)
+        self._file = self._sock.makefile('rwb')
+        self._station_id = None
+
+    def _request(self, **request):
+        self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError(f"{self.address[0]}:{self.address[1]} closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise RuntimeError(f"{self.address[0]}:{self.address[1]}: {reply['error']}")
+        return reply
+
+    @property
+    def station_id(self):
+        if self._station_id is None:
+            self._station_id = self._request(op='station')['station']
+        return self._station_id
+
+    def changes_since(self, after=0, limit=BATCH_SIZE):
+        return self._request(op='changes', after=after, limit=limit)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+def open_source(spec):
+    """A Database for a file name, a SocketSource for ``tcp://host:port``."""
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        return SocketSource(host or '127.0.0.1', int(port))
+    return Database(spec)
+
+
+def sync(central, source, batch_size=BATCH_SIZE, progress=None):
+    """Apply everything ``source`` logged since the last sync to ``central``.
+
+    ``progress(station, watermark, applied)`` is called after every batch.
+    Returns the number of changes applied.
+    """
+    station = source.station_id
+    after, _ = central.get_sync_progress(station)
+    applied = 0
+    while True:
+        batch = source.changes_since(after, batch_size)
+        if batch['last_seq'] <= after:
+            return applied
+        applied += central.apply_changes(batch)
+        after = batch['last_seq']
+        if progress:
+            progress(station, after, applied)
+
+
+class _ChangeLogHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        db = self.server.db
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get('op') == 'station':
+                    reply = {'station': db.station_id}
+                elif request.get('op') == 'changes':
+                    reply = db.changes_since(int(request.get('after', 0)), int(request.get('limit', BATCH_SIZE)))
+                else:
+                    reply = {'error': f"unknown op {request.get('op')!r}"}
+            except (ValueError, TypeError, AttributeError) as e:
+                reply = {'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+
+
+class ChangeLogServer(socketserver.ThreadingTCPServer):
+    """Serves one database's change log to ``SocketSource`` clients."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, db, host='127.0.0.1', port=9100):
+        self.db = db
+        super().__init__((host, port), _ChangeLogHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m station_sync',
+                                     description="Replicate station databases into a central one.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pull = commands.add_parser('pull', help="apply new changes of each source to the central database")
+    pull.add_argument('central')
+    pull.add_argument('sources', nargs='+', metavar='source', help="database file or tcp://host:port")
+    pull.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    serve = commands.add_parser('serve', help="serve a station database's change log over TCP")
+    serve.add_argument('db')
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on (default: %(default)s)")
+    serve.add_argument('--port', type=int, default=9100)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        db = Database(args.db)
+        with ChangeLogServer(db, args.host, args.port) as server:
+            print(f"Serving the change log of {args.db} (station {db.station_id}) on {args.host}:{args.port}",
+                  file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        db.close()
+        return 0
+
+    central = Database(args.central)
+    failed = 0
+
+    def progress(station, watermark, applied):
+        print(f"\r{station}: {applied:,} changes applied, up to #{watermark:,}", end='', file=sys.stderr)
+
+    try:
+        for spec in args.sources:
+            started = time.perf_counter()
+            try:
+                source = open_source(spec)
+            except OSError as e:
+                print(f"{spec}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            try:
+                applied = sync(central, source, args.batch_size, progress)
+                print(f"\r{spec}: {applied:,} changes applied in {time.perf_counter() - started:.1f} s",
+                      file=sys.stderr)
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"\n{spec}: {e}", file=sys.stderr)
+                failed += 1
+            finally:
+                source.close()
+    finally:
+        central.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
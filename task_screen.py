@@ -1,13 +1,22 @@
 # task_screen.py
+import time
+from bisect import bisect_left
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget, QListWidgetItem,
-    QLabel, QDialog, QFormLayout, QLineEdit, QTextEdit, QSpinBox, QComboBox, QMessageBox
+    QLabel, QDialog, QFormLayout, QLineEdit, QTextEdit, QSpinBox, QComboBox, QMessageBox,
+    QTableView, QAbstractItemView, QHeaderView
 )
-from database import Database
+from database import Database, SEARCH_CANDIDATES, SEARCH_LIMIT
 from datetime import datetime
+from ticker import Ticker
 import industrial_datasets
 
 class TaskDialog(QDialog):
+    # Parent choices listed at a time: the newest tasks, or a search's best matches
+    PARENT_CHOICES = SEARCH_LIMIT
+    SEARCH_DELAY_MS = 150
+
     def __init__(self, db, parent=None, task=None):
         super().__init__(parent)
         self.db = db
@@ -29,23 +38,38 @@ class TaskDialog(QDialog):
             if idx >= 0:
                 self.category.setCurrentIndex(idx)
 
-        # parent selector
-        parents = ['None'] + [str(t[0]) + " — " + t[1] for t in self.db.get_all_tasks() if t[10] is None]
+        # parent selector: any task, except this one and its own subtree,
+        # found through the search box rather than listed all at once
+        self.excluded = set()
+        if task:
+            self.excluded = set(self.db.get_descendant_ids(task[0]))
+            self.excluded.add(task[0])
+        self.parent_search = QLineEdit()
+        self.parent_search.setPlaceholderText("Search parent tasks")
+        self.parent_search.setClearButtonEnabled(True)
         self.parent = QComboBox()
-        self.parent.addItems(parents)
+        self.parent.addItem("None", None)
         if task and task[10]:
-            # find index
-            for i, p in enumerate(parents):
-                if p.startswith(str(task[10]) + " "):
-                    self.parent.setCurrentIndex(i)
-                    break
+            # A parent no longer in the live table stays chosen, so saving keeps the link
+            current = self.db.get_task(task[10])
+            self.parent.addItem(str(task[10]) + " — " + (current[1] if current else "(archived or deleted)"), task[10])
+            self.parent.setCurrentIndex(1)
+        self._list_parents()
+        self._parent_timer = QTimer(self)
+        self._parent_timer.setSingleShot(True)
+        self._parent_timer.setInterval(self.SEARCH_DELAY_MS)
+        self._parent_timer.timeout.connect(self._list_parents)
+        self.parent_search.textChanged.connect(lambda _: self._parent_timer.start())
+        parent_picker = QVBoxLayout()
+        parent_picker.addWidget(self.parent_search)
+        parent_picker.addWidget(self.parent)
 
         layout.addRow("Task Name:", self.name)
         layout.addRow("Description:", self.desc)
         layout.addRow("Assigned To:", self.assigned)
         layout.addRow("Standard Time (s):", self.std_time)
         layout.addRow("Category:", self.category)
-        layout.addRow("Parent Task:", self.parent)
+        layout.addRow("Parent Task:", parent_picker)
 
         buttons = QHBoxLayout()
         ok = QPushButton("OK")
@@ -56,11 +80,29 @@ class TaskDialog(QDialog):
         buttons.addWidget(cancel)
         layout.addRow(buttons)
 
+    def _list_parents(self):
+        """List the search's best matches as parents, or the newest tasks without one.
+
+        The chosen parent stays listed and chosen, so a search never changes
+        it; only picking another entry does.
+        """
+        text = self.parent_search.text().strip()
+        if text:
+            choices = [(t[0], t[1]) for t in self.db.search_tasks(text, self.PARENT_CHOICES)]
+        else:
+            choices = self.db.get_task_names(limit=self.PARENT_CHOICES)
+        choices = [(task_id, name) for task_id, name in choices if task_id not in self.excluded]
+        chosen, label = self.parent.currentData(), self.parent.currentText()
+        self.parent.clear()
+        self.parent.addItem("None", None)
+        if chosen is not None and all(task_id != chosen for task_id, _ in choices):
+            self.parent.addItem(label, chosen)
+        for task_id, name in choices:
+            self.parent.addItem(str(task_id) + " — " + name, task_id)
+        self.parent.setCurrentIndex(0 if chosen is None else self.parent.findData(chosen))
+
     def values(self):
-        parent_text = self.parent.currentText()
-        parent_id = None
-        if parent_text != 'None':
-            parent_id = int(parent_text.split(" ")[0])
+        parent_id = self.parent.currentData()
         try:
             std = float(self.std_time.text())
         except:
@@ -78,7 +120,211 @@ class TaskDialog(QDialog):
             "category": category
         }
 
+class TaskTableModel(QAbstractTableModel):
+    """Tasks in id order, fetched from SQLite a page at a time as the view scrolls.
+
+    Only pages the user has scrolled to are held in memory. Single-task changes
+    are applied in place and emit ``dataChanged`` for that row alone.
+
+    Running tasks show a live Total Time: the stored total of their closed
+    segments plus the time since each open segment started. The open
+    segments are kept in memory, so repainting a clock never touches SQLite.
+
+    While a search is set (``set_search``) the rows are instead its best
+    matches, best first, fetched in one go.
+    """
+
+    PAGE_SIZE = 500
+    # (header, task tuple index)
+    COLUMNS = (
+        ("ID", 0),
+        ("Task", 1),
+        ("Category", 11),
+        ("Status", 9),
+        ("Assigned To", 3),
+        ("Std Time (s)", 7),
+        ("Total Time (s)", 6),
+    )
+    TOTAL_COLUMN = [col for _, col in COLUMNS].index(6)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._rows = []
+        self._ids = []  # parallel to _rows, ascending unless searching, for bisect lookups
+        self._exhausted = False
+        self._search = ""
+        # task id -> (open segments, sum of their start times in epoch seconds),
+        # so a task's live time is total + n * now - starts whatever n is
+        self._running = {}
+        self._load_running()
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        t = self._rows[index.row()]
+        col = self.COLUMNS[index.column()][1]
+        value = t[col] if len(t) > col else None
+        if col == 6 and t[0] in self._running:
+            value = self.elapsed(t)
+        if role == Qt.DisplayRole:
+            if value is None:
+                return "N/A" if col == 9 else ""
+            if col == 6:
+                return f"{value:.2f}"
+            return str(value)
+        if role == Qt.TextAlignmentRole and col in (0, 6, 7):
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        after_id = self._ids[-1] if self._ids else 0
+        page = self.db.get_tasks_page(after_id, self.PAGE_SIZE)
+        if len(page) < self.PAGE_SIZE:
+            self._exhausted = True
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self._ids.extend(t[0] for t in page)
+        self.endInsertRows()
+
+    # --- task-level helpers ---
+
+    def reload(self):
+        """Drop every loaded page; the view fetches the first one again."""
+        self.beginResetModel()
+        if self._search:
+            self._rows = self.db.search_tasks(self._search, SEARCH_LIMIT)
+            self._exhausted = True
+        else:
+            self._rows = []
+            self._exhausted = False
+        self._ids = [t[0] for t in self._rows]
+        self._load_running()
+        self.endResetModel()
+
+    def set_search(self, text):
+        """Show the best matches of ``text``, or every task again if it is blank."""
+        text = text.strip()
+        if text == self._search:
+            return
+        self._search = text
+        self.reload()
+
+    def task(self, row):
+        return self._rows[row]
+
+    # --- live clocks ---
+
+    def _load_running(self):
+        self._running = {}
+        for _, task_id, _, start_ms, _ in self.db.get_open_segments():
+            count, starts = self._running.get(task_id, (0, 0.0))
+            self._running[task_id] = (count + 1, starts + start_ms / 1000)
+
+    def _task_running(self, task_id):
+        """Refresh the open segments of one task after it was started, paused or stopped."""
+        segments = self.db.get_open_segments(task_id)
+        if segments:
+            self._running[task_id] = (len(segments), sum(s[3] for s in segments) / 1000)
+        else:
+            self._running.pop(task_id, None)
+
+    def running_count(self):
+        return len(self._running)
+
+    def elapsed(self, t, now=None):
+        """Seconds timed on task tuple ``t`` so far, counting its running segments."""
+        total = t[6] or 0.0
+        running = self._running.get(t[0])
+        if running is None:
+            return total
+        count, starts = running
+        return total + count * (now or time.time()) - starts
+
+    def tick(self, first, last):
+        """Repaint the Total Time of the running tasks among rows ``first``..``last``.
+
+        Costs one dict lookup per visible row, however many tasks are running.
+        """
+        for row in range(max(first, 0), min(last + 1, len(self._ids))):
+            if self._ids[row] in self._running:
+                index = self.index(row, self.TOTAL_COLUMN)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def row_of(self, task_id):
+        """Row holding ``task_id``, or -1 if that page is not loaded."""
+        if self._search:
+            # At most SEARCH_LIMIT rows, in rank order
+            return self._ids.index(task_id) if task_id in self._ids else -1
+        row = bisect_left(self._ids, task_id)
+        if row < len(self._ids) and self._ids[row] == task_id:
+            return row
+        return -1
+
+    def task_changed(self, task_id):
+        """Re-read one task and repaint only its row."""
+        self._task_running(task_id)
+        row = self.row_of(task_id)
+        if row < 0:
+            return
+        t = self.db.get_task(task_id)
+        if t is None:
+            self.task_removed(task_id)
+            return
+        self._rows[row] = t
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
+    def task_added(self, task_id):
+        """Show a new task if the pages loaded so far already reach the end."""
+        # Ids only grow, so an unloaded tail will pick the task up in fetchMore;
+        # search results are not kept up to date with new tasks
+        if not self._exhausted or self._search:
+            return
+        t = self.db.get_task(task_id)
+        if t is None:
+            return
+        row = bisect_left(self._ids, task_id)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, t)
+        self._ids.insert(row, task_id)
+        self.endInsertRows()
+
+    def task_removed(self, task_id):
+        self._running.pop(task_id, None)
+        row = self.row_of(task_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        del self._ids[row]
+        self.endRemoveRows()
+
+
 class TaskScreen(QWidget):
+    # Quiet time after the last keystroke before the search runs
+    SEARCH_DELAY_MS = 150
+
     def __init__(self):
         super().__init__()
         self.db = Database()
@@ -88,50 +334,105 @@ class TaskScreen(QWidget):
         self.btn_add = QPushButton("Add Task")
         self.btn_edit = QPushButton("Edit Task")
         self.btn_delete = QPushButton("Delete Task")
-        self.btn_start = QPushButton("Start")
+        self.btn_start = QPushButton("Start / Resume")
+        self.btn_pause = QPushButton("Pause")
         self.btn_stop = QPushButton("Stop")
         self.btn_load_samples = QPushButton("Load Sample Tasks")
         top.addWidget(self.btn_add)
         top.addWidget(self.btn_edit)
         top.addWidget(self.btn_delete)
         top.addWidget(self.btn_start)
+        top.addWidget(self.btn_pause)
         top.addWidget(self.btn_stop)
         top.addWidget(self.btn_load_samples)
 
         layout.addLayout(top)
 
-        self.listw = QListWidget()
-        layout.addWidget(self.listw)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search tasks by name, description, assignee or category")
+        self.search.setToolTip(f"Shows the {SEARCH_LIMIT} best of the {SEARCH_CANDIDATES} newest matches in the "
+                               f"name, in the assignee or category, and in any field")
+        self.search.setClearButtonEnabled(True)
+        layout.addWidget(self.search)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DELAY_MS)
+
+        self.model = TaskTableModel(self.db, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.verticalHeader().hide()
+        # Fixed row heights let the view lay out only the visible rows
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
         self.info = QLabel("Select a task to see details")
         layout.addWidget(self.info)
 
         self.btn_add.clicked.connect(self.add_task)
         self.btn_edit.clicked.connect(self.edit_task)
         self.btn_delete.clicked.connect(self.delete_task)
-        self.listw.itemSelectionChanged.connect(self.show_info)
+        self.table.selectionModel().selectionChanged.connect(self.show_info)
         self.btn_start.clicked.connect(self.start_task)
+        self.btn_pause.clicked.connect(self.pause_task)
         self.btn_stop.clicked.connect(self.stop_task)
         self.btn_load_samples.clicked.connect(self.load_sample_tasks)
+        self.search.textChanged.connect(lambda _: self._search_timer.start())
+        self.search.returnPressed.connect(self.run_search)
+        self._search_timer.timeout.connect(self.run_search)
 
         self.refresh()
 
     def refresh(self):
-        self.listw.clear()
-        tasks = self.db.get_all_tasks()
-        # show parent tasks first
-        for t in tasks:
-            category_str = f" [{t[11]}]" if len(t) > 11 and t[11] else ""
-            display = f"[{t[0]}] {t[1]}{category_str} — Status: {t[9] or 'N/A'}"
-            item = QListWidgetItem(display)
-            item.setData(1000, t)  # store full tuple
-            self.listw.addItem(item)
-
-    def show_info(self):
-        it = self.listw.currentItem()
-        if not it: 
+        self.model.reload()
+        self.show_info()
+        self._sync_ticker()
+
+    def run_search(self):
+        self._search_timer.stop()
+        self.model.set_search(self.search.text())
+        self.show_info()
+        self._sync_ticker()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._sync_ticker()
+
+    def hideEvent(self, event):
+        Ticker.shared().unsubscribe(self._tick)
+        super().hideEvent(event)
+
+    def _sync_ticker(self):
+        """Follow the shared clock only while visible with something running."""
+        if self.isVisible() and self.model.running_count():
+            Ticker.shared().subscribe(self._tick)
+        else:
+            Ticker.shared().unsubscribe(self._tick)
+
+    def _tick(self):
+        viewport = self.table.viewport()
+        first = self.table.rowAt(0)
+        if first < 0:
+            return
+        last = self.table.rowAt(viewport.height() - 1)
+        if last < 0:
+            last = self.model.rowCount() - 1
+        self.model.tick(first, last)
+
+    def _current_task(self):
+        """Tuple of the selected task, or None."""
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.model.task(rows[0].row())
+
+    def show_info(self, *_):
+        t = self._current_task()
+        if not t: 
             self.info.setText("Select a task to see details")
             return
-        t = it.data(1000)
         category = t[11] if len(t) > 11 and t[11] else 'N/A'
         txt = f"""
 <b>{t[1]}</b>
@@ -139,9 +440,13 @@ Assigned to: {t[3] or 'N/A'}
 Category: {category}
 Status: {t[9] or 'N/A'}
 Standard Time: {t[7] if t[7] is not None else 0} s
-Total Time: {t[6] if t[6] is not None else 0:.2f} s
+Total Time: {self.model.elapsed(t):.2f} s
 Description: {t[2] or 'N/A'}
 """
+        rollup = self.db.get_wbs_rollup(t[0])
+        if rollup and rollup[4] > 1:
+            txt += (f"WBS subtree ({rollup[4]} tasks): {rollup[1]:.2f} s actual / "
+                    f"{rollup[2]:.2f} s standard, efficiency {rollup[3] * 100:.1f}%\n")
         self.info.setText(txt)
 
     def add_task(self):
@@ -151,18 +456,17 @@ Description: {t[2] or 'N/A'}
             if not v['name']:
                 QMessageBox.warning(self, "Error", "Task name required")
                 return
-            self.db.add_task(v['name'], v['desc'], v['assigned'], v['std'], v['parent'], v['category'])
-            self.refresh()
+            task_id = self.db.add_task(v['name'], v['desc'], v['assigned'], v['std'], v['parent'], v['category'])
+            self.model.task_added(task_id)
 
     def edit_task(self):
-        it = self.listw.currentItem()
-        if not it: return
-        t = it.data(1000)
+        t = self._current_task()
+        if not t: return
         dlg = TaskDialog(self.db, self, task=t)
         if dlg.exec() == QDialog.Accepted:
             v = dlg.values()
             self.db.update_task(t[0], v['name'], v['desc'], v['assigned'], v['std'], v['parent'], v['category'])
-            self.refresh()
+            self._task_changed(t[0])
 
     def load_sample_tasks(self):
         """Load sample industrial tasks from the datasets."""
@@ -201,12 +505,11 @@ Description: {t[2] or 'N/A'}
                 return
             
             group_name = group_list.currentItem().data(1000)
-            self._load_task_group(group_name)
+            self._load_task_groups([group_name])
             dlg.accept()
         
         def load_all():
-            for group in groups:
-                self._load_task_group(group)
+            self._load_task_groups(groups)
             dlg.accept()
         
         load_btn.clicked.connect(load_selected)
@@ -215,63 +518,76 @@ Description: {t[2] or 'N/A'}
         
         dlg.exec()
 
-    def _load_task_group(self, group_name):
-        """Load tasks from a specific group."""
-        tasks = industrial_datasets.get_tasks_by_group(group_name)
-        category = industrial_datasets.get_category_for_group(group_name)
+    def _load_task_groups(self, group_names):
+        """Load tasks from the given groups in a single transaction."""
+        batch = []
+        for group_name in group_names:
+            tasks = industrial_datasets.get_tasks_by_group(group_name)
+            category = industrial_datasets.get_category_for_group(group_name)
+            
+            if not tasks:
+                continue
+            
+            # Parent task for the group; subtasks link to it through its key
+            batch.append({
+                'key': group_name,
+                'task_name': group_name,
+                'description': industrial_datasets.get_group_description(group_name),
+                'assigned_to': "Industrial Engineering",
+                'standard_time': 0,
+                'category': category
+            })
+            for task_key, task_data in tasks.items():
+                batch.append({
+                    'task_name': task_data['name'],
+                    'description': task_data['description'],
+                    'assigned_to': task_data['assigned_to'],
+                    'standard_time': task_data['standard_time'],
+                    'parent_key': group_name,
+                    'category': category
+                })
         
-        if not tasks:
+        if not batch:
             return
         
-        # Create parent task for the group
-        parent_desc = industrial_datasets.get_group_description(group_name)
-        parent_id = self.db.add_task(
-            task_name=group_name,
-            description=parent_desc,
-            assigned_to="Industrial Engineering",
-            standard_time=0,
-            parent_task_id=None,
-            category=category
-        )
-        
-        # Add all subtasks using the returned parent_id
-        for task_key, task_data in tasks.items():
-            self.db.add_task(
-                task_name=task_data['name'],
-                description=task_data['description'],
-                assigned_to=task_data['assigned_to'],
-                standard_time=task_data['standard_time'],
-                parent_task_id=parent_id,
-                category=category
-            )
-        
+        self.db.add_tasks_bulk(batch)
         self.refresh()
+        loaded = sum(1 for t in batch if 'parent_key' in t)
         QMessageBox.information(
             self, 
             "Success", 
-            f"Loaded {len(tasks)} sample tasks from {group_name}"
+            f"Loaded {loaded} sample tasks from {', '.join(group_names)}"
         )
 
     def delete_task(self):
-        it = self.listw.currentItem()
-        if not it: return
-        t = it.data(1000)
+        t = self._current_task()
+        if not t: return
         confirm = QMessageBox.question(self, "Confirm", f"Delete task [{t[0]}] {t[1]}?")
         if confirm == QMessageBox.StandardButton.Yes:
             self.db.delete_task(t[0])
-            self.refresh()
+            self.model.task_removed(t[0])
+            self._sync_ticker()
 
     def start_task(self):
-        it = self.listw.currentItem()
-        if not it: return
-        t = it.data(1000)
+        t = self._current_task()
+        if not t: return
         self.db.start_task(t[0])
-        self.refresh()
+        self._task_changed(t[0])
+
+    def pause_task(self):
+        t = self._current_task()
+        if not t: return
+        self.db.pause_task(t[0])
+        self._task_changed(t[0])
 
     def stop_task(self):
-        it = self.listw.currentItem()
-        if not it: return
-        t = it.data(1000)
+        t = self._current_task()
+        if not t: return
         total = self.db.stop_task(t[0])
+        self._task_changed(t[0])
         QMessageBox.information(self, "Task Stopped", f"Total time recorded: {total:.2f} seconds")
-        self.refresh()
+
+    def _task_changed(self, task_id):
+        self.model.task_changed(task_id)
+        self.show_info()
+        self._sync_ticker()
@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database  # noqa: E402
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'tasks.db'))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def local_zone():
+    """Switch the process to another local time zone for the rest of the test."""
+    saved = os.environ.get('TZ')
+
+    def switch(zone):
+        os.environ['TZ'] = zone
+        time.tzset()
+        database._bucket_bounds_at.cache_clear()
+
+    yield switch
+    if saved is None:
+        os.environ.pop('TZ', None)
+    else:
+        os.environ['TZ'] = saved
+    time.tzset()
+    database._bucket_bounds_at.cache_clear()
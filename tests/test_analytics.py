@@ -0,0 +1,103 @@
+import argparse
+import csv
+import io
+import json
+
+import pytest
+
+import analytics
+from database import Database
+
+REPORTS = sorted(analytics.REPORTS)
+
+
+def site(path, tasks, machines):
+    """A database at ``path``; the efficiency report spans several pages."""
+    db = Database(str(path))
+    db.add_tasks_bulk({'task_name': f'Task {i % 37}', 'category': ('Weld', 'Paint', None)[i % 3],
+                       'assigned_to': f'Op {i % 5}', 'standard_time': 60 * (i % 7), 'total_time': 45 * (i % 11),
+                       'status': 'Completed'} for i in range(tasks))
+    for i in range(machines):
+        db.add_equipment(f'Press {i}', 8, 100 + i)
+        db.update_equipment(db.get_equipment()[-1][0], i % 3, 400 + 10 * i, 380 + 5 * i)
+    db.close()
+    return str(path)
+
+
+@pytest.fixture
+def sites(tmp_path):
+    names = [site(tmp_path / 'north.db', analytics.PAGE_SIZE * 2 + 17, 3), site(tmp_path / 'south.db', 40, 0)]
+    listing = tmp_path / 'sites.txt'
+    listing.write_text('# nightly\n' + '\n\n'.join(names) + '\n')
+    return names, str(listing)
+
+
+def read(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return f.read()
+
+
+def expected(db_name, argv, fmt):
+    """The report written in-process, without the CLI."""
+    args = argparse.Namespace(report=argv[0], format=fmt, group_by='task', top_n=None)
+    for flag, value in zip(argv[1::2], argv[2::2]):
+        setattr(args, flag.lstrip('-').replace('-', '_'), int(value) if flag == '--top-n' else value)
+    columns, rows = analytics.REPORTS[args.report]
+    db = Database(db_name)
+    try:
+        out = io.StringIO(newline='')
+        analytics.WRITERS[fmt](rows(db, args), columns, out)
+        return out.getvalue()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize('fmt', sorted(analytics.WRITERS))
+@pytest.mark.parametrize('report', REPORTS)
+def test_parallel_run_matches_single_process(tmp_path, sites, report, fmt):
+    names, listing = sites
+    out_dir = tmp_path / 'reports'
+    assert analytics.main([report, '--databases', listing, '--out-dir', str(out_dir), '--jobs', '2',
+                           '--format', fmt]) == 0
+    for name in names:
+        single = tmp_path / f'single-{report}.{fmt}'
+        assert analytics.main([report, '--db', name, '--format', fmt, '--output', str(single)]) == 0
+        stem = name.rsplit('/', 1)[-1][:-len('.db')]
+        parallel = read(out_dir / f'{stem}-{report}.{fmt}')
+        assert parallel == read(single) == expected(name, [report], fmt)
+
+
+def test_reports_hold_every_row(sites):
+    north = sites[0][0]
+    rows = list(csv.DictReader(io.StringIO(expected(north, ['efficiency'], 'csv'))))
+    assert len(rows) == len([i for i in range(analytics.PAGE_SIZE * 2 + 17) if i % 11])
+    assert len({row['task_id'] for row in rows}) == len(rows)
+    oee = json.loads(expected(north, ['oee'], 'json'))
+    assert [row['equipment'] for row in oee] == ['Press 0', 'Press 1', 'Press 2']
+    assert json.loads(expected(sites[0][1], ['oee'], 'json')) == []
+
+
+def test_pareto_options_reach_the_workers(tmp_path, sites):
+    names, listing = sites
+    argv = ['pareto', '--group-by', 'category', '--top-n', '2']
+    assert analytics.main(argv + ['--databases', listing, '--out-dir', str(tmp_path), '--jobs', '2']) == 0
+    for name in names:
+        stem = name.rsplit('/', 1)[-1][:-len('.db')]
+        report = read(tmp_path / f'{stem}-pareto.csv')
+        assert report == expected(name, argv, 'csv')
+        # Two groups, then everything else folded into one row
+        assert [line.split(',')[0] for line in report.splitlines()[1:]][-1:] == ['Other']
+        assert len(report.splitlines()) == 4
+
+
+def test_single_database_to_stdout(capsys, sites):
+    north = sites[0][0]
+    assert analytics.main(['efficiency', '--db', north, '--format', 'json']) == 0
+    assert capsys.readouterr().out == expected(north, ['efficiency'], 'json')
+
+
+def test_missing_database_is_a_usage_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        analytics.main(['oee', '--db', str(tmp_path / 'nope.db')])
+    assert exc.value.code == 2
+    assert 'no such database' in capsys.readouterr().err
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+WINDOW = (datetime(2023, 1, 1), datetime(2025, 1, 1))
+
+
+def timed(name, start, hours=1, **task):
+    return {'task_name': name, 'assigned_to': 'Welder', 'status': 'Completed', 'total_time': hours * 3600,
+            'start_time': start, 'end_time': start + timedelta(hours=hours), **task}
+
+
+@pytest.fixture(params=[False, True], ids=['iso', 'epoch'])
+def history(request, db, tmp_path):
+    """Twelve monthly tasks in 2023, archived, and one live task in 2024."""
+    if request.param:
+        db.migrate_to_epoch_timestamps()
+    db.add_tasks_bulk(timed(f'Old {month}', datetime(2023, month, 10, 8)) for month in range(1, 13))
+    db.add_task('Live', '', 'Welder', 60)
+    live = db.get_task_names(limit=1)[0][0]
+    db.start_task(live, at=datetime(2024, 6, 1, 8))
+    db.stop_task(live, at=datetime(2024, 6, 1, 9))
+    assert db.archive_tasks(datetime(2024, 1, 1), str(tmp_path / 'archive')) == 12
+    return db
+
+
+def names(tasks):
+    return sorted(t[1] for t in tasks)
+
+
+def test_archived_tasks_leave_the_live_table(history):
+    assert names(history.get_all_tasks()) == ['Live']
+    assert len(history.get_archives()) == 12
+    assert sum(tasks for _, tasks, *_ in history.get_archives()) == 12
+
+
+def test_range_queries_read_the_archives(history):
+    assert len(history.get_tasks_between(*WINDOW)) == 13
+    assert names(history.get_tasks_between(datetime(2023, 3, 1), datetime(2023, 5, 1))) == ['Old 3', 'Old 4']
+    assert sum(bar[3] for bar in history.get_gantt_bars(*WINDOW)) == 13
+    assert history.task_time_span() == (datetime(2023, 1, 10, 8), datetime(2024, 6, 1, 8))
+
+
+def test_range_queries_inside_a_transaction(history):
+    with history.transaction():
+        history.add_tasks_bulk([timed('Uncommitted', datetime(2024, 7, 1, 8))])
+        assert len(history.get_tasks_between(*WINDOW)) == 14
+        assert sum(bar[3] for bar in history.get_gantt_bars(*WINDOW)) == 14
+        bars = history.get_gantt_bars(*WINDOW, resolution=timedelta(days=365 * 3))
+        assert [(bar[0], bar[3]) for bar in bars] == [('Welder', 14)]
+    # The writer is left usable, with nothing attached
+    history.add_task('After', '', 'Welder', 60)
+    assert len(history.get_tasks_between(*WINDOW)) == 14
+
+
+def test_rerun_archives_nothing_new(history, tmp_path):
+    assert history.archive_tasks(datetime(2024, 1, 1), str(tmp_path / 'archive')) == 0
+    assert history.archive_tasks(datetime(2025, 1, 1), str(tmp_path / 'archive')) == 1
+    assert history.get_all_tasks() == []
+    assert len(history.get_tasks_between(*WINDOW)) == 13
+
+
+def test_archiving_inside_a_transaction_is_refused(history, tmp_path):
+    with pytest.raises(RuntimeError):
+        with history.transaction():
+            history.archive_tasks(datetime(2025, 1, 1), str(tmp_path / 'archive'))
@@ -0,0 +1,60 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+
+def count(db, table):
+    with db._read() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        return cursor.fetchone()[0]
+
+
+def test_bulk_insert_round_trip(db):
+    first = db.add_task('Existing', '', 'Fitter', 5)
+    ids = db.add_tasks_bulk([
+        {'task_name': 'Order 1', 'key': 'o1', 'category': 'ASSEMBLY', 'standard_time': 100},
+        {'task_name': 'Fit', 'parent_key': 'o1', 'assigned_to': 'Fitter', 'standard_time': 60,
+         'status': 'Completed', 'total_time': 90,
+         'start_time': datetime(2024, 3, 4, 8), 'end_time': datetime(2024, 3, 4, 8, 1, 30)},
+        {'task_name': 'Check', 'parent_task_id': first, 'description': 'torque'},
+    ])
+    assert ids == [first + 1, first + 2, first + 3]
+    order, fit, check = (db.get_task(task_id) for task_id in ids)
+    assert (order[1], order[7], order[9], order[10], order[11]) == ('Order 1', 100, 'Pending', None, 'ASSEMBLY')
+    assert (fit[3], fit[4], fit[5], fit[6], fit[8], fit[9], fit[10]) == (
+        'Fitter', '2024-03-04T08:00:00', '2024-03-04T08:01:30', 90, 1.5, 'Completed', ids[0])
+    assert (check[2], check[10]) == ('torque', first)
+    # The timed task gets its closed segment
+    assert [segment[2:] for segment in db.get_segments(fit[0])] == [
+        ('Fitter', int(datetime(2024, 3, 4, 8).timestamp() * 1000),
+         int(datetime(2024, 3, 4, 8, 1, 30).timestamp() * 1000))]
+    assert db.get_wbs_rollup(ids[0])[1:] == (90, 160, 90 / 160, 2)
+    assert db.add_task('Next', '', '', 0) == ids[-1] + 1
+
+
+@pytest.mark.parametrize('bad', [{'description': 'no name'}, {'task_name': None},
+                                 {'task_name': 'x', 'parent_key': 'nope'}])
+def test_a_bad_row_rolls_the_whole_batch_back(db, bad):
+    db.add_task('Existing', '', 'Fitter', 5)
+    before = {table: count(db, table) for table in ('tasks', 'task_segments', 'wbs_rollups', 'change_log')}
+    with pytest.raises((KeyError, sqlite3.IntegrityError)):
+        db.add_tasks_bulk([{'task_name': 'Good', 'start_time': datetime(2024, 3, 4, 8),
+                            'end_time': datetime(2024, 3, 4, 9)}, bad])
+    assert {table: count(db, table) for table in before} == before
+    assert [t[1] for t in db.get_all_tasks()] == ['Existing']
+
+
+def test_transaction_commits_or_rolls_back_together(db):
+    with db.transaction():
+        parent = db.add_task('Parent', '', '', 0)
+        db.add_tasks_bulk([{'task_name': 'Child', 'parent_task_id': parent}])
+        # Reads inside the block see its own rows
+        assert len(db.get_all_tasks()) == 2
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_task('Lost', '', '', 0)
+            db.add_tasks_bulk([{'task_name': 'Lost child'}])
+            raise RuntimeError
+    assert sorted(t[1] for t in db.get_all_tasks()) == ['Child', 'Parent']
+    assert db.get_wbs_rollup(parent)[4] == 2
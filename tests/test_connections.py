@@ -0,0 +1,53 @@
+import threading
+from contextlib import ExitStack
+
+import database
+
+
+def run_with_timeout(target, seconds=10):
+    """Run ``target`` on a thread; returns its result, or fails if it hangs."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', target()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "reader blocked"
+    return result['value']
+
+
+def test_thread_holding_every_reader_can_read_again(db):
+    db.add_task('Weld', '', 'Welder', 60)
+
+    def nested():
+        with ExitStack() as stack:
+            for _ in range(database.READER_POOL_SIZE):
+                stack.enter_context(db.manager.reader())
+            return len(db.get_all_tasks())
+
+    assert run_with_timeout(nested) == 1
+
+
+def test_open_generators_past_the_pool_size(db):
+    db.add_tasks_bulk({'task_name': f'Task {i}'} for i in range(10))
+
+    def interleaved():
+        streams = [db.export_rows('tasks', chunk_size=1) for _ in range(database.READER_POOL_SIZE + 2)]
+        # Every stream holds its reader from its first chunk on
+        firsts = [len(next(stream)) for stream in streams]
+        return [first + sum(len(chunk) for chunk in stream) for first, stream in zip(firsts, streams)]
+
+    assert run_with_timeout(interleaved) == [10] * (database.READER_POOL_SIZE + 2)
+
+
+def test_other_threads_wait_then_read_through_an_extra_connection(db, monkeypatch):
+    monkeypatch.setattr(database, 'READER_WAIT_SECONDS', 0.05)
+    db.add_task('Weld', '', 'Welder', 60)
+    with ExitStack() as stack:
+        held = [stack.enter_context(db.manager.reader()) for _ in range(database.READER_POOL_SIZE)]
+
+        def read():
+            with db.manager.reader() as conn:
+                return conn not in held and conn.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+        assert run_with_timeout(read) == 1
+    # Only the pooled readers came back; the extra one was closed
+    assert db.manager._readers.qsize() == database.READER_POOL_SIZE
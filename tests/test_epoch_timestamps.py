@@ -0,0 +1,106 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from database import Database, _epoch_us
+
+T0 = datetime(2024, 3, 4, 8, 0, 0, 250000)
+T1 = datetime(2024, 3, 4, 9, 30, 0, 999999)
+
+
+def epoch_columns(db, task_id):
+    with db._read() as cursor:
+        cursor.execute('SELECT start_us, end_us FROM tasks WHERE id = ?', (task_id,))
+        return cursor.fetchone()
+
+
+def test_start_and_stop_fill_the_epoch_columns(db):
+    db.migrate_to_epoch_timestamps()
+    task_id = db.add_task('Weld', '', 'Welder', 60)
+    db.start_task(task_id, at=T0)
+    assert epoch_columns(db, task_id) == (_epoch_us(T0), None)
+    db.stop_task(task_id, at=T1)
+    assert epoch_columns(db, task_id) == (_epoch_us(T0), _epoch_us(T1))
+    assert db.get_tasks_between(T0, T1)[0][0] == task_id
+
+
+def row_version(db):
+    with db._read() as cursor:
+        cursor.execute('SELECT version FROM row_version WHERE id = 1')
+        return cursor.fetchone()[0]
+
+
+def test_epoch_columns_take_no_extra_versions(tmp_path):
+    """Timing a task takes as many row versions with the epoch columns as without."""
+    taken = []
+    for epoch in (False, True):
+        db = Database(str(tmp_path / f'{epoch}.db'))
+        if epoch:
+            db.migrate_to_epoch_timestamps()
+        task_id = db.add_task('Weld', '', 'Welder', 60)
+        before = row_version(db)
+        db.start_task(task_id, at=T0)
+        db.pause_task(task_id, at=T0.replace(hour=9))
+        db.resume_task(task_id, at=T1.replace(second=1))
+        db.stop_task(task_id, at=T1.replace(hour=10))
+        taken.append(row_version(db) - before)
+        db.close()
+    assert taken[0] == taken[1]
+
+
+def test_writer_opened_before_the_migration(db):
+    """A process that opened the database earlier writes only the ISO text."""
+    old = sqlite3.connect(db.db_name)
+    old.execute('SELECT * FROM tasks').fetchall()
+    db.migrate_to_epoch_timestamps()
+
+    with old:
+        old.execute("INSERT INTO tasks (task_name, status, start_time, end_time) VALUES ('Grind', 'Completed', ?, ?)",
+                    (T0.isoformat(), T1.isoformat()))
+        inserted = old.execute('SELECT last_insert_rowid()').fetchone()[0]
+        old.execute("INSERT INTO tasks (task_name, status) VALUES ('Deburr', 'Pending')")
+        updated = old.execute('SELECT last_insert_rowid()').fetchone()[0]
+        before = old.execute('SELECT version FROM row_version').fetchone()[0]
+        old.execute('UPDATE tasks SET start_time = ?, end_time = ? WHERE id = ?',
+                    (T0.isoformat(), T1.isoformat(), updated))
+        # Stamped once by the version trigger and once by the epoch trigger
+        assert old.execute('SELECT version FROM row_version').fetchone()[0] == before + 2
+    old.close()
+
+    assert epoch_columns(db, inserted) == (_epoch_us(T0), _epoch_us(T1))
+    assert epoch_columns(db, updated) == (_epoch_us(T0), _epoch_us(T1))
+    assert sorted(t[0] for t in db.get_tasks_between(T0, T1)) == [inserted, updated]
+    assert db.task_time_span() == (T0, T0)
+
+
+def test_databases_migrated_earlier_get_the_triggers(db):
+    db.migrate_to_epoch_timestamps()
+    db.close()
+    with sqlite3.connect(db.db_name) as conn:
+        conn.execute('DROP TRIGGER tasks_epoch_insert')
+        conn.execute('DROP TRIGGER tasks_epoch_update')
+    conn.close()
+
+    reopened = Database(db.db_name)
+    try:
+        with reopened._read() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'tasks_epoch_%' ORDER BY name")
+            assert [row[0] for row in cursor.fetchall()] == ['tasks_epoch_insert', 'tasks_epoch_update']
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize('zone', ['UTC', 'Europe/Berlin', 'America/New_York', 'Asia/Kolkata'])
+def test_trigger_matches_python_conversion(db, local_zone, zone):
+    local_zone(zone)
+    db.migrate_to_epoch_timestamps()
+    times = [datetime(2024, month, 15, hour, 7, 3, micro) for month in (1, 7) for hour in (0, 12, 23)
+             for micro in (0, 5, 999999)]
+    old = sqlite3.connect(db.db_name)
+    with old:
+        old.executemany("INSERT INTO tasks (task_name, start_time) VALUES ('t', ?)", [(t.isoformat(),) for t in times])
+    old.close()
+    with db._read() as cursor:
+        cursor.execute('SELECT start_us FROM tasks ORDER BY id')
+        assert [row[0] for row in cursor.fetchall()] == [_epoch_us(t) for t in times]
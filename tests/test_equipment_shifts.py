@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+from database import _bucket_bounds
+
+ZONES = ['UTC', 'Europe/Berlin', 'America/New_York', 'Asia/Kolkata', 'America/St_Johns', 'Asia/Kathmandu']
+
+
+@pytest.mark.parametrize('zone', ZONES)
+@pytest.mark.parametrize('period, hours', [('shift', 8), ('day', 24), ('week', 24 * 7)])
+def test_buckets_start_on_local_shift_boundaries(local_zone, zone, period, hours):
+    local_zone(zone)
+    for minute in range(0, 24 * 60, 15):
+        ts = datetime(2024, 3, 4, minute // 60, minute % 60).timestamp()
+        lo, hi = _bucket_bounds(ts, period)
+        start = datetime.fromtimestamp(lo)
+        assert lo <= ts < hi
+        assert (start.minute, (start.hour - 6) % 8) == (0, 0)
+        # On the wall clock: a week with a DST change is an hour short or long
+        assert datetime.fromtimestamp(hi) - start == timedelta(hours=hours)
+
+
+def test_bounds_not_holding_the_instant_are_an_error(monkeypatch):
+    """Raised, not asserted, so it still stops bad rollups under python -O."""
+    monkeypatch.setattr(database, '_bucket_bounds_at', lambda ts, period: (ts - 7200, ts - 3600))
+    with pytest.raises(ValueError):
+        _bucket_bounds(1_700_000_000, 'shift')
+
+
+@pytest.mark.parametrize('zone', ZONES)
+def test_downtime_is_split_at_local_shift_ends(db, local_zone, zone):
+    local_zone(zone)
+    db.add_equipment('Press', 8, 100)
+    start = datetime(2024, 3, 4, 13, 15).timestamp()
+    db.record_equipment_events([(1, start, 'downtime', 1.5), (1, start, 'output', 50)])
+
+    with db._read() as cursor:
+        cursor.execute("SELECT ts, value FROM equipment_events WHERE kind = 'downtime' ORDER BY ts")
+        pieces = cursor.fetchall()
+    assert [(datetime.fromtimestamp(ts), value) for ts, value in pieces] == [
+        (datetime(2024, 3, 4, 13, 15), 0.75),
+        (datetime(2024, 3, 4, 14, 0), 0.75),
+    ]
+
+
+@pytest.mark.parametrize('zone', ZONES)
+def test_window_oee_in_any_zone(db, local_zone, zone):
+    local_zone(zone)
+    db.add_equipment('Press', 8, 100)
+    t0 = datetime(2024, 3, 4, 6, 15).timestamp()
+    t1 = datetime(2024, 3, 11, 12, 0).timestamp()
+    db.record_equipment_events([(1, t0, 'downtime', 1.0), (1, t0, 'output', 50), (1, t0, 'scrap', 5)])
+
+    _, _, availability, _, quality, _ = db.compute_oee_window(1, t0, t1)
+    planned = (t1 - t0) / 3600
+    assert availability == pytest.approx((planned - 1.0) / planned)
+    assert quality == pytest.approx(0.9)
+
+
+def equipment_events(db):
+    with db._read() as cursor:
+        cursor.execute('SELECT ts, kind, value FROM equipment_events ORDER BY id')
+        return cursor.fetchall()
+
+
+def test_form_totals_become_events_at_the_current_time(db):
+    db.add_equipment('Press', 8, 100)
+    before = datetime.now().timestamp()
+    db.update_equipment(1, 0.5, 200, 190)
+    db.update_equipment(1, 0.5, 260, 245)
+    events = equipment_events(db)
+    assert all(ts >= before for ts, _, _ in events)
+    assert [(kind, value) for _, kind, value in events] == [
+        ('downtime', 0.5), ('output', 200), ('scrap', 10), ('output', 60), ('scrap', 5)]
+    assert db.get_equipment(1)[3:6] == (0.5, 260, 245)
+
+
+# Less downtime, less output, and good units growing more than output (less scrap)
+@pytest.mark.parametrize('totals', [(0.5, 200, 190), (1.0, 150, 145), (1.0, 200, 200), (1.0, 210, 215)])
+def test_form_totals_cannot_shrink(db, totals):
+    db.add_equipment('Press', 8, 100)
+    db.update_equipment(1, 1.0, 200, 190)
+    with pytest.raises(ValueError):
+        db.update_equipment(1, *totals)
+    assert db.get_equipment(1)[3:6] == (1.0, 200, 190)
+    assert len(equipment_events(db)) == 3
+
+
+@pytest.mark.parametrize('event', [
+    (1, 1_700_000_000, 'output', -5),
+    (1, 1_700_000_000, 'downtime', float('nan')),
+    (1, 1_700_000_000, 'scrap', float('inf')),
+    (1, float('nan'), 'output', 5),
+    (1, 1_700_000_000, 'output', '5'),
+    (1, 1_700_000_000, 'rework', 5),
+])
+def test_invalid_events_store_nothing(db, event):
+    db.add_equipment('Press', 8, 100)
+    with pytest.raises(ValueError):
+        db.record_equipment_events([(1, 1_700_000_000, 'output', 10), event])
+    assert equipment_events(db) == []
+    assert db.get_equipment(1)[4] == 0
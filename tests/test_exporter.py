@@ -0,0 +1,84 @@
+import csv
+import sqlite3
+
+import pytest
+
+import exporter
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def exported(out_dir, table='tasks'):
+    """Rows of every file of ``table`` listed in the manifest, oldest file first."""
+    state = exporter.load_manifest(out_dir)['tables'][table]
+    return [row for entry in state['files'] for row in read_csv(out_dir / entry['file'])]
+
+
+def test_full_export_into_a_new_directory(db, tmp_path):
+    db.add_task('Weld', '', 'Welder', 60)
+    # A writer that takes no version leaves the column at its default, 0
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("INSERT INTO tasks (task_name, status) VALUES ('Legacy', 'Pending')")
+    conn.commit()
+    conn.close()
+
+    out_dir = tmp_path / 'exports' / 'nightly'
+    entry = exporter.export_table(db, 'tasks', str(out_dir))
+    assert entry['rows'] == 2
+    assert sorted(row['task_name'] for row in exported(out_dir)) == ['Legacy', 'Weld']
+    assert not list(out_dir.glob('*.tmp'))
+
+
+def test_incremental_exports_follow_the_watermark(db, tmp_path):
+    first = db.add_task('Weld', '', 'Welder', 60)
+    out_dir = tmp_path / 'exports'
+    full = exporter.export_table(db, 'tasks', str(out_dir))
+    assert exporter.export_table(db, 'tasks', str(out_dir), incremental=True) is None
+
+    db.add_task('Grind', '', 'Welder', 30)
+    db.update_task(first, 'Weld seam', '', 'Welder', 60)
+    entry = exporter.export_table(db, 'tasks', str(out_dir), incremental=True)
+    assert entry['after'] == full['watermark'] and entry['rows'] == 2
+    with db._read() as cursor:
+        cursor.execute('SELECT MAX(version) FROM tasks')
+        assert entry['watermark'] == cursor.fetchone()[0]
+    manifest = exporter.load_manifest(str(out_dir))
+    assert manifest['tables']['tasks']['watermark'] == entry['watermark']
+    assert [f['file'] for f in manifest['tables']['tasks']['files']] == [full['file'], entry['file']]
+
+    # The union of the files, keeping each id's highest version, is the table
+    latest = {}
+    for row in exported(out_dir):
+        if row['id'] not in latest or int(row['version']) > int(latest[row['id']]['version']):
+            latest[row['id']] = row
+    assert sorted(row['task_name'] for row in latest.values()) == ['Grind', 'Weld seam']
+
+    # A full snapshot replaces the earlier files
+    again = exporter.export_table(db, 'tasks', str(out_dir))
+    assert [f['file'] for f in exporter.load_manifest(str(out_dir))['tables']['tasks']['files']] == [again['file']]
+    assert not (out_dir / full['file']).exists() and not (out_dir / entry['file']).exists()
+
+
+def test_tables_without_a_watermark_are_exported_whole(db, tmp_path):
+    db.add_equipment('Press 1', 480, 100)
+    db.record_equipment_events([(1, 1_700_000_000, 'output', 40)])
+    out_dir = tmp_path / 'exports'
+    first = exporter.export_table(db, 'equipment_rollups', str(out_dir), incremental=True)
+    second = exporter.export_table(db, 'equipment_rollups', str(out_dir), incremental=True)
+    assert first['rows'] == second['rows'] > 0
+
+
+def test_parquet_round_trip(db, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    db.add_task('Weld', '', 'Welder', 60)
+    out_dir = tmp_path / 'exports'
+    full = exporter.export_table(db, 'tasks', str(out_dir), 'parquet')
+    db.add_task('Grind', '', 'Welder', 30)
+    entry = exporter.export_table(db, 'tasks', str(out_dir), 'parquet', incremental=True)
+    assert pq.read_table(out_dir / full['file']).column('task_name').to_pylist() == ['Weld']
+    table = pq.read_table(out_dir / entry['file'])
+    assert table.column('task_name').to_pylist() == ['Grind']
+    assert table.schema.field('version').type == 'int64'
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+DAY = datetime(2024, 3, 4)
+WINDOW = (DAY, DAY + timedelta(days=1))
+
+
+def at(hour, minute=0, second=0, micro=0):
+    return DAY.replace(hour=hour, minute=minute, second=second, microsecond=micro)
+
+
+def timed(name, lane, start, end):
+    return {'task_name': name, 'assigned_to': lane, 'status': 'Completed', 'start_time': start, 'end_time': end,
+            'total_time': (end - start).total_seconds()}
+
+
+@pytest.fixture(params=[False, True], ids=['iso', 'epoch'])
+def gantt(request, db):
+    if request.param:
+        db.migrate_to_epoch_timestamps()
+    return db
+
+
+def spans(bars):
+    return [(lane, start.time().isoformat(), end.time().isoformat(), count) for lane, start, end, count, _, _ in bars]
+
+
+def test_without_resolution_every_task_is_a_bar(gantt):
+    ids = gantt.add_tasks_bulk([timed('Weld', 'Welder', at(8), at(8, 10)),
+                                timed('Grind', 'Welder', at(8, 10), at(8, 20)),
+                                timed('Paint', 'Painter', at(8, 5), at(9)),
+                                timed('Sweep', None, at(7), at(7, 5))])
+    bars = gantt.get_gantt_bars(*WINDOW)
+    assert spans(bars) == [('', '07:00:00', '07:05:00', 1), ('Painter', '08:05:00', '09:00:00', 1),
+                           ('Welder', '08:00:00', '08:10:00', 1), ('Welder', '08:10:00', '08:20:00', 1)]
+    assert [(bar[4], bar[5]) for bar in bars] == [(ids[3], 'Sweep'), (ids[2], 'Paint'), (ids[0], 'Weld'),
+                                                 (ids[1], 'Grind')]
+
+
+def test_bars_closer_than_the_resolution_merge(gantt):
+    gantt.add_tasks_bulk([timed('A', 'Welder', at(8), at(10)),
+                          timed('B', 'Welder', at(8, 30), at(8, 40)),     # inside A
+                          timed('C', 'Welder', at(10, 0, 30), at(10, 5)),  # 30 s after A ends
+                          timed('D', 'Welder', at(10, 6, 30), at(10, 7)),  # 90 s after C ends
+                          timed('E', 'Fitter', at(10, 0, 10), at(10, 1))])
+    bars = gantt.get_gantt_bars(*WINDOW, resolution=timedelta(minutes=1))
+    assert spans(bars) == [('Fitter', '10:00:10', '10:01:00', 1),
+                           ('Welder', '08:00:00', '10:05:00', 3),
+                           ('Welder', '10:06:30', '10:07:00', 1)]
+    # Merged bars name no single task
+    assert [bar[4] is None for bar in bars] == [False, True, False]
+    assert gantt.get_gantt_bars(*WINDOW, resolution=60_000_000) == bars
+
+
+def test_merging_crosses_resolution_bucket_boundaries(gantt):
+    # X and Y start in neighbouring one-minute buckets but only 30 s apart
+    gantt.add_tasks_bulk([timed('X', 'Welder', at(8, 0, 59), at(8, 0, 59, 500000)),
+                          timed('Y', 'Welder', at(8, 1, 30), at(8, 1, 40)),
+                          # Same bucket as Y, and within a minute of its end
+                          timed('Z', 'Welder', at(8, 1, 50), at(8, 1, 55)),
+                          # A minute and more after Z: a new bar
+                          timed('W', 'Welder', at(8, 2, 55), at(8, 3))])
+    bars = gantt.get_gantt_bars(*WINDOW, resolution=timedelta(minutes=1))
+    assert spans(bars) == [('Welder', '08:00:59', '08:01:55', 3), ('Welder', '08:02:55', '08:03:00', 1)]
+
+
+def test_only_tasks_overlapping_the_window(gantt):
+    gantt.add_tasks_bulk([timed('Before', 'Welder', at(6), at(7)),
+                          timed('Across', 'Welder', at(7, 30), at(8, 30)),
+                          timed('After', 'Welder', at(9), at(10))])
+    bars = gantt.get_gantt_bars(at(8), at(9))
+    assert [bar[5] for bar in bars] == ['Across']
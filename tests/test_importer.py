@@ -0,0 +1,74 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from importer import RecordError, clean, import_file
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    return str(path)
+
+
+def test_offsets_are_stored_as_naive_local_time(db, tmp_path, local_zone):
+    local_zone('Europe/Berlin')
+    path = write_jsonl(tmp_path / 'mixed.jsonl', [
+        {'task_name': 'UTC', 'start_time': '2024-03-04T07:00:00Z', 'end_time': '2024-03-04T08:00:00Z'},
+        {'task_name': 'Offset', 'start_time': '2024-03-04T10:00:00+02:00', 'end_time': '2024-03-04T11:00:00+02:00'},
+        {'task_name': 'Local', 'start_time': '2024-03-04T12:00:00', 'end_time': '2024-03-04T13:00:00'},
+    ])
+    assert import_file(db, path) == (3, 3, 0)
+
+    tasks = sorted(db.get_all_tasks())
+    assert [(t[4], t[5]) for t in tasks] == [
+        ('2024-03-04T08:00:00', '2024-03-04T09:00:00'),
+        ('2024-03-04T09:00:00', '2024-03-04T10:00:00'),
+        ('2024-03-04T12:00:00', '2024-03-04T13:00:00'),
+    ]
+    first, last = db.task_time_span()
+    assert last - first == datetime(2024, 3, 4, 12) - datetime(2024, 3, 4, 8)
+    assert len(db.get_tasks_between(datetime(2024, 3, 4, 8, 30), datetime(2024, 3, 4, 9, 30))) == 2
+
+
+def test_clean_converts_offsets():
+    at = datetime(2024, 3, 4, 7, 0, tzinfo=timezone.utc)
+    record = clean({'task_name': 'Weld', 'start_time': at.isoformat()})
+    assert record['start_time'] == at.astimezone().replace(tzinfo=None)
+    assert record['start_time'].tzinfo is None
+
+
+@pytest.mark.parametrize('value', ['0001-01-01T00:00:00+05:00', '0001-01-01T00:00:00', 'yesterday'])
+def test_clean_rejects_unusable_times(value):
+    with pytest.raises(RecordError):
+        clean({'task_name': 'Weld', 'start_time': value})
+
+
+def test_interrupted_import_resumes_after_the_last_batch(db, tmp_path):
+    records = [{'task_name': f'Task {i}', 'key': f'k{i}', 'parent_key': 'k0' if i else None} for i in range(25)]
+    records[7] = {'description': 'no name'}
+    path = write_jsonl(tmp_path / 'history.jsonl', records)
+
+    def stop_after_two_batches(read, inserted, rejected):
+        if read >= 20:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        import_file(db, path, batch_size=10, progress=stop_after_two_batches)
+    assert db.get_import_progress(os.path.abspath(path))[0] == 20
+    assert len(db.get_all_tasks()) == 19
+
+    assert import_file(db, path, batch_size=10) == (25, 5, 0)
+    tasks = db.get_all_tasks()
+    assert sorted(t[1] for t in tasks) == sorted(f'Task {i}' for i in range(25) if i != 7)
+    root = next(t[0] for t in tasks if t[1] == 'Task 0')
+    assert all(t[10] == root for t in tasks if t[1] != 'Task 0')
+
+    # Run again: nothing left to do
+    assert import_file(db, path, batch_size=10) == (25, 0, 0)
+    assert len(db.get_all_tasks()) == 24
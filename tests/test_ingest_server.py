@@ -0,0 +1,76 @@
+import asyncio
+import json
+from datetime import datetime
+from http import HTTPStatus
+
+import pytest
+
+from ingest_server import EventError, IngestService, parse_event
+
+RECEIVED = datetime(2024, 3, 4, 8, 0)
+
+
+@pytest.fixture
+def service(db):
+    service = IngestService(db, commit_interval_ms=0)
+    yield service
+    service.close()
+
+
+def post(service, events):
+    async def run():
+        writer = asyncio.ensure_future(service.run_writer())
+        try:
+            return await service.post_events(json.dumps(events).encode())
+        finally:
+            writer.cancel()
+    return asyncio.run(run())
+
+
+def test_parse_event_converts_offsets_to_local_time():
+    at = datetime(2024, 3, 4, 9, 30).astimezone()
+    _, _, _, parsed = parse_event({'task_id': 1, 'action': 'start', 'at': at.isoformat()}, RECEIVED)
+    assert parsed == datetime(2024, 3, 4, 9, 30)
+    assert parsed.tzinfo is None
+
+
+@pytest.mark.parametrize('at', ['0001-01-01T00:00:00', '0001-01-01T00:00:00+05:00', 1e20, 'yesterday'])
+def test_parse_event_refuses_unusable_times(at):
+    with pytest.raises(EventError):
+        parse_event({'task_id': 1, 'action': 'start', 'at': at}, RECEIVED)
+
+
+def test_out_of_range_time_is_a_bad_request(db, service):
+    task_id = db.add_task('Weld', '', 'Welder', 60)
+    status, payload = post(service, [{'task_id': task_id, 'action': 'start'},
+                                     {'task_id': task_id, 'action': 'stop', 'at': '0001-01-01T00:00:00'}])
+    assert status == HTTPStatus.BAD_REQUEST
+    assert payload['index'] == 1
+    assert db.get_open_segments(task_id) == []
+
+
+def test_failing_event_does_not_cost_the_batch(db, service):
+    first = db.add_task('Weld', '', 'Welder', 60)
+    second = db.add_task('Grind', '', 'Welder', 60)
+    # Bypasses parse_event, as a value only the database chokes on would
+    results = service._commit([
+        (first, 'start', None, RECEIVED),
+        (second, 'start', None, datetime(1, 1, 1)),
+        (second, 'start', None, RECEIVED),
+        (999, 'start', None, RECEIVED),
+    ])
+    assert 'segment_id' in results[0]
+    assert 'error' in results[1]
+    assert 'segment_id' in results[2]
+    assert results[3] == {'error': "unknown task 999"}
+    assert len(db.get_open_segments(first)) == 1
+    assert len(db.get_open_segments(second)) == 1
+
+
+def test_events_commit_and_reply(db, service):
+    task_id = db.add_task('Weld', '', 'Welder', 60)
+    status, payload = post(service, [{'task_id': task_id, 'action': 'start', 'at': '2024-03-04T08:00:00'},
+                                     {'task_id': task_id, 'action': 'stop', 'at': '2024-03-04T08:10:00'}])
+    assert status == HTTPStatus.OK
+    assert payload['results'][1] == {'total_time': pytest.approx(600)}
+    assert db.get_task(task_id)[9] == 'Completed'
@@ -0,0 +1,49 @@
+import pytest
+
+
+def machine(db, planned, standard_output, downtime=0, output=0, good=0):
+    db.add_equipment('Press', planned, standard_output)
+    eq = db.get_equipment()[-1][0]
+    if downtime or output or good:
+        db.update_equipment(eq, downtime, output, good)
+    return eq
+
+
+def breakdown(db, eq):
+    """``(availability, performance, quality, oee %)``, checked to agree across the three entry points."""
+    row = next(row for row in db.compute_oee_all() if row[0] == eq)
+    assert db.compute_oee(eq) == pytest.approx(row[5])
+    return tuple(row[2:])
+
+
+def test_running_machine(db):
+    eq = machine(db, 8, 100, downtime=2, output=480, good=456)
+    assert breakdown(db, eq) == pytest.approx((0.75, 0.8, 0.95, 0.75 * 0.8 * 0.95 * 100))
+
+
+def test_zero_planned_time(db):
+    eq = machine(db, 0, 100, output=50, good=50)
+    assert breakdown(db, eq) == (0, 0, 0, 0)
+
+
+def test_zero_output(db):
+    eq = machine(db, 8, 100, downtime=2)
+    assert breakdown(db, eq) == pytest.approx((0.75, 0, 0, 0))
+
+
+def test_zero_standard_output(db):
+    eq = machine(db, 8, 0, output=50, good=45)
+    assert breakdown(db, eq) == pytest.approx((1, 0, 0.9, 0))
+
+
+@pytest.mark.parametrize('downtime', [8, 12])
+def test_downtime_at_or_past_planned_time(db, downtime):
+    eq = machine(db, 8, 100, downtime=downtime, output=10, good=10)
+    assert breakdown(db, eq) == pytest.approx((0, 0, 1, 0))
+
+
+def test_window_with_more_downtime_than_its_length(db):
+    eq = machine(db, 8, 100)
+    db.record_equipment_events([(eq, 1_700_000_000, 'downtime', 3)])
+    _, _, availability, performance, _, oee = db.compute_oee_window(eq, 1_700_000_000, 1_700_003_600)
+    assert (availability, performance, oee) == (0, 0, 0)
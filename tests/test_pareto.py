@@ -0,0 +1,24 @@
+import pytest
+
+
+def test_blank_and_missing_assignees_are_one_bar(db):
+    db.add_tasks_bulk([
+        {'task_name': 'Weld', 'assigned_to': 'Welder', 'total_time': 400},
+        {'task_name': 'Grind', 'assigned_to': '', 'total_time': 200},
+        {'task_name': 'Deburr', 'assigned_to': None, 'total_time': 100},
+        {'task_name': 'Paint', 'assigned_to': 'Painter', 'total_time': 50},
+    ])
+    assert db.pareto('assignee') == [
+        ('Welder', 400, pytest.approx(400 / 750 * 100)),
+        ('Unassigned', 300, pytest.approx(700 / 750 * 100)),
+        ('Painter', 50, pytest.approx(100.0)),
+    ]
+
+
+def test_top_n_folds_the_rest_into_other(db):
+    db.add_tasks_bulk({'task_name': f'Task {i}', 'total_time': 10 * (i + 1)} for i in range(5))
+    assert db.pareto('task', 2) == [
+        ('Task 4', 50, pytest.approx(50 / 150 * 100)),
+        ('Task 3', 40, pytest.approx(90 / 150 * 100)),
+        ('Other', 60, pytest.approx(100.0)),
+    ]
@@ -0,0 +1,89 @@
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+from database import QueryCache
+
+
+def hits(db):
+    return db.manager.cache.hits
+
+
+def test_repeated_reads_are_served_from_the_cache(db):
+    db.add_tasks_bulk({'task_name': f'Task {i}'} for i in range(100))
+    first = db.get_task_names(limit=20)
+    before = hits(db)
+    assert db.get_task_names(limit=20) == first
+    assert hits(db) == before + 1
+
+
+def test_writes_invalidate_what_they_change(db):
+    kept = db.add_task('Weld', '', 'Welder', 60)
+    edited = db.add_task('Grind', '', 'Welder', 60)
+    db.get_task(kept), db.get_task(edited), db.get_task_names()
+
+    db.update_task(edited, 'Polish', '', 'Welder', 60, None, None)
+    assert db.get_task(edited)[1] == 'Polish'
+    assert db.get_task_names()[0] == (edited, 'Polish')
+    before = hits(db)
+    assert db.get_task(kept)[1] == 'Weld'
+    assert hits(db) == before + 1
+
+    added = db.add_task('Paint', '', 'Painter', 60)
+    assert db.get_task_names()[0] == (added, 'Paint')
+    db.delete_task(kept)
+    assert db.get_task(kept) is None
+    assert [task_id for task_id, _ in db.get_task_names()] == [added, edited]
+
+
+def test_rolled_back_writes_leave_no_trace(db):
+    task_id = db.add_task('Weld', '', 'Welder', 60)
+    db.get_task(task_id)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.update_task(task_id, 'Polish', '', 'Welder', 60, None, None)
+            assert db.get_task(task_id)[1] == 'Polish'
+            raise RuntimeError()
+    assert db.get_task(task_id)[1] == 'Weld'
+
+
+def test_writes_through_another_connection(db):
+    task_id = db.add_task('Weld', '', 'Welder', 60)
+    assert db.get_task(task_id)[1] == 'Weld'
+    assert db.get_all_tasks()[0][1] == 'Weld'
+
+    with sqlite3.connect(db.db_name) as other:
+        other.execute("UPDATE tasks SET task_name = 'Polish' WHERE id = ?", (task_id,))
+    other.close()
+    assert db.get_task(task_id)[1] == 'Polish'
+    assert db.get_all_tasks()[0][1] == 'Polish'
+
+
+def test_writes_by_another_process(db):
+    task_id = db.add_task('Weld', '', 'Welder', 60)
+    assert db.get_task_names() == [(task_id, 'Weld')]
+
+    subprocess.run([sys.executable, '-c', f'''
+from database import Database
+db = Database({db.db_name!r})
+db.update_task({task_id}, 'Polish', '', 'Welder', 60, None, None)
+db.add_task('Paint', '', 'Painter', 60)
+db.close()
+'''], cwd=ROOT, check=True)
+    assert [name for _, name in db.get_task_names()] == ['Paint', 'Polish']
+    assert db.get_task(task_id)[1] == 'Polish'
+
+
+def test_results_over_a_quarter_of_the_budget_are_not_kept():
+    cache = QueryCache(budget=64 * 1024)
+    small, large = [(1, 'Weld')], [(i, 'Weld' * 10) for i in range(1000)]
+    for key, value in (('small', small), ('large', large)):
+        cache.put(key, (('tasks', None),), cache.versions((('tasks', None),)), value)
+    assert cache.get('small') == (True, small)
+    assert cache.get('large') == (False, None)
+
+    cache.invalidate([('tasks', [1])])
+    assert cache.get('small') == (False, None)
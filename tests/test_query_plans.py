@@ -0,0 +1,236 @@
+"""
+Query-plan coverage of database.py.
+
+Runs every public ``Database`` method against an in-memory database, captures
+each SQL statement it issues through sqlite3's trace callback and checks the
+output of ``EXPLAIN QUERY PLAN``. Fails if a statement scans a whole table,
+unless it is one of WHOLE_TABLE_READS, or if a public method is not
+exercised here.
+"""
+import re
+import tempfile
+from datetime import datetime
+
+import pytest
+
+from database import Database
+
+# Public methods that issue no queries of their own
+NOT_QUERIES = {'connect', 'close', 'create_tables', 'schema_version', 'task_interval', 'transaction'}
+
+PLANNED_KEYWORDS = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+
+# Epoch-microsecond bounds for the get_tasks_between() calls
+WINDOW = (1_700_000_000_000_000, 1_800_000_000_000_000)
+
+# Plan line of an FTS5 table answering a MATCH constraint
+FULL_TEXT_MATCH = re.compile(r'VIRTUAL TABLE INDEX \d+:\S*M')
+
+# Schema names the archive queries attach archive files under
+ARCHIVE_SCHEMA = re.compile(r"\b(archive(?:_\d+)?)'?\.")
+
+# The statements allowed to read a whole table: (method, pattern the
+# statement, whitespace collapsed, must match in full). Any other statement
+# of the same method that scans still fails.
+WHOLE_TABLE_READS = [
+    # Walks the partial index, which only holds segments running now
+    ('get_open_segments', r'SELECT id, task_id, operator, start_ms, end_ms FROM task_segments WHERE end_ms IS NULL'),
+    # Returning every row is the point of these
+    ('get_all_tasks', r'SELECT \* FROM tasks'),
+    ('get_equipment', r'SELECT id, equipment_name, planned_time, downtime, actual_output, good_units, '
+                      r'standard_output FROM equipment'),
+    ('compute_oee_all', r'SELECT id, equipment_name, availability, .* FROM equipment \)'),
+    # Aggregating all recorded time reads a whole covering index by design
+    ('pareto', r'WITH grouped AS \(SELECT task_name AS k, SUM\(total_time\) AS total FROM tasks '
+               r'WHERE total_time > 0 GROUP BY task_name\), .*'),
+    # Full snapshots, in watermark order; a table without a watermark is always exported whole
+    ('export_rows', r'SELECT \* FROM (tasks|task_segments|equipment) ORDER BY version'),
+    ('export_rows', r'SELECT \* FROM equipment_events ORDER BY id'),
+    ('export_rows', r'SELECT \* FROM equipment_rollups'),
+]
+
+
+def remote_batches(db, child):
+    """Two change-log batches from another station: rows to insert, then to update and delete."""
+    def task(name, parent=None):
+        return {'task_name': name, 'description': None, 'assigned_to': 'op', 'start_time': None, 'end_time': None,
+                'total_time': 5, 'standard_time': 10, 'efficiency': 0.5, 'status': 'Completed',
+                'category': 'QUALITY', 'parent_task_id': parent}
+
+    def change(table, number, row=None):
+        return {'table': table, 'id': f"elsewhere:{number}", 'deleted': row is None, **({'row': row} if row else {})}
+
+    segment = {'operator': 'op', 'start_ms': 1_700_000_000_000, 'end_ms': 1_700_000_005_000, 'task_id': 'elsewhere:2'}
+    equipment = {'equipment_name': 'eq', 'planned_time': 8, 'downtime': 0, 'actual_output': 0, 'good_units': 0,
+                 'standard_output': 100}
+    inserts = {'station': 'elsewhere', 'last_seq': 4, 'changes': [
+        change('tasks', 1, task('remote parent')), change('tasks', 2, task('remote child', 'elsewhere:1')),
+        change('task_segments', 1, segment), change('equipment', 1, equipment)]}
+    updates = {'station': 'elsewhere', 'last_seq': 8, 'changes': [
+        change('tasks', 2, task('remote child', db.global_task_id(child))), change('tasks', 1),
+        change('task_segments', 1), change('equipment', 1)]}
+    return inserts, updates
+
+
+def exercises(db, ids, archive_dir):
+    """(method name, call) for every public method."""
+    parent, child, eq = ids
+    inserts, updates = remote_batches(db, child)
+    return [
+        ('add_task', lambda: db.add_task('t', 'd', 'op', 10, parent, 'QUALITY')),
+        ('add_tasks_bulk', lambda: db.add_tasks_bulk([{'task_name': 'p', 'key': 'p'}, {'task_name': 'c', 'parent_key': 'p'}])),
+        ('start_task', lambda: db.start_task(child)),
+        ('pause_task', lambda: db.pause_task(child)),
+        ('resume_task', lambda: db.resume_task(child, 'second operator')),
+        ('get_open_segments', lambda: db.get_open_segments(child)),
+        ('get_open_segments', lambda: db.get_open_segments()),
+        ('stop_task', lambda: db.stop_task(child)),
+        ('get_segments', lambda: db.get_segments(child)),
+        ('get_all_tasks', lambda: db.get_all_tasks()),
+        ('get_tasks_page', lambda: db.get_tasks_page(parent, 100)),
+        ('get_task_names', lambda: db.get_task_names()),
+        ('get_task', lambda: db.get_task(child)),
+        ('existing_task_ids', lambda: db.existing_task_ids([parent, child, child + 1000])),
+        ('update_task', lambda: db.update_task(child, 't', 'd', 'op', 10, parent, 'QUALITY')),
+        ('get_children', lambda: db.get_children(parent)),
+        ('get_root_tasks', lambda: db.get_root_tasks()),
+        ('find_tasks', lambda: db.find_tasks(status='Completed')),
+        ('find_tasks', lambda: db.find_tasks(category='QUALITY')),
+        ('find_tasks', lambda: db.find_tasks(assigned_to='op')),
+        ('search_tasks', lambda: db.search_tasks('chi op')),
+        ('get_wbs_rollup', lambda: db.get_wbs_rollup(parent)),
+        ('compute_wbs_rollup', lambda: db.compute_wbs_rollup(parent)),
+        ('get_descendant_ids', lambda: db.get_descendant_ids(parent)),
+        ('pareto', lambda: db.pareto('task', 5)),
+        ('pareto', lambda: db.pareto('parent')),
+        ('add_equipment', lambda: db.add_equipment('eq', 8, 100)),
+        ('update_equipment', lambda: db.update_equipment(eq, 1, 700, 690)),
+        ('get_equipment', lambda: db.get_equipment(eq)),
+        ('get_equipment', lambda: db.get_equipment()),
+        ('compute_oee', lambda: db.compute_oee(eq)),
+        ('record_equipment_events', lambda: db.record_equipment_events(
+            [(eq, 1_700_000_000, 'downtime', 10), (eq, 1_700_000_000, 'output', 50)])),
+        ('compute_oee_window', lambda: db.compute_oee_window(eq, 1_699_990_000, 1_701_000_000)),
+        ('get_oee_history', lambda: db.get_oee_history(eq, 'day')),
+        ('compute_oee_all', lambda: db.compute_oee_all()),
+        ('get_tasks_between', lambda: db.get_tasks_between(WINDOW[0], WINDOW[1])),
+        ('get_gantt_bars', lambda: db.get_gantt_bars(WINDOW[0], WINDOW[1], 60_000_000)),
+        ('task_time_span', lambda: db.task_time_span()),
+        ('migrate_to_epoch_timestamps', lambda: db.migrate_to_epoch_timestamps(chunk_size=1)),
+        ('get_tasks_between', lambda: db.get_tasks_between(WINDOW[0], WINDOW[1])),
+        ('get_tasks_between', lambda: db.get_tasks_between(t1=WINDOW[1])),
+        ('get_gantt_bars', lambda: db.get_gantt_bars(WINDOW[0], WINDOW[1], 60_000_000)),
+        ('task_time_span', lambda: db.task_time_span()),
+        # The Gantt chart's unbounded view wants every timed task
+        ('get_tasks_between', lambda: db.get_tasks_between()),
+        ('get_gantt_bars', lambda: db.get_gantt_bars()),
+        ('archive_tasks', lambda: db.archive_tasks(datetime(2024, 1, 1), archive_dir)),
+        ('get_archives', lambda: db.get_archives()),
+        ('get_tasks_between', lambda: db.get_tasks_between(WINDOW[0], WINDOW[1])),
+        ('get_gantt_bars', lambda: db.get_gantt_bars(WINDOW[0], WINDOW[1], 60_000_000)),
+        ('task_time_span', lambda: db.task_time_span()),
+        ('import_tasks_batch', lambda: db.import_tasks_batch(
+            'mes.csv', [{'task_name': 'p', 'key': 'P1'}, {'task_name': 'c', 'key': 'C1', 'parent_key': 'P1'}], 2)),
+        ('import_tasks_batch', lambda: db.import_tasks_batch(
+            'mes.csv', [{'task_name': 'c', 'key': 'C2', 'parent_key': 'P1'}], 3)),
+        ('get_import_progress', lambda: db.get_import_progress('mes.csv')),
+        ('global_task_id', lambda: db.global_task_id(child)),
+        ('find_global_task', lambda: db.find_global_task(db.global_task_id(child))),
+        ('find_global_task', lambda: db.find_global_task('elsewhere:1')),
+        ('changes_since', lambda: db.changes_since(0, 100)),
+        ('apply_changes', lambda: db.apply_changes(inserts)),
+        ('apply_changes', lambda: db.apply_changes(updates)),
+        ('get_sync_progress', lambda: db.get_sync_progress('elsewhere')),
+        ('export_columns', lambda: db.export_columns('tasks')),
+        ('export_rows', lambda: [list(db.export_rows(table, 0)) for table in db.EXPORT_TABLES
+                                 if db.EXPORT_TABLES[table]]),
+        ('export_rows', lambda: [list(db.export_rows(table)) for table in db.EXPORT_TABLES]),
+        ('delete_task', lambda: db.delete_task(child)),
+    ]
+
+
+def full_scans(conn, sql):
+    """Plan lines of ``sql`` that visit every row of a table.
+
+    Scans of subqueries and CTEs are not reported, and neither are SQLite's own
+    bookkeeping tables (sqlite_sequence, ...), which hold a row per table, or
+    the archive catalog, which holds one per archived month. Virtual tables
+    report every lookup as a SCAN; one answering a full-text MATCH (``M`` in
+    FTS5's index string) reads only the matching rows.
+    """
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")} - {'archives'}
+    rows = conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    return [
+        r[3] for r in rows
+        if r[3].startswith('SCAN ') and r[3].split()[1] in tables and not r[3].startswith('SCAN sqlite_')
+        and not FULL_TEXT_MATCH.search(r[3])
+    ]
+
+
+def explain_archived(conn, sql, paths):
+    """full_scans() of a statement reading archives, attached again for EXPLAIN to resolve."""
+    schemas = sorted(set(m.group(1) for m in ARCHIVE_SCHEMA.finditer(sql)))
+    for schema in schemas:
+        number = schema.partition('_')[2]
+        conn.execute(f'ATTACH DATABASE ? AS {schema}', (paths[int(number) if number else 0],))
+    try:
+        return full_scans(conn, sql)
+    finally:
+        for schema in schemas:
+            conn.execute(f'DETACH DATABASE {schema}')
+
+
+def whole_table_read(name, sql):
+    """Index into WHOLE_TABLE_READS of the entry allowing ``sql``, or None."""
+    return next((i for i, (method, pattern) in enumerate(WHOLE_TABLE_READS)
+                 if method == name and re.fullmatch(pattern, sql)), None)
+
+
+@pytest.fixture(scope='module')
+def traced():
+    """``(methods exercised, [(method, statement, full scans)])``."""
+    db = Database(':memory:')
+    parent = db.add_task('parent', '', 'op', 0)
+    child = db.add_task('child', '', 'op', 10, parent)
+    db.add_tasks_bulk([{'task_name': 'archived', 'assigned_to': 'op', 'status': 'Completed', 'total_time': 60,
+                        'start_time': datetime(2023, 12, 1, 8), 'end_time': datetime(2023, 12, 1, 9)}])
+    db.add_equipment('eq', 8, 100)
+    eq = db.get_equipment()[0][0]
+    archive_dir = tempfile.TemporaryDirectory()
+
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    covered = set()
+    traced = []
+    for name, call in exercises(db, (parent, child, eq), archive_dir.name):
+        covered.add(name)
+        statements.clear()
+        call()
+        for sql in list(statements):
+            if not sql.lstrip().upper().startswith(PLANNED_KEYWORDS):
+                continue
+            if ARCHIVE_SCHEMA.search(sql):
+                scans = explain_archived(db.conn, sql, [path for path, *_ in db.get_archives()])
+            else:
+                scans = full_scans(db.conn, sql)
+            traced.append((name, ' '.join(sql.split()), scans))
+    db.conn.set_trace_callback(None)
+    db.close()
+    archive_dir.cleanup()
+    return covered, traced
+
+
+def test_queries_use_an_index(traced):
+    failures = [f"{name}: {sql}\n    -> {'; '.join(scans)}" for name, sql, scans in traced[1]
+                if scans and whole_table_read(name, sql) is None]
+    assert not failures, '\n'.join(failures)
+
+
+def test_every_whole_table_read_is_still_issued(traced):
+    used = {whole_table_read(name, sql) for name, sql, scans in traced[1] if scans}
+    assert [WHOLE_TABLE_READS[i] for i in range(len(WHOLE_TABLE_READS)) if i not in used] == []
+
+
+def test_every_public_method_is_exercised(traced):
+    public = {m for m in dir(Database) if not m.startswith('_') and callable(getattr(Database, m))}
+    assert sorted(public - traced[0] - NOT_QUERIES) == []
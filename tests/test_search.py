@@ -0,0 +1,36 @@
+from database import SEARCH_CANDIDATES
+
+
+def names(tasks):
+    return [task[1] for task in tasks]
+
+
+def test_every_word_must_start_a_word(db):
+    db.add_task('Weld bracket', 'Seam on the frame', 'Welder', 60)
+    db.add_task('Paint bracket', '', 'Painter', 30)
+    db.add_task('Inspect welds', '', 'Inspector', 10)
+    assert names(db.search_tasks('brack wel')) == ['Weld bracket']
+    assert names(db.search_tasks('painter')) == ['Paint bracket']
+    assert db.search_tasks('racket') == []
+    assert db.search_tasks('  ') == []
+
+
+def test_diacritics_and_case_are_ignored(db):
+    db.add_task('Schweißnaht prüfen', '', 'Müller', 10)
+    assert names(db.search_tasks('PRUF mull')) == ['Schweißnaht prüfen']
+
+
+def test_name_matches_rank_first_and_ties_go_to_the_newest(db):
+    db.add_task('Deburr edges', 'after the hydraulic test', 'Fitter', 10)
+    db.add_task('Hydraulic hose', '', 'Fitter', 10)
+    db.add_task('Hydraulic pump', '', 'Fitter', 10)
+    assert names(db.search_tasks('hydraulic')) == ['Hydraulic pump', 'Hydraulic hose', 'Deburr edges']
+
+
+def test_old_strong_match_outranks_many_newer_weak_ones(db):
+    db.add_task('Hydraulic press overhaul', '', 'Fitter', 600)
+    db.add_tasks_bulk({'task_name': f'Clean bay {i}', 'description': 'check the hydraulic lines for leaks',
+                       'assigned_to': 'Cleaner'} for i in range(SEARCH_CANDIDATES + 50))
+    for text in ('hydraulic', 'hyd', 'hydraulic press'):
+        assert names(db.search_tasks(text, 5))[0] == 'Hydraulic press overhaul'
+    assert len(db.search_tasks('hydraulic', 1000)) >= SEARCH_CANDIDATES
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+T0 = datetime(2024, 3, 4, 8)
+
+
+def after(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+def status(db, task_id):
+    return db.get_task(task_id)[9]
+
+
+def segment_seconds(db, task_id):
+    return sum(end - start for _, _, _, start, end in db.get_segments(task_id)) / 1000
+
+
+@pytest.fixture
+def task(db):
+    db.add_task('Weld frame', '', 'Ana', 60)
+    return db.get_all_tasks()[-1][0]
+
+
+def test_pause_and_resume_accumulate(db, task):
+    db.start_task(task, at=after(0))
+    assert db.pause_task(task, at=after(30)) == 30
+    assert status(db, task) == 'Paused'
+    db.resume_task(task, at=after(100))
+    assert status(db, task) == 'In Progress'
+    assert db.pause_task(task, at=after(145.5)) == 75.5
+    db.resume_task(task, at=after(200))
+    assert db.stop_task(task, at=after(212)) == 87.5
+    t = db.get_task(task)
+    assert (t[6], t[9]) == (87.5, 'Completed')
+    assert t[8] == pytest.approx(87.5 / 60)
+    assert len(db.get_segments(task)) == 3
+    assert segment_seconds(db, task) == t[6]
+    assert db.get_open_segments(task) == []
+
+
+def test_sub_millisecond_pause_closes_its_segment(db, task):
+    db.start_task(task, at=after(0))
+    assert db.pause_task(task, at=after(0.0004)) == 0
+    assert db.get_open_segments(task) == []
+    assert status(db, task) == 'Paused'
+    # Resuming opens a new segment instead of finding the old one running
+    db.resume_task(task, at=after(1))
+    assert len(db.get_open_segments(task)) == 1
+    assert db.stop_task(task, at=after(11)) == 10
+    assert segment_seconds(db, task) == 10
+
+
+def test_pause_before_start_adds_nothing(db, task):
+    db.start_task(task, at=after(60))
+    assert db.pause_task(task, at=after(0)) == 0
+    (_, _, _, start, end), = db.get_segments(task)
+    assert end == start
+    db.resume_task(task, at=after(120))
+    assert db.stop_task(task, at=after(150)) == 30
+    assert segment_seconds(db, task) == 30
+
+
+def test_operators_pause_independently(db, task):
+    db.start_task(task, 'Ana', at=after(0))
+    db.start_task(task, 'Ben', at=after(10))
+    # Starting someone already running does nothing
+    db.start_task(task, 'Ana', at=after(20))
+    assert db.pause_task(task, 'Ben', at=after(40)) == 30
+    assert status(db, task) == 'In Progress'
+    assert [s[2] for s in db.get_open_segments(task)] == ['Ana']
+    assert db.pause_task(task, at=after(50)) == 80
+    assert status(db, task) == 'Paused'
+    assert segment_seconds(db, task) == 80
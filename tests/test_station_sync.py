@@ -0,0 +1,152 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+from station_sync import ChangeLogServer, SocketSource, sync
+
+START = datetime(2024, 3, 4, 8)
+
+
+@pytest.fixture
+def stations(tmp_path):
+    """A central database and one workstation, as separate files."""
+    central = Database(str(tmp_path / 'central.db'))
+    line = Database(str(tmp_path / 'line1.db'))
+    yield central, line
+    line.close()
+    central.close()
+
+
+def snapshot(db):
+    """``{global id: (name, parent's global id, total time, standard time, status)}`` of every task."""
+    return {db.global_task_id(task[0]): (task[1], task[10] and db.global_task_id(task[10]), task[6], task[7], task[9])
+            for task in db.get_all_tasks()}
+
+
+def segments(db, task_id):
+    return [segment[2:] for segment in db.get_segments(task_id)]
+
+
+def work(db):
+    """A small WBS with one timed task and one machine."""
+    root = db.add_task('Frame', '', 'Welder', 60)
+    child = db.add_task('Tack', '', 'Welder', 20, root)
+    db.start_task(child, at=START)
+    db.stop_task(child, at=START + timedelta(minutes=15))
+    db.add_equipment('Press 1', 480, 100)
+    return root, child
+
+
+def test_station_replicates_into_central(stations):
+    central, line = stations
+    root, child = work(line)
+    assert sync(central, line) > 0
+    assert snapshot(central) == snapshot(line)
+
+    copy = central.find_global_task(line.global_task_id(child))
+    assert central.global_task_id(copy) == f"{line.station_id}:{child}"
+    assert segments(central, copy) == segments(line, child)
+    assert central.get_wbs_rollup(central.find_global_task(line.global_task_id(root)))[1:] == (900, 80, 11.25, 2)
+    assert [e[1:] for e in central.get_equipment()] == [e[1:] for e in line.get_equipment()]
+
+
+def test_small_batches_and_watermark(stations):
+    central, line = stations
+    work(line)
+    batches = []
+    applied = sync(central, line, batch_size=2, progress=lambda *args: batches.append(args))
+    assert len(batches) > 1
+    seq, total = central.get_sync_progress(line.station_id)
+    assert batches[-1] == (line.station_id, seq, applied) and total == applied
+    assert snapshot(central) == snapshot(line)
+    assert sync(central, line) == 0
+
+
+def test_replayed_batch_changes_nothing(stations):
+    central, line = stations
+    work(line)
+    batch = line.changes_since(0)
+    assert central.apply_changes(batch) == len(batch['changes'])
+    before = central.changes_since(0)['last_seq']
+    assert central.apply_changes(batch) == 0
+    assert central.changes_since(0)['last_seq'] == before
+    with pytest.raises(ValueError):
+        line.apply_changes(batch)
+
+
+def test_updates_and_deletes_follow(stations):
+    central, line = stations
+    root, child = work(line)
+    sync(central, line)
+    other = line.add_task('Grind', '', 'Welder', 40)
+    line.update_task(child, 'Tack weld', '', 'Welder', 20, other)
+    line.delete_task(root)
+    sync(central, line)
+    assert snapshot(central) == snapshot(line)
+    assert central.find_global_task(line.global_task_id(other)) is not None
+    moved = central.find_global_task(f"{line.station_id}:{child}")
+    assert central.get_wbs_rollup(central.get_task(moved)[10])[1:] == (900, 60, 15, 2)
+    assert central.find_global_task(f"{line.station_id}:{root}") is None
+
+
+def test_both_ways_settles(stations):
+    central, line = stations
+    work(line)
+    central.add_task('Paint', '', 'Painter', 90)
+    for _ in range(3):
+        sync(central, line)
+        sync(line, central)
+    assert snapshot(central) == snapshot(line)
+    assert len(snapshot(central)) == 3
+    # Rows coming back unchanged are not logged again, so nothing is left to ship
+    assert sync(central, line) == 0
+    assert sync(line, central) == 0
+
+
+def test_concurrent_edits_converge(stations):
+    central, line = stations
+    root, _ = work(line)
+    sync(central, line)
+    sync(line, central)
+    copy = central.find_global_task(line.global_task_id(root))
+    line.update_task(root, 'Frame (line)', '', 'Welder', 60)
+    central.update_task(copy, 'Frame (central)', '', 'Welder', 70)
+    # The last database to apply the other's edit takes it; the echo then settles both
+    for _ in range(3):
+        sync(central, line)
+        sync(line, central)
+    assert snapshot(central) == snapshot(line)
+    assert sync(central, line) == 0
+    assert sync(line, central) == 0
+
+
+def test_edit_of_a_task_deleted_elsewhere(stations):
+    central, line = stations
+    root, child = work(line)
+    sync(central, line)
+    central.delete_task(central.find_global_task(line.global_task_id(child)))
+    line.update_task(child, 'Tack again', '', 'Welder', 20, root)
+    sync(line, central)
+    sync(central, line)
+    # The delete wins on both sides, and the parent's roll-up forgets the child
+    assert line.find_global_task(f"{line.station_id}:{child}") is None
+    assert snapshot(central) == snapshot(line)
+    assert central.get_wbs_rollup(central.find_global_task(line.global_task_id(root)))[1:] == (0, 60, 0, 1)
+
+
+def test_socket_source(stations):
+    central, line = stations
+    work(line)
+    server = ChangeLogServer(line, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    source = SocketSource(*server.server_address)
+    try:
+        assert source.station_id == line.station_id
+        assert sync(central, source, batch_size=2) > 0
+    finally:
+        source.close()
+        server.shutdown()
+        server.server_close()
+    assert snapshot(central) == snapshot(line)
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+QtCore = pytest.importorskip('PySide6.QtCore')
+
+from task_screen import TaskTableModel  # noqa: E402
+from ticker import Ticker  # noqa: E402
+
+T0 = datetime(2024, 3, 4, 8)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+class NoQueries:
+    """Stands in for the database where the model must not touch it."""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"queried the database: {name}")
+
+
+@pytest.fixture
+def model(db):
+    ids = db.add_tasks_bulk({'task_name': f'Task {i}', 'total_time': 10.0 * i} for i in range(10))
+    # Rows 1, 4 and 7 are running
+    for task_id in ids[1::3]:
+        db.start_task(task_id, at=T0)
+    model = TaskTableModel(db)
+    while model.canFetchMore():
+        model.fetchMore()
+    assert model.rowCount() == 10
+    repainted = []
+    model.dataChanged.connect(lambda first, last, roles=(): repainted.append((first.row(), first.column(),
+                                                                               last.row(), last.column())))
+    model.repainted = repainted
+    return model
+
+
+def ticked(model, first, last):
+    model.repainted.clear()
+    model.tick(first, last)
+    total = TaskTableModel.TOTAL_COLUMN
+    assert all(column == total and last_column == total and row == last_row
+               for row, column, last_row, last_column in model.repainted)
+    return [row for row, _, _, _ in model.repainted]
+
+
+def test_tick_repaints_only_visible_running_rows(model):
+    assert model.running_count() == 3
+    assert ticked(model, 2, 8) == [4, 7]
+    assert ticked(model, 2, 3) == []
+    # Rows past either end of the model are ignored
+    assert ticked(model, -5, 100) == [1, 4, 7]
+
+
+def test_tick_never_queries_the_database(model):
+    db, model.db = model.db, NoQueries()
+    try:
+        assert ticked(model, 0, 9) == [1, 4, 7]
+    finally:
+        model.db = db
+
+
+def test_paused_and_started_tasks_follow(model):
+    db = model.db
+    paused, started = model.task(4)[0], model.task(5)[0]
+    db.pause_task(paused, at=T0 + timedelta(seconds=30))
+    db.start_task(started, at=T0 + timedelta(seconds=30))
+    model.task_changed(paused)
+    model.task_changed(started)
+    assert ticked(model, 0, 9) == [1, 5, 7]
+    # The paused task keeps the 30 s it ran
+    assert model.task(4)[6] == pytest.approx(40 + 30)
+    assert model.elapsed(model.task(4), now=(T0 + timedelta(hours=1)).timestamp()) == pytest.approx(70)
+
+
+def test_running_time_counts_up(model):
+    now = (T0 + timedelta(seconds=90)).timestamp()
+    assert model.elapsed(model.task(1), now=now) == pytest.approx(10 + 90)
+    assert model.elapsed(model.task(2), now=now) == 20
+
+
+def test_ticker_runs_only_while_subscribed(app):
+    ticker = Ticker()
+    calls = []
+
+    def slot():
+        calls.append(1)
+
+    assert not ticker._timer.isActive()
+    ticker.subscribe(slot)
+    ticker.subscribe(slot)
+    assert ticker._timer.isActive()
+    ticker.tick.emit()
+    assert calls == [1]
+    ticker.unsubscribe(slot)
+    assert not ticker._timer.isActive()
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+START = datetime(2024, 3, 4, 8)
+
+
+def assert_rollups_current(db):
+    """Every cached roll-up matches a fresh walk of its subtree."""
+    for task in db.get_all_tasks():
+        assert db.get_wbs_rollup(task[0]) == pytest.approx(db.compute_wbs_rollup(task[0]))
+
+
+def timed(db, task_id, minutes):
+    db.start_task(task_id, at=START)
+    db.stop_task(task_id, at=START + timedelta(minutes=minutes))
+
+
+@pytest.fixture
+def tree(db):
+    """root > (a > a1, b), with standard times 60, 30, 20, 10."""
+    root = db.add_task('Root', '', 'Fitter', 60)
+    a = db.add_task('A', '', 'Fitter', 30, root)
+    a1 = db.add_task('A1', '', 'Fitter', 20, a)
+    b = db.add_task('B', '', 'Fitter', 10, root)
+    return db, root, a, a1, b
+
+
+def test_new_tasks_add_to_their_ancestors(tree):
+    db, root, a, a1, b = tree
+    assert db.get_wbs_rollup(root)[1:] == (0, 120, 0, 4)
+    assert db.get_wbs_rollup(a)[1:] == (0, 50, 0, 2)
+    assert_rollups_current(db)
+
+
+def test_timing_adds_up_the_chain(tree):
+    db, root, a, a1, b = tree
+    timed(db, a1, 10)
+    timed(db, b, 5)
+    assert db.get_wbs_rollup(a)[1] == 600
+    assert db.get_wbs_rollup(root)[1] == 900
+    assert db.get_wbs_rollup(root)[3] == pytest.approx(900 / 120)
+    assert_rollups_current(db)
+
+
+def test_standard_time_change(tree):
+    db, root, a, a1, b = tree
+    db.update_task(a1, 'A1', '', 'Fitter', 50, a)
+    assert db.get_wbs_rollup(root)[2] == 150
+    assert_rollups_current(db)
+
+
+def test_reparenting_moves_the_subtree(tree):
+    db, root, a, a1, b = tree
+    timed(db, a1, 10)
+    db.update_task(a, 'A', '', 'Fitter', 30, b)
+    assert db.get_wbs_rollup(b)[1:] == (600, 60, 10, 3)
+    assert db.get_wbs_rollup(root)[4] == 4
+    db.update_task(a, 'A', '', 'Fitter', 30, None)
+    assert db.get_wbs_rollup(root)[1:] == (0, 70, 0, 2)
+    assert db.get_wbs_rollup(a)[1:] == (600, 50, 12, 2)
+    assert_rollups_current(db)
+
+
+def test_deleting_a_task_leaves_its_ancestors(tree):
+    db, root, a, a1, b = tree
+    timed(db, a1, 10)
+    db.delete_task(a)
+    assert db.get_wbs_rollup(a) is None
+    assert db.get_wbs_rollup(root)[1:] == (0, 70, 0, 2)
+    # The orphan keeps its own totals
+    assert db.get_wbs_rollup(a1)[1:] == (600, 20, 30, 1)
+    assert_rollups_current(db)
+
+
+def test_bulk_insert_builds_the_rollups(tree):
+    db, root, a, a1, b = tree
+    db.add_tasks_bulk([
+        {'task_name': 'C', 'key': 'c', 'parent_task_id': a1, 'standard_time': 5, 'total_time': 300,
+         'status': 'Completed'},
+        {'task_name': 'C1', 'parent_key': 'c', 'standard_time': 5, 'total_time': 60, 'status': 'Completed'},
+    ])
+    assert db.get_wbs_rollup(root)[1:] == (360, 130, pytest.approx(360 / 130), 6)
+    assert db.get_wbs_rollup(a1)[4] == 3
+    assert_rollups_current(db)
@@ -0,0 +1,48 @@
+# ticker.py
+"""
+One application-wide clock tick for live displays.
+
+Every live view subscribes to the same coarse QTimer instead of running its
+own, so however many clocks are on screen the event loop wakes up once per
+tick, and not at all while nothing is subscribed.
+"""
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+
+
+class Ticker(QObject):
+    tick = Signal()
+
+    INTERVAL_MS = 1000
+
+    _instance = None
+
+    @classmethod
+    def shared(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        super().__init__()
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.INTERVAL_MS)
+        self._timer.setTimerType(Qt.CoarseTimer)
+        self._timer.timeout.connect(self.tick)
+        self._subscribers = set()
+
+    def subscribe(self, slot):
+        """Call ``slot`` on every tick; the timer runs while anyone is subscribed."""
+        if slot in self._subscribers:
+            return
+        self._subscribers.add(slot)
+        self.tick.connect(slot)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def unsubscribe(self, slot):
+        if slot not in self._subscribers:
+            return
+        self._subscribers.discard(slot)
+        self.tick.disconnect(slot)
+        if not self._subscribers:
+            self._timer.stop()